@@ -0,0 +1,63 @@
+"""
+Benchmark do verificador de bloqueios: a verificação original (busca de cada termo no
+prato, sem o cache de normalização; mantida aqui como referência) contra o MotorBloqueios
+(Aho-Corasick + interseção).
+
+Rodar a partir da raiz do projeto:
+
+    python -m benchmarks.bench_bloqueios [alunos] [termos_por_aluno]
+"""
+import sys
+import time
+import random
+from sistema_pedido import utils
+from sistema_pedido.bloqueios import MotorBloqueios
+
+INGREDIENTES = [
+    'frango', 'carne', 'peixe', 'porco', 'linguiça', 'bacon', 'ovo', 'queijo', 'leite', 'camarão',
+    'cebola', 'alho', 'pimentão', 'tomate', 'berinjela', 'abobrinha', 'cogumelo', 'brócolis',
+    'couve-flor', 'ervilha', 'milho', 'feijão', 'grão-de-bico', 'lentilha', 'soja', 'amendoim',
+    'castanha', 'coentro', 'salsinha', 'pimenta', 'curry', 'mostarda', 'maionese', 'creme de leite',
+    'strogonoff', 'feijoada', 'parmegiana', 'almôndega', 'fígado', 'moela', 'dobradinha', 'jiló',
+    'quiabo', 'chuchu', 'beterraba', 'cenoura', 'mandioca', 'batata', 'repolho', 'espinafre',
+]
+PRATO = 'Strogonoff de frango com champignon, arroz branco, batata palha e salada de beterraba'
+
+def verificar_original(texto_cardapio: str, lista_bloqueios: list[str]) -> tuple[bool, str]:
+    """Implementação de referência (a verificação original), com normalizar_texto sem cache."""
+    normalizar = utils.normalizar_texto.__wrapped__
+    texto_base = normalizar(texto_cardapio)
+    encontrados = [b for b in lista_bloqueios if normalizar(b) and normalizar(b) in texto_base]
+    return (True, ", ".join(encontrados)) if encontrados else (False, "")
+
+def main():
+    quantidade_alunos = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    termos_por_aluno = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    aleatorio = random.Random(42)
+    listas = [
+        [aleatorio.choice([t, t.upper(), t.capitalize()]) for t in aleatorio.sample(INGREDIENTES, termos_por_aluno)]
+        for _ in range(quantidade_alunos)
+    ]
+
+    inicio = time.perf_counter()
+    esperado = [verificar_original(PRATO, lista) for lista in listas]
+    tempo_original = time.perf_counter() - inicio
+
+    utils.normalizar_texto.cache_clear()
+    inicio = time.perf_counter()
+    motor = MotorBloqueios(listas)
+    motor.preparar(PRATO)
+    obtido = [motor.verificar(lista) for lista in listas]
+    tempo_motor = time.perf_counter() - inicio
+
+    if obtido != esperado:
+        print("⚠️ Os resultados divergem da função original!")
+
+    bloqueados = sum(1 for pular, _ in obtido if pular)
+    print(f"{quantidade_alunos} alunos x {termos_por_aluno} termos ({len(motor.termos)} termos distintos, {bloqueados} bloqueados)")
+    print(f"original:        {tempo_original * 1000:9.1f} ms")
+    print(f"MotorBloqueios:  {tempo_motor * 1000:9.1f} ms  ({tempo_original / tempo_motor:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark dos extratores de HTML (token CSRF + aviso do pedido).
+
+Mede o tempo por resposta de cada backend sobre as páginas salvas em
+benchmarks/fixtures/. Rodar a partir da raiz do projeto:
+
+    python -m benchmarks.bench_extratores [repeticoes]
+"""
+import sys
+import timeit
+from pathlib import Path
+from sistema_pedido import extratores
+from sistema_pedido.extratores import alerta_completo
+
+PASTA_FIXTURES = Path(__file__).parent / 'fixtures'
+# pedido_sucesso_e_erro.html / pedido_erro_no_fim.html: os dois avisos na mesma página, o de
+# erro logo depois do de sucesso ou bem mais abaixo (o de erro vence, como no bs4)
+FIXTURES = [
+    'home.html', 'pedido_sucesso.html', 'pedido_erro.html', 'pedido_sucesso_e_erro.html',
+    'pedido_erro_no_fim.html',
+]
+
+def medir(backend: str, html: str, repeticoes: int) -> float:
+    """Tempo médio (em microssegundos) para extrair token + aviso de uma resposta."""
+    def extrair():
+        extratores.BACKENDS[backend][0](html)
+        extratores.BACKENDS[backend][1](html)
+    return timeit.timeit(extrair, number=repeticoes) / repeticoes * 1_000_000
+
+def alerta_em_streaming(html: str, tamanho_bloco: int = 256) -> tuple[bool, str] | None:
+    """Aviso extraído do trecho que a leitura em streaming teria baixado (para em alerta_completo)."""
+    lido = ''
+    for inicio in range(0, len(html), tamanho_bloco):
+        lido += html[inicio:inicio + tamanho_bloco]
+        if alerta_completo(lido):
+            break
+    return extratores.extrair_alerta(lido, backend='rapido')
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    backends = [nome for nome in extratores.BACKENDS if nome != 'lxml' or extratores.lxml_html]
+
+    print(f"{'fixture':<28}" + "".join(f"{nome:>14}" for nome in backends))
+    for nome_arquivo in FIXTURES:
+        html = (PASTA_FIXTURES / nome_arquivo).read_text(encoding='utf-8')
+
+        # Confere que todos os backends concordam antes de comparar velocidade
+        resultados = {nome: (extratores.BACKENDS[nome][0](html), extratores.BACKENDS[nome][1](html)) for nome in backends}
+        if len(set(resultados.values())) != 1:
+            print(f"⚠️ Backends divergem em {nome_arquivo}: {resultados}")
+        # A leitura em streaming (que para no aviso) tem que chegar ao mesmo aviso da página inteira
+        if alerta_em_streaming(html) != resultados['bs4'][1]:
+            print(f"⚠️ Streaming diverge do bs4 em {nome_arquivo}: {alerta_em_streaming(html)}")
+
+        tempos = [medir(nome, html, repeticoes) for nome in backends]
+        print(f"{nome_arquivo:<28}" + "".join(f"{tempo:>11.1f} µs" for tempo in tempos))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark de ponta a ponta da execução de pedidos (principal()) contra o refeitório e o
+bot falsos (benchmarks/servidor_falso.py) e um Postgres local semeado (benchmarks/semear.py).
+
+Para cada tamanho de roster: semeia o banco, roda `python -m sistema_pedido.iniciar_pedidos`
+num subprocesso (sem a janela de despacho aleatória) e mede pedidos/segundo, transações no
+banco, checkouts do pool e o tempo total. Os números vêm das métricas que a própria
+execução exporta em DIRETORIO_METRICAS.
+
+ATENÇÃO: BENCH_DATABASE_URL deve apontar para um banco descartável (é apagado a cada rodada).
+Rodar a partir da raiz do projeto:
+
+    BENCH_DATABASE_URL=postgresql://localhost/almoco_bench \\
+        python -m benchmarks.bench_throughput [100 1000 10000] [--latencia 0.02] [--taxa-erro 0.01]
+
+Com --gravar-base os resultados viram a linha de base (benchmarks/linha_base_throughput.json);
+sem ela, cada tamanho é comparado com a base e o script sai com código 1 se piorou mais
+que a tolerância.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+import psycopg
+from benchmarks.semear import semear
+from benchmarks.servidor_falso import ServidorFalso
+
+ARQUIVO_BASE = Path(__file__).parent / 'linha_base_throughput.json'
+TOLERANCIA = 0.20   # piora aceitável em relação à linha de base antes de acusar regressão
+
+def _transacoes(url_banco: str) -> int:
+    """Total de commits + rollbacks do banco (aproxima as idas e voltas ao Postgres)."""
+    with psycopg.connect(url_banco, autocommit=True) as conexao:
+        conexao.execute("SELECT pg_stat_clear_snapshot();")
+        linha = conexao.execute(
+            "SELECT xact_commit + xact_rollback FROM pg_stat_database WHERE datname = current_database();"
+        ).fetchone()
+    return linha[0]
+
+def _contar_pedidos(url_banco: str) -> int:
+    with psycopg.connect(url_banco) as conexao:
+        return conexao.execute("SELECT count(*) FROM pedido;").fetchone()[0]
+
+def _serie(metricas: dict, nome: str, **rotulos) -> dict:
+    for serie in metricas['series']:
+        if serie['metrica'] == nome and serie['rotulos'] == rotulos:
+            return serie
+    return {'quantidade': 0, 'total_s': 0.0, 'p50_s': 0.0, 'p95_s': 0.0}
+
+def rodar(quantidade: int, url_banco: str, latencia: float, taxa_erro: float, simultaneos: int) -> dict:
+    """Executa uma rodada completa para `quantidade` alunos e devolve os números medidos."""
+    semear(url_banco, quantidade)
+    servidor = ServidorFalso(latencia=latencia, taxa_erro=taxa_erro).iniciar()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        ambiente = dict(
+            os.environ,
+            DATABASE_URL=url_banco,
+            URL_SITE=servidor.url_site,
+            BOT_URL=servidor.url_bot,
+            ADMINS_E164='5511900000001',
+            EMAIL_USER='', TO_ADDRESS='',
+            JANELA_DESPACHO='0', ESPACAMENTO_MINIMO='0',
+            PEDIDOS_SIMULTANEOS=str(simultaneos),
+            PASTA_CACHE_HTTP=os.path.join(pasta, 'cache'),
+            DIRETORIO_METRICAS=os.path.join(pasta, 'metricas'),
+        )
+        # Espera a estatística de transações do Postgres assentar antes de medir
+        time.sleep(1)
+        transacoes_antes = _transacoes(url_banco)
+
+        inicio = time.perf_counter()
+        processo = subprocess.run(
+            [sys.executable, '-m', 'sistema_pedido.iniciar_pedidos'],
+            env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        tempo_total = time.perf_counter() - inicio
+        servidor.parar()
+
+        if processo.returncode != 0:
+            raise RuntimeError(f"A execução falhou (código {processo.returncode}):\n{processo.stderr[-2000:]}")
+
+        time.sleep(1)
+        transacoes = _transacoes(url_banco) - transacoes_antes
+        metricas = json.loads(Path(pasta, 'metricas', 'ultima_execucao.json').read_text(encoding='utf-8'))
+
+    fase_pedidos = _serie(metricas, 'fase_segundos', fase='pedidos')['total_s']
+    http_pedido = _serie(metricas, 'http_segundos', endpoint='pedido')
+    pedidos_enviados = servidor.estatisticas['pedidos']
+    return {
+        'alunos': quantidade,
+        'pedidos_enviados': pedidos_enviados,
+        'pedidos_ok': servidor.estatisticas['pedidos_ok'],
+        'linhas_pedido': _contar_pedidos(url_banco),
+        'pedidos_por_segundo': round(pedidos_enviados / fase_pedidos, 2) if fase_pedidos else 0.0,
+        'post_p50_ms': round(http_pedido['p50_s'] * 1000, 1),
+        'post_p95_ms': round(http_pedido['p95_s'] * 1000, 1),
+        'transacoes_banco': transacoes,
+        'checkouts_pool': metricas['contadores'].get('pool_banco', {}).get('requests_num', 0),
+        'tempo_fase_pedidos_s': round(fase_pedidos, 2),
+        'tempo_total_s': round(tempo_total, 2),
+    }
+
+def comparar(resultado: dict, base: dict) -> list[str]:
+    """Lista as regressões de `resultado` em relação à linha de base do mesmo tamanho."""
+    problemas = []
+    if resultado['pedidos_por_segundo'] < base['pedidos_por_segundo'] * (1 - TOLERANCIA):
+        problemas.append(f"pedidos/s caiu: {base['pedidos_por_segundo']} -> {resultado['pedidos_por_segundo']}")
+    if resultado['tempo_total_s'] > base['tempo_total_s'] * (1 + TOLERANCIA):
+        problemas.append(f"tempo total subiu: {base['tempo_total_s']}s -> {resultado['tempo_total_s']}s")
+    if resultado['transacoes_banco'] > base['transacoes_banco'] * (1 + TOLERANCIA):
+        problemas.append(f"transações no banco subiram: {base['transacoes_banco']} -> {resultado['transacoes_banco']}")
+    return problemas
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ponta a ponta da execução de pedidos.')
+    parser.add_argument('tamanhos', nargs='*', type=int, default=[100, 1000, 10000])
+    parser.add_argument('--latencia', type=float, default=0.02, help='atraso médio do site falso (s)')
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='fração de pedidos com erro')
+    parser.add_argument('--simultaneos', type=int, default=4, help='PEDIDOS_SIMULTANEOS da execução')
+    parser.add_argument('--gravar-base', action='store_true', help='grava os resultados como linha de base')
+    args = parser.parse_args()
+
+    url_banco = os.getenv('BENCH_DATABASE_URL')
+    if not url_banco:
+        sys.exit("Defina BENCH_DATABASE_URL com um banco Postgres descartável.")
+
+    base = json.loads(ARQUIVO_BASE.read_text(encoding='utf-8')) if ARQUIVO_BASE.exists() else {}
+    resultados = {}
+    regressoes = 0
+
+    print(f"{'alunos':>7} {'pedidos/s':>10} {'p50 POST':>9} {'p95 POST':>9} {'transações':>11} "
+          f"{'checkouts':>10} {'fase pedidos':>13} {'total':>8}")
+    for quantidade in args.tamanhos:
+        resultado = rodar(quantidade, url_banco, args.latencia, args.taxa_erro, args.simultaneos)
+        resultados[str(quantidade)] = resultado
+        print(f"{quantidade:>7} {resultado['pedidos_por_segundo']:>10} {resultado['post_p50_ms']:>7}ms "
+              f"{resultado['post_p95_ms']:>7}ms {resultado['transacoes_banco']:>11} "
+              f"{resultado['checkouts_pool']:>10} {resultado['tempo_fase_pedidos_s']:>12}s "
+              f"{resultado['tempo_total_s']:>7}s")
+
+        if resultado['linhas_pedido'] != quantidade:
+            print(f"   ⚠️ esperava {quantidade} linhas em pedido, encontrei {resultado['linhas_pedido']}")
+        if not args.gravar_base and str(quantidade) in base:
+            for problema in comparar(resultado, base[str(quantidade)]):
+                print(f"   ⚠️ REGRESSÃO: {problema}")
+                regressoes += 1
+
+    if args.gravar_base:
+        base.update(resultados)
+        ARQUIVO_BASE.write_text(json.dumps(base, indent=2) + '\n', encoding='utf-8')
+        print(f"Linha de base gravada em {ARQUIVO_BASE}")
+
+    sys.exit(1 if regressoes else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+-- Esquema mínimo das tabelas usadas pelo sistema_pedido e pelo bot, para benchmarks
+-- num Postgres local. As tabelas auxiliares (veredito_bloqueio, mensagem_saida) são
+-- criadas pelo próprio sistema_pedido na primeira execução.
+
+CREATE TABLE IF NOT EXISTS aluno (
+    id          SERIAL PRIMARY KEY,
+    nome        TEXT NOT NULL,
+    prontuario  TEXT NOT NULL UNIQUE,
+    ativo       BOOLEAN NOT NULL DEFAULT true
+);
+
+CREATE TABLE IF NOT EXISTS preferencia_dia (
+    aluno_id    INTEGER NOT NULL REFERENCES aluno (id) ON DELETE CASCADE,
+    dia_semana  INTEGER NOT NULL,
+    PRIMARY KEY (aluno_id, dia_semana)
+);
+
+CREATE TABLE IF NOT EXISTS prato_bloqueado (
+    id          SERIAL PRIMARY KEY,
+    aluno_id    INTEGER NOT NULL REFERENCES aluno (id) ON DELETE CASCADE,
+    nome        TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS contato (
+    id          SERIAL PRIMARY KEY,
+    aluno_id    INTEGER NOT NULL REFERENCES aluno (id) ON DELETE CASCADE,
+    telefone    TEXT NOT NULL,
+    CONSTRAINT contato_aluno_telefone_key UNIQUE (aluno_id, telefone)
+);
+
+CREATE TABLE IF NOT EXISTS pedido (
+    id          SERIAL PRIMARY KEY,
+    aluno_id    INTEGER NOT NULL REFERENCES aluno (id) ON DELETE CASCADE,
+    dia_pedido  DATE NOT NULL,
+    motivo      TEXT,
+    criado_em   TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS proximo_prato (
+    dia_referente  DATE PRIMARY KEY,
+    prato_nome     TEXT,
+    updated_at     TIMESTAMPTZ DEFAULT NOW()
+);
@@ -0,0 +1,68 @@
+"""
+Cria o esquema de benchmarks/esquema.sql num Postgres local e preenche com alunos sintéticos.
+
+ATENÇÃO: apaga (TRUNCATE) todas as tabelas do sistema antes de semear. Use só num banco
+descartável. Rodar a partir da raiz do projeto:
+
+    python -m benchmarks.semear postgresql://localhost/almoco_bench [alunos]
+"""
+import sys
+import random
+from pathlib import Path
+import psycopg
+from benchmarks.bench_bloqueios import INGREDIENTES
+
+ARQUIVO_ESQUEMA = Path(__file__).parent / 'esquema.sql'
+
+def semear(url_banco: str, quantidade: int, semente: int = 42):
+    """
+    Recria os dados: `quantidade` alunos ativos que almoçam em todos os dias úteis,
+    ~30% com até 3 pratos bloqueados e ~60% com telefone.
+    """
+    aleatorio = random.Random(semente)
+    with psycopg.connect(url_banco) as conexao:
+        with conexao.cursor() as cursor:
+            cursor.execute(ARQUIVO_ESQUEMA.read_text(encoding='utf-8'))
+            cursor.execute("""
+                DO $$
+                BEGIN
+                    IF to_regclass('veredito_bloqueio') IS NOT NULL THEN
+                        TRUNCATE veredito_bloqueio;
+                    END IF;
+                    IF to_regclass('mensagem_saida') IS NOT NULL THEN
+                        TRUNCATE mensagem_saida;
+                    END IF;
+                END $$;
+            """)
+            cursor.execute("""
+                TRUNCATE aluno, preferencia_dia, prato_bloqueado, contato, pedido, proximo_prato
+                RESTART IDENTITY CASCADE;
+            """)
+
+            with cursor.copy("COPY aluno (id, nome, prontuario, ativo) FROM STDIN") as copia:
+                for i in range(1, quantidade + 1):
+                    copia.write_row((i, f'Aluno {i}', f'PT{3000000 + i}', True))
+            cursor.execute("SELECT setval('aluno_id_seq', %s);", (quantidade,))
+
+            with cursor.copy("COPY preferencia_dia (aluno_id, dia_semana) FROM STDIN") as copia:
+                for i in range(1, quantidade + 1):
+                    for dia in range(1, 6):
+                        copia.write_row((i, dia))
+
+            with cursor.copy("COPY prato_bloqueado (aluno_id, nome) FROM STDIN") as copia:
+                for i in range(1, quantidade + 1):
+                    if aleatorio.random() < 0.3:
+                        for nome in aleatorio.sample(INGREDIENTES, aleatorio.randint(1, 3)):
+                            copia.write_row((i, nome))
+
+            with cursor.copy("COPY contato (aluno_id, telefone) FROM STDIN") as copia:
+                for i in range(1, quantidade + 1):
+                    if aleatorio.random() < 0.6:
+                        copia.write_row((i, f'55119{i:08d}'))
+        conexao.commit()
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    semear(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+    print("Banco semeado.")
@@ -0,0 +1,280 @@
+"""
+Refeitório falso + bot de WhatsApp falso para testes de carga locais.
+
+Imita o que o sistema_pedido usa do site real:
+    GET  /home           -> banners 'jumbotron' dos próximos dias úteis + formulário com token CSRF
+    POST /home           -> aviso de sucesso/erro (alert-success / alert-danger)
+    POST /send-message   -> resposta do bot (200, ou 503 simulando WhatsApp offline)
+
+Latência e taxa de erro são configuráveis. Rodar sozinho a partir da raiz do projeto:
+
+    python -m benchmarks.servidor_falso [--porta 8099] [--latencia 0.05] [--taxa-erro 0.02]
+
+e apontar o sistema para ele com URL_SITE=http://127.0.0.1:8099/home e
+BOT_URL=http://127.0.0.1:8099/send-message.
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import secrets
+import threading
+from datetime import date, timedelta
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MESES = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+PRATOS = [
+    ('Frango assado com ervas', 'Omelete de legumes'),
+    ('Carne moída com batata', 'Grão-de-bico ao curry'),
+    ('Peixe empanado', 'Berinjela à parmegiana'),
+    ('Strogonoff de frango', 'Strogonoff de cogumelos'),
+    ('Feijoada', 'Feijoada vegana'),
+]
+ERROS_SITE = [
+    'Erro interno ao gerar o ticket. Tente novamente.',
+    'Serviço temporariamente indisponível.',
+]
+
+CABECALHO = """<!DOCTYPE html>
+<html lang="pt-br">
+<head>
+  <meta charset="utf-8">
+  <title>Refeitório - IFSP Pirituba</title>
+</head>
+<body>
+  <div class="container">
+"""
+BANNER = """    <div class="jumbotron">
+      <h2 class="display-3">Cardápio de {dia} de {mes} de {ano}</h2>
+      <p class="lead">Almoço servido das 11:30 às 13:30.</p>
+      <hr class="my-4">
+      <p>Entrada: Salada de alface, tomate e cenoura ralada</p>
+      <p>Prato Principal: Opção 1: {opcao_1} Opção 2: {opcao_2}</p>
+      <p>Guarnição: Arroz branco, feijão carioca e farofa</p>
+      <p>Sobremesa: Fruta da estação</p>
+    </div>
+"""
+ALERTA = """    <div class="alert alert-{tipo} alert-dismissable fade in">
+      <a href="#" class="close" data-dismiss="alert" aria-label="close">&times;</a>
+      <strong>{titulo}</strong> {texto}
+    </div>
+"""
+RODAPE = """    <form method="post" action="/home">
+      <input type="hidden" name="csrfmiddlewaretoken" value="{token}">
+      <input type="text" name="prontuario" maxlength="10" required>
+      <select name="tipo"><option value="1" selected>Almoço</option></select>
+      <button type="submit">Solicitar</button>
+    </form>
+  </div>
+</body>
+</html>
+"""
+
+def dias_uteis(inicio: date, quantidade: int) -> list[date]:
+    dias = []
+    dia = inicio
+    while len(dias) < quantidade:
+        if dia.isoweekday() <= 5:
+            dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+class ServidorFalso:
+    """
+    Sobe o refeitório e o bot falsos numa thread. Os contadores ficam em `estatisticas`.
+
+    Args:
+        latencia (float): Atraso médio (segundos) de cada resposta do refeitório.
+        taxa_erro (float): Fração dos POSTs de pedido que falham (500 ou aviso de erro).
+        taxa_erro_bot (float): Fração dos envios ao bot que respondem 503.
+    """
+
+    def __init__(self, porta: int = 0, latencia: float = 0.05, taxa_erro: float = 0.0,
+                 taxa_erro_bot: float = 0.0, semente: int = 42):
+        self.latencia = latencia
+        self.taxa_erro = taxa_erro
+        self.taxa_erro_bot = taxa_erro_bot
+        self._aleatorio = random.Random(semente)
+        self._trava = threading.Lock()
+        self._tickets = set()
+        self.estatisticas = {
+            'get_home': 0, 'nao_modificado': 0, 'pedidos': 0, 'pedidos_ok': 0,
+            'pedidos_repetidos': 0, 'pedidos_erro': 0, 'csrf_recusado': 0,
+            'mensagens_bot': 0, 'mensagens_bot_503': 0,
+        }
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', porta), self._criar_tratador())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def porta(self) -> int:
+        return self._servidor.server_address[1]
+
+    @property
+    def url_site(self) -> str:
+        return f'http://127.0.0.1:{self.porta}/home'
+
+    @property
+    def url_bot(self) -> str:
+        return f'http://127.0.0.1:{self.porta}/send-message'
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name='servidor-falso', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _contar(self, evento: str):
+        with self._trava:
+            self.estatisticas[evento] += 1
+
+    def _sortear(self) -> float:
+        with self._trava:
+            return self._aleatorio.random()
+
+    def _esperar(self):
+        if self.latencia > 0:
+            with self._trava:
+                atraso = self._aleatorio.uniform(0.5, 1.5) * self.latencia
+            time.sleep(atraso)
+
+    def pagina(self, token: str, alerta: str = '') -> str:
+        banners = []
+        for i, dia in enumerate(dias_uteis(date.today(), 7)):
+            opcao_1, opcao_2 = PRATOS[i % len(PRATOS)]
+            banners.append(BANNER.format(dia=dia.day, mes=MESES[dia.month - 1], ano=dia.year,
+                                         opcao_1=opcao_1, opcao_2=opcao_2))
+        return CABECALHO + alerta + ''.join(banners) + RODAPE.format(token=token)
+
+    def _criar_tratador(self):
+        servidor = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status: int, corpo: str, cabecalhos: dict | None = None,
+                           tipo: str = 'text/html; charset=utf-8'):
+                dados = corpo.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(dados)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _ler_corpo(self) -> bytes:
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            def _token_do_cookie(self) -> str | None:
+                for parte in (self.headers.get('Cookie') or '').split(';'):
+                    nome, _, valor = parte.strip().partition('=')
+                    if nome == 'csrftoken':
+                        return valor
+                return None
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/home':
+                    self._responder(404, 'não encontrado')
+                    return
+                servidor._esperar()
+                servidor._contar('get_home')
+
+                token = self._token_do_cookie() or secrets.token_hex(16)
+                corpo = servidor.pagina(token)
+                etag = '"' + hashlib.sha256(corpo.encode('utf-8')).hexdigest()[:16] + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    servidor._contar('nao_modificado')
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self._responder(200, corpo, {'Set-Cookie': f'csrftoken={token}; Path=/', 'ETag': etag})
+
+            def do_POST(self):
+                caminho = self.path.split('?')[0]
+                corpo = self._ler_corpo()
+                if caminho == '/send-message':
+                    self._tratar_bot(corpo)
+                elif caminho == '/home':
+                    self._tratar_pedido(corpo)
+                else:
+                    self._responder(404, 'não encontrado')
+
+            def _tratar_bot(self, corpo: bytes):
+                servidor._contar('mensagens_bot')
+                if servidor._sortear() < servidor.taxa_erro_bot:
+                    servidor._contar('mensagens_bot_503')
+                    self._responder(503, json.dumps({'erro': 'WhatsApp offline'}), tipo='application/json')
+                    return
+                self._responder(200, json.dumps({'ok': True}), tipo='application/json')
+
+            def _tratar_pedido(self, corpo: bytes):
+                servidor._esperar()
+                servidor._contar('pedidos')
+                dados = {k: v[0] for k, v in parse_qs(corpo.decode('utf-8')).items()}
+                token = self._token_do_cookie()
+
+                if not token or dados.get('csrfmiddlewaretoken') != token:
+                    servidor._contar('csrf_recusado')
+                    self._responder(403, '<h1>Forbidden (403)</h1><p>CSRF verification failed.</p>')
+                    return
+
+                sorteio = servidor._sortear()
+                if sorteio < servidor.taxa_erro / 2:
+                    servidor._contar('pedidos_erro')
+                    self._responder(500, '<h1>Server Error (500)</h1>')
+                    return
+                if sorteio < servidor.taxa_erro:
+                    servidor._contar('pedidos_erro')
+                    alerta = ALERTA.format(tipo='danger', titulo='Erro!', texto=ERROS_SITE[0])
+                    self._responder(200, servidor.pagina(token, alerta))
+                    return
+
+                prontuario = dados.get('prontuario', '')
+                with servidor._trava:
+                    repetido = prontuario in servidor._tickets
+                    servidor._tickets.add(prontuario)
+                if repetido:
+                    servidor._contar('pedidos_repetidos')
+                    texto = f'Ticket Gerado anteriormente para o prontuário {prontuario}.'
+                    alerta = ALERTA.format(tipo='danger', titulo='Erro!', texto=texto)
+                else:
+                    servidor._contar('pedidos_ok')
+                    texto = f'Ticket gerado para o prontuário {prontuario}.'
+                    alerta = ALERTA.format(tipo='success', titulo='Sucesso!', texto=texto)
+                self._responder(200, servidor.pagina(token, alerta))
+
+        return Tratador
+
+def main():
+    parser = argparse.ArgumentParser(description='Refeitório + bot falsos para testes locais.')
+    parser.add_argument('--porta', type=int, default=8099)
+    parser.add_argument('--latencia', type=float, default=0.05, help='atraso médio por resposta (s)')
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='fração de pedidos com erro')
+    parser.add_argument('--taxa-erro-bot', type=float, default=0.0, help='fração de envios ao bot com 503')
+    args = parser.parse_args()
+
+    servidor = ServidorFalso(args.porta, args.latencia, args.taxa_erro, args.taxa_erro_bot).iniciar()
+    print(f"Refeitório falso em {servidor.url_site} | bot em {servidor.url_bot} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(servidor.estatisticas, indent=2))
+        servidor.parar()
+
+if __name__ == '__main__':
+    main()
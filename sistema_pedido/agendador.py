@@ -0,0 +1,75 @@
+import time
+import random
+import logging
+from datetime import datetime, timedelta
+from sistema_pedido.configuracao import (
+    FUSO_HORARIO, HORA_CORTE, MINUTO_CORTE, JANELA_DESPACHO, FOLGA_CORTE_MINUTOS,
+    ESPACAMENTO_MINIMO, TEMPO_ESPERA_ERRO, MODO_HTTP
+)
+from sistema_pedido.metricas import observar
+from sistema_pedido.perfilador import perfil_ativo
+
+def calcular_prazo(agora: datetime) -> datetime:
+    """
+    Calcula até quando os pedidos devem estar despachados.
+    O alvo é terminar FOLGA_CORTE_MINUTOS antes do horário de corte; se a execução já
+    começou dentro dessa folga (ex: rodada das 13:00), usa o próprio corte. A janela
+    nunca passa de JANELA_DESPACHO segundos, então a duração da execução tem teto fixo.
+    """
+    corte = agora.replace(hour=HORA_CORTE, minute=MINUTO_CORTE, second=0, microsecond=0)
+    prazo = corte - timedelta(minutes=FOLGA_CORTE_MINUTOS)
+
+    if prazo <= agora:
+        prazo = corte if corte > agora else agora + timedelta(seconds=JANELA_DESPACHO)
+
+    return min(prazo, agora + timedelta(seconds=JANELA_DESPACHO))
+
+def planejar_despachos(quantidade: int, inicio: datetime, prazo: datetime,
+                       espacamento: float = ESPACAMENTO_MINIMO) -> list[datetime]:
+    """
+    Sorteia os horários de envio de `quantidade` pedidos entre `inicio` e `prazo`.
+
+    A janela é dividida em fatias iguais e cada pedido cai num ponto aleatório da sua
+    fatia, o que mantém o jeito "humano" e garante pelo menos `espacamento` segundos
+    entre dois envios. Se a janela não comporta o espaçamento mínimo, ela é esticada.
+
+    Returns:
+        list[datetime]: Horários em ordem crescente, um por pedido.
+    """
+    if quantidade <= 0:
+        return []
+
+    janela = max((prazo - inicio).total_seconds(), 0)
+    fatia = max(janela / quantidade, espacamento)
+
+    if fatia * quantidade > janela:
+        logging.warning(
+            f"⚠️ {quantidade} pedidos com {espacamento}s de espaçamento não cabem na janela "
+            f"de {janela:.0f}s; a execução vai passar do prazo ({prazo.strftime('%H:%M:%S')})."
+        )
+
+    return [
+        inicio + timedelta(seconds=i * fatia + random.uniform(0, fatia - espacamento))
+        for i in range(quantidade)
+    ]
+
+def aguardar_ate(instante: datetime) -> float:
+    """
+    Dorme até o horário informado (se ainda não passou). Retorna quantos segundos dormiu.
+    Perfilando uma reprodução (MODO_HTTP=reproduzir) não dorme: o sorteio de horários só
+    atrapalharia a medição. Contra o site real o espaçamento é mantido sempre.
+    """
+    espera = (instante - datetime.now(FUSO_HORARIO)).total_seconds()
+    if espera > 0 and not (perfil_ativo() and MODO_HTTP == 'reproduzir'):
+        time.sleep(espera)
+        observar('espera_agendada_segundos', espera)
+        return espera
+    return 0.0
+
+def espera_retentativa(prazo: datetime, espera: float = TEMPO_ESPERA_ERRO) -> float:
+    """
+    Quanto esperar antes de tentar de novo: `espera` (a da política da categoria do erro),
+    mas sem passar do prazo. Com a folga esgotada, a nova tentativa é feita na hora.
+    """
+    folga = (prazo - datetime.now(FUSO_HORARIO)).total_seconds()
+    return max(0.0, min(espera, folga))
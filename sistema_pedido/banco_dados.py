@@ -1,40 +1,132 @@
-import psycopg
+import json
+import atexit
 import logging
-from sistema_pedido.configuracao import URL_BANCO_DADOS
+import threading
+from datetime import datetime
+import psycopg
+from psycopg_pool import ConnectionPool
+from sistema_pedido.configuracao import (
+    URL_BANCO_DADOS, FUSO_HORARIO, POOL_MIN_CONEXOES, POOL_MAX_CONEXOES, POOL_TEMPO_ESPERA,
+    TAMANHO_LOTE_ESCRITA, INTERVALO_ESCRITA, TENTATIVAS_ESCRITA, ARQUIVO_ESCRITAS_REJEITADAS
+)
+from sistema_pedido.metricas import cronometrar
+from sistema_pedido.migracoes import aplicar_migracoes, status_do_motivo
+from sistema_pedido.particoes import garantir_particoes
+
+# Pool único do processo: todas as funções deste módulo pegam conexões daqui
+_pool = None
+_trava_pool = threading.Lock()
+
+def _obter_pool() -> ConnectionPool:
+    """
+    Cria (na primeira chamada) e devolve o pool de conexões compartilhado.
+    As conexões são verificadas antes de serem entregues, então uma conexão
+    derrubada pelo servidor é descartada em vez de quebrar a consulta.
+    """
+    global _pool
+    with _trava_pool:
+        if _pool is None:
+            _migrar_esquema()
+            _pool = ConnectionPool(
+                URL_BANCO_DADOS,
+                min_size=POOL_MIN_CONEXOES,
+                max_size=max(POOL_MAX_CONEXOES, POOL_MIN_CONEXOES),
+                timeout=POOL_TEMPO_ESPERA,
+                check=ConnectionPool.check_connection,
+                name='sistema_pedido',
+                open=True,
+            )
+        return _pool
+
+_esquema_migrado = False
+
+class EsquemaDesatualizado(RuntimeError):
+    """As migrações pendentes não puderam ser aplicadas: o código não pode rodar contra este banco."""
+
+def _migrar_esquema():
+    """
+    Aplica as migrações pendentes e cria as partições dos próximos meses de 'pedido'
+    (uma vez por processo, antes da primeira conexão do pool). Se as migrações falharem,
+    levanta EsquemaDesatualizado e tenta de novo na próxima abertura do pool.
+    """
+    global _esquema_migrado
+    if _esquema_migrado:
+        return
+    try:
+        versoes = aplicar_migracoes()
+    except Exception as e:
+        logging.error(f"❌ Erro ao aplicar as migrações do banco: {e}")
+        raise EsquemaDesatualizado(f"Migrações do banco não aplicadas: {e}") from e
+    if versoes:
+        logging.info(f"🧱 Esquema do banco migrado: versões {versoes} aplicadas.")
+    _esquema_migrado = True
+    try:
+        garantir_particoes()
+    except Exception as e:
+        # Sem partição nova as linhas vão para pedido_padrao; o daemon tenta de novo todo dia
+        logging.error(f"❌ Erro ao criar as partições de pedido: {e}")
 
-def buscar_cancelamento_direto(aluno_id: int, data_pedido) -> bool:
+def abrir_pool():
     """
-    Verifica se existe um pedido cancelado diretamente para este aluno nesta data.
-    Retorna True se o aluno já cancelou (e portanto não devemos pedir).
+    Abre o pool (aplicando as migrações pendentes) e espera as POOL_MIN_CONEXOES primeiras
+    conexões ficarem prontas. Chamada no início de cada execução e pelo daemon, para começar
+    com o banco já aquecido. Levanta EsquemaDesatualizado se as migrações falharem, para a
+    execução parar em vez de rodar contra um esquema antigo.
     """
     if not URL_BANCO_DADOS:
-        return False
-        
+        return
     try:
-        with psycopg.connect(URL_BANCO_DADOS) as conexao:
-            with conexao.cursor() as cursor:
-                cursor.execute("""
-                    SELECT 1 
-                      FROM pedido
-                     WHERE aluno_id = %s
-                       AND dia_pedido = %s
-                       AND motivo LIKE 'CANCELADO_DIRETAMENTE%%';
-                """, (aluno_id, data_pedido))
-                resultado = cursor.fetchone()
-                return resultado is not None
+        _obter_pool().wait(timeout=POOL_TEMPO_ESPERA)
+    except EsquemaDesatualizado:
+        raise
     except Exception as e:
-        logging.error(f"Erro ao buscar cancelamento direto: {e}")
-        return False
+        logging.error(f"❌ Erro ao abrir o pool do banco: {e}")
 
-def buscar_alunos_para_dia(dia_da_semana: int) -> list[dict]:
+def estatisticas_pool() -> dict:
+    """
+    Retorna os contadores do pool (sem zerá-los).
+    Os mais úteis: 'requests_num' (checkouts), 'requests_wait_ms' (tempo total
+    esperando conexão) e 'connections_num' (handshakes realmente feitos).
     """
-    Busca alunos que têm preferência para almoçar no dia da semana especificado.
-    
+    if _pool is None:
+        return {}
+    return _pool.get_stats()
+
+def fechar_pool():
+    """
+    Grava o que ainda estiver pendente e fecha todas as conexões do pool.
+    Deve ser chamada ao final da execução.
+    """
+    global _pool
+    descarregar_escritas()
+    _rejeitar_pendentes()
+    with _trava_pool:
+        if _pool is None:
+            return
+        estatisticas = _pool.get_stats()
+        _pool.close()
+        _pool = None
+
+    logging.info(
+        "🔌 Pool do banco fechado: %s checkouts, %s conexões abertas, %s ms esperando conexão.",
+        estatisticas.get('requests_num', 0),
+        estatisticas.get('connections_num', 0),
+        estatisticas.get('requests_wait_ms', 0),
+    )
+
+@cronometrar('db_segundos')
+def buscar_contexto_do_dia(dia_da_semana: int, data_pedido) -> list[dict]:
+    """
+    Carrega de uma vez só tudo que o loop de pedidos precisa saber sobre cada aluno,
+    substituindo as consultas individuais (cancelamento, bloqueios e telefone).
+
     Args:
         dia_da_semana (int): 1=Segunda, ..., 5=Sexta
-    
+        data_pedido (date): Dia para o qual o pedido será feito.
+
     Returns:
-        list[dict]: Lista de dicionários com 'id' e 'prontuario'.
+        list[dict]: Um dicionário por aluno com 'id', 'prontuario', 'bloqueios'
+        (lista de nomes), 'cancelou' (bool) e 'telefone' (str ou None).
     """
     if not URL_BANCO_DADOS:
         logging.error("❌ URL do banco não configurada!")
@@ -42,110 +134,432 @@ def buscar_alunos_para_dia(dia_da_semana: int) -> list[dict]:
 
     alunos = []
     try:
-        with psycopg.connect(URL_BANCO_DADOS) as conexao:
+        with _obter_pool().connection() as conexao:
             with conexao.cursor() as cursor:
-                # Seleciona alunos ativos que marcaram este dia da semana
                 cursor.execute("""
-                    SELECT DISTINCT a.id, a.prontuario
+                    SELECT a.id,
+                           a.prontuario,
+                           COALESCE(b.nomes, ARRAY[]::text[]) AS bloqueios,
+                           EXISTS (
+                               SELECT 1
+                                 FROM pedido pe
+                                WHERE pe.aluno_id = a.id
+                                  AND pe.dia_pedido = %s
+                                  AND pe.status = 'CANCELADO'
+                           ) AS cancelou,
+                           (SELECT c.telefone
+                              FROM contato c
+                             WHERE c.aluno_id = a.id
+                             LIMIT 1) AS telefone
                       FROM aluno a
-                      JOIN preferencia_dia p ON p.aluno_id = a.id
+                      LEFT JOIN LATERAL (
+                           SELECT array_agg(pb.nome ORDER BY pb.nome) AS nomes
+                             FROM prato_bloqueado pb
+                            WHERE pb.aluno_id = a.id
+                      ) b ON true
                      WHERE a.ativo = true
-                       AND p.dia_semana = %s
+                       AND EXISTS (
+                           SELECT 1
+                             FROM preferencia_dia p
+                            WHERE p.aluno_id = a.id
+                              AND p.dia_semana = %s
+                       )
                      ORDER BY a.prontuario;
-                """, (dia_da_semana,))
-                
-                for (id_aluno, prontuario) in cursor.fetchall():
-                    alunos.append({'id': id_aluno, 'prontuario': prontuario})
-                    
+                """, (data_pedido, dia_da_semana))
+
+                for (id_aluno, prontuario, bloqueios, cancelou, telefone) in cursor.fetchall():
+                    alunos.append({
+                        'id': id_aluno,
+                        'prontuario': prontuario,
+                        'bloqueios': list(bloqueios),
+                        'cancelou': cancelou,
+                        'telefone': telefone,
+                    })
+
         return alunos
     except Exception as e:
-        logging.error(f"❌ Erro no banco ao buscar alunos: {e}")
+        logging.error(f"❌ Erro no banco ao carregar contexto do dia: {e}")
         return []
 
-def buscar_telefone_aluno(aluno_id: int) -> str | None:
+# === Escrita em lote ===
+# Histórico, cardápio, mensagens da caixa de saída, diário da execução e itens concluídos da
+# fila não vão direto para o banco: ficam num buffer em memória e são gravados juntos
+# (COPY + upserts multi-linha) numa única transação.
+_historico_pendente = []   # (aluno_id, dia_pedido, motivo, status)
+_pratos_pendentes = {}     # {dia_referente: prato_nome} (o último valor do dia vence)
+_mensagens_pendentes = {}  # {chave_idempotencia: (telefone, mensagem)}
+_diario_pendente = {}      # {(dia_pedido, aluno_id): (prontuario, sucesso, mensagem, inicio, fim, tentativas, final)}
+_fila_pendente = set()     # {(dia_pedido, aluno_id)} concluídos no modo fila cuja gravação direta falhou
+_trava_buffer = threading.Lock()
+_trava_descarga = threading.Lock()
+_sinal_descarga = threading.Event()
+_descarregador = None
+
+def _iniciar_descarregador():
+    """Sobe (uma vez) a thread que grava o buffer a cada INTERVALO_ESCRITA segundos."""
+    global _descarregador
+    if _descarregador is not None:
+        return
+
+    def _laco():
+        while True:
+            _sinal_descarga.wait(INTERVALO_ESCRITA)
+            _sinal_descarga.clear()
+            descarregar_escritas()
+
+    _descarregador = threading.Thread(target=_laco, name='descarregador-banco', daemon=True)
+    _descarregador.start()
+
+def _agendar_descarga():
+    """Chamada após cada inclusão no buffer: antecipa a gravação se o lote encheu."""
+    _iniciar_descarregador()
+    pendentes = (
+        len(_historico_pendente) + len(_pratos_pendentes) + len(_mensagens_pendentes)
+        + len(_diario_pendente) + len(_fila_pendente)
+    )
+    if pendentes >= TAMANHO_LOTE_ESCRITA:
+        _sinal_descarga.set()
+
+# --- Gravação de cada grupo do lote (itens em lista, para o lote poder ser dividido) ---
+
+def _gravar_historico(cursor, linhas):
+    with cursor.copy("COPY pedido (aluno_id, dia_pedido, motivo, status) FROM STDIN") as copia:
+        for linha in linhas:
+            copia.write_row(linha)
+
+def _gravar_pratos(cursor, itens):
+    dias, pratos = zip(*itens)
+    cursor.execute("""
+        INSERT INTO proximo_prato (dia_referente, prato_nome, updated_at)
+        SELECT dia, prato, NOW()
+          FROM unnest(%s::date[], %s::text[]) AS novo(dia, prato)
+        ON CONFLICT (dia_referente)
+        DO UPDATE SET prato_nome = EXCLUDED.prato_nome, updated_at = NOW()
+        WHERE proximo_prato.prato_nome IS DISTINCT FROM EXCLUDED.prato_nome;
+    """, (list(dias), list(pratos)))
+
+def _gravar_mensagens(cursor, itens):
+    chaves, valores = zip(*itens)
+    telefones, textos = zip(*valores)
+    cursor.execute("""
+        INSERT INTO mensagem_saida (chave_idempotencia, telefone, mensagem)
+        SELECT chave, telefone, mensagem
+          FROM unnest(%s::text[], %s::text[], %s::text[]) AS nova(chave, telefone, mensagem)
+        ON CONFLICT (chave_idempotencia) DO NOTHING;
+    """, (list(chaves), list(telefones), list(textos)))
+
+def _gravar_diario(cursor, itens):
+    chaves, valores = zip(*itens)
+    dias, ids = zip(*chaves)
+    colunas = list(zip(*valores))
+    cursor.execute("""
+        INSERT INTO diario_execucao (dia_pedido, aluno_id, prontuario, sucesso, mensagem,
+                                     hora_inicio, hora_fim, tentativas, final)
+        SELECT * FROM unnest(%s::date[], %s::int[], %s::text[], %s::bool[], %s::text[],
+                             %s::text[], %s::text[], %s::int[], %s::bool[])
+        ON CONFLICT (dia_pedido, aluno_id) DO UPDATE
+           SET prontuario = EXCLUDED.prontuario, sucesso = EXCLUDED.sucesso,
+               mensagem = EXCLUDED.mensagem, hora_inicio = EXCLUDED.hora_inicio,
+               hora_fim = EXCLUDED.hora_fim, tentativas = EXCLUDED.tentativas,
+               final = EXCLUDED.final, atualizado_em = NOW();
+    """, (list(dias), list(ids), *[list(coluna) for coluna in colunas]))
+
+def _gravar_fila(cursor, itens):
+    dias, ids = zip(*itens)
+    cursor.execute("""
+        UPDATE fila_pedido f
+           SET estado = 'concluido', reservado_ate = NULL
+          FROM unnest(%s::date[], %s::int[]) AS feito(dia, aluno)
+         WHERE f.dia_pedido = feito.dia
+           AND f.aluno_id = feito.aluno;
+    """, (list(dias), list(ids)))
+
+# Ordem de gravação; a fila vem depois do diário (item concluído só com o resultado gravado)
+_GRUPOS_ESCRITA = (
+    ('historico', _gravar_historico),
+    ('pratos', _gravar_pratos),
+    ('mensagens', _gravar_mensagens),
+    ('diario', _gravar_diario),
+    ('fila', _gravar_fila),
+)
+
+# Descargas seguidas em que cada linha falhou: {(grupo, chave da linha): falhas}
+_tentativas_escrita = {}
+
+def _chave_escrita(grupo: str, item) -> tuple:
+    # Nos grupos que vêm de dicionário o item é (chave, valor); a chave identifica a linha
+    return (grupo, item[0] if grupo in ('pratos', 'mensagens', 'diario') else item)
+
+def _gravar_em_partes(gravar, itens: list) -> list:
     """
-    Busca o número de telefone vinculado a um aluno na tabela contato.
-    Retorna o primeiro telefone encontrado ou None.
+    Grava `itens` numa transação própria; se falhar, divide ao meio e tenta cada metade,
+    até isolar as linhas ruins. Devolve [(item, erro)] das que não entraram. Com o banco
+    fora do ar (OperationalError) não adianta dividir: devolve tudo de uma vez.
     """
-    if not URL_BANCO_DADOS:
-        return None
-
     try:
-        with psycopg.connect(URL_BANCO_DADOS) as conexao:
+        with _obter_pool().connection() as conexao:
             with conexao.cursor() as cursor:
-                cursor.execute("""
-                    SELECT telefone
-                      FROM contato
-                     WHERE aluno_id = %s
-                     LIMIT 1;
-                """, (aluno_id,))
-                resultado = cursor.fetchone()
-                return resultado[0] if resultado else None
+                gravar(cursor, itens)
+        return []
     except Exception as e:
-        logging.error(f"Erro ao buscar telefone do aluno {aluno_id}: {e}")
-        return None
+        if len(itens) == 1 or isinstance(e, psycopg.OperationalError):
+            return [(item, str(e)) for item in itens]
+        meio = len(itens) // 2
+        return _gravar_em_partes(gravar, itens[:meio]) + _gravar_em_partes(gravar, itens[meio:])
 
-def buscar_pratos_bloqueados(prontuario: str) -> list[str]:
-    """Retorna lista de nomes de pratos que o aluno bloqueou."""
-    if not URL_BANCO_DADOS:
-        return []
+def _gravar_separado(lote: dict) -> dict:
+    """Grava cada grupo do lote separadamente, dividindo os que falham. Devolve {grupo: [(item, erro)]}."""
+    falhas = {}
+    for grupo, gravar in _GRUPOS_ESCRITA:
+        itens = lote[grupo]
+        falhas[grupo] = []
+        if grupo == 'fila':
+            # Sem o resultado no diário o item não pode aparecer como concluído
+            sem_diario = {chave for (chave, _), _ in falhas['diario']}
+            falhas[grupo] = [(item, 'resultado do diário não gravado') for item in itens if item in sem_diario]
+            itens = [item for item in itens if item not in sem_diario]
+        if itens:
+            falhas[grupo] += _gravar_em_partes(gravar, itens)
+    return falhas
 
+def _rejeitar_escritas(rejeitadas: list):
+    """Acrescenta as linhas desistidas [(grupo, item, erro)] ao ARQUIVO_ESCRITAS_REJEITADAS."""
+    agora = datetime.now(FUSO_HORARIO).isoformat()
     try:
-        with psycopg.connect(URL_BANCO_DADOS) as conexao:
-            with conexao.cursor() as cursor:
-                cursor.execute("""
-                    SELECT pb.nome
-                      FROM prato_bloqueado pb
-                      JOIN aluno a ON a.id = pb.aluno_id
-                     WHERE a.prontuario = %s
-                     ORDER BY pb.nome;
-                """, (prontuario,))
-                # Retorna apenas uma lista de strings (ex: ['frango', 'peixe'])
-                return [linha[0] for linha in cursor.fetchall()]
+        with open(ARQUIVO_ESCRITAS_REJEITADAS, 'a', encoding='utf-8') as arquivo:
+            for grupo, item, erro in rejeitadas:
+                arquivo.write(json.dumps(
+                    {'em': agora, 'grupo': grupo, 'linha': item, 'erro': erro}, ensure_ascii=False, default=str
+                ) + '\n')
+        logging.error(f"🗑️ {len(rejeitadas)} linhas desistidas do banco gravadas em {ARQUIVO_ESCRITAS_REJEITADAS}.")
     except Exception as e:
-        logging.error(f"Erro ao buscar bloqueios do prontuário {prontuario}: {e}")
-        return []
+        logging.error(f"❌ Erro ao gravar {len(rejeitadas)} linhas rejeitadas em {ARQUIVO_ESCRITAS_REJEITADAS}: {e}")
+
+def _devolver_ao_buffer(lote: dict, falhas: dict):
+    """
+    Conta mais uma falha para cada linha que não entrou: volta para o buffer (na frente,
+    mantendo a ordem) até TENTATIVAS_ESCRITA, depois vai para as rejeitadas. As linhas
+    do lote que entraram zeram a contagem.
+    """
+    global _historico_pendente, _pratos_pendentes, _mensagens_pendentes, _diario_pendente
+    anteriores = {}
+    if _tentativas_escrita:
+        for grupo, itens in lote.items():
+            for item in itens:
+                chave = _chave_escrita(grupo, item)
+                if chave in _tentativas_escrita:
+                    anteriores[chave] = _tentativas_escrita.pop(chave)
+
+    devolvidas = {grupo: [] for grupo in lote}
+    rejeitadas = []
+    for grupo, itens in falhas.items():
+        for item, erro in itens:
+            chave = _chave_escrita(grupo, item)
+            tentativas = anteriores.get(chave, 0) + 1
+            if tentativas >= TENTATIVAS_ESCRITA:
+                rejeitadas.append((grupo, item, erro))
+            else:
+                _tentativas_escrita[chave] = tentativas
+                devolvidas[grupo].append(item)
+
+    if rejeitadas:
+        _rejeitar_escritas(rejeitadas)
+
+    # O que entrou no buffer durante a gravação é mais novo e vence nos dicionários
+    with _trava_buffer:
+        _historico_pendente = devolvidas['historico'] + _historico_pendente
+        _pratos_pendentes = {**dict(devolvidas['pratos']), **_pratos_pendentes}
+        _mensagens_pendentes = {**dict(devolvidas['mensagens']), **_mensagens_pendentes}
+        _diario_pendente = {**dict(devolvidas['diario']), **_diario_pendente}
+        _fila_pendente.update(devolvidas['fila'])
+
+def _rejeitar_pendentes():
+    """No encerramento: o que a última descarga devolveu ao buffer vai para as rejeitadas em vez de se perder."""
+    global _historico_pendente, _pratos_pendentes, _mensagens_pendentes, _diario_pendente, _fila_pendente
+    with _trava_buffer:
+        restantes = (
+            [('historico', item) for item in _historico_pendente]
+            + [('pratos', item) for item in _pratos_pendentes.items()]
+            + [('mensagens', item) for item in _mensagens_pendentes.items()]
+            + [('diario', item) for item in _diario_pendente.items()]
+            + [('fila', item) for item in _fila_pendente]
+        )
+        _historico_pendente, _pratos_pendentes, _mensagens_pendentes = [], {}, {}
+        _diario_pendente, _fila_pendente = {}, set()
+    if restantes:
+        _rejeitar_escritas([(grupo, item, 'não gravado até o encerramento') for grupo, item in restantes])
+
+@cronometrar('db_segundos')
+def descarregar_escritas():
+    """
+    Grava no banco tudo que está no buffer (histórico, cardápio, mensagens, diário e itens
+    concluídos da fila) numa transação só. Se a transação falhar, cada grupo é gravado à
+    parte e os que falham são divididos ao meio até isolar as linhas ruins; só essas
+    voltam para o buffer, e cada uma no máximo TENTATIVAS_ESCRITA vezes antes de ir para
+    ARQUIVO_ESCRITAS_REJEITADAS. O item da fila só aparece como concluído junto com o
+    resultado do aluno no diário.
+    """
+    global _historico_pendente, _pratos_pendentes, _mensagens_pendentes, _diario_pendente, _fila_pendente
+    if not URL_BANCO_DADOS:
+        return
+
+    with _trava_descarga:
+        with _trava_buffer:
+            lote = {
+                'historico': _historico_pendente,
+                'pratos': list(_pratos_pendentes.items()),
+                'mensagens': list(_mensagens_pendentes.items()),
+                'diario': list(_diario_pendente.items()),
+                'fila': list(_fila_pendente),
+            }
+            _historico_pendente, _pratos_pendentes, _mensagens_pendentes = [], {}, {}
+            _diario_pendente, _fila_pendente = {}, set()
+
+        if not any(lote.values()):
+            return
+
+        resumo = (
+            f"{len(lote['historico'])} pedidos, {len(lote['pratos'])} pratos, {len(lote['mensagens'])} mensagens, "
+            f"{len(lote['diario'])} resultados no diário e {len(lote['fila'])} itens da fila"
+        )
+        try:
+            with _obter_pool().connection() as conexao:
+                with conexao.cursor() as cursor:
+                    for grupo, gravar in _GRUPOS_ESCRITA:
+                        if lote[grupo]:
+                            gravar(cursor, lote[grupo])
+                conexao.commit()
+            logging.info(f"💾 Gravados em lote: {resumo}.")
+            falhas = {}
+        except Exception as e:
+            logging.error(f"❌ Erro ao gravar lote no banco ({resumo}): {e}")
+            if isinstance(e, psycopg.OperationalError):
+                # Banco fora do ar: dividir o lote só multiplicaria as tentativas de conexão
+                falhas = {grupo: [(item, str(e)) for item in itens] for grupo, itens in lote.items()}
+            else:
+                logging.warning("⚠️ Gravando o lote por partes para isolar as linhas com erro...")
+                falhas = _gravar_separado(lote)
+
+        if falhas or _tentativas_escrita:
+            _devolver_ao_buffer(lote, falhas)
+
+# Garante a gravação do que sobrou (e o fechamento do pool) mesmo se o processo
+# terminar por um erro fatal fora de principal()
+atexit.register(fechar_pool)
 
 def registrar_historico_pedido(aluno_id: int, data_pedido, motivo: str):
-    """Salva no banco o resultado da tentativa de pedido (sucesso, erro ou pulo)."""
+    """
+    Salva no banco o resultado da tentativa de pedido (sucesso, erro ou pulo).
+    A linha entra no buffer de escrita e é gravada no próximo lote.
+    """
     if not URL_BANCO_DADOS:
         return
 
     # Corta o motivo para caber no banco se for muito grande
     motivo_seguro = (motivo or "")[:800]
-    
-    try:
-        with psycopg.connect(URL_BANCO_DADOS) as conexao:
-            with conexao.cursor() as cursor:
-                cursor.execute("""
-                    INSERT INTO pedido (aluno_id, dia_pedido, motivo)
-                    VALUES (%s, %s, %s)
-                """, (aluno_id, data_pedido, motivo_seguro))
-            conexao.commit()
-    except Exception as e:
-        logging.error(f"❌ Erro ao salvar histórico do pedido: {e}")
+
+    with _trava_buffer:
+        _historico_pendente.append((aluno_id, data_pedido, motivo_seguro, status_do_motivo(motivo_seguro)))
+    _agendar_descarga()
 
 def atualizar_prato_dia(data_referencia, nome_prato: str):
     """
     Salva ou atualiza o prato do dia na tabela 'proximo_prato'.
     Isso permite que o Bot do WhatsApp saiba qual é o prato atual.
+    A gravação acontece no próximo lote do buffer de escrita.
     """
     if not URL_BANCO_DADOS:
         return
 
+    with _trava_buffer:
+        _pratos_pendentes[data_referencia] = nome_prato
+    _agendar_descarga()
+
+def enfileirar_mensagem(telefone: str, mensagem: str, chave_idempotencia: str):
+    """
+    Coloca uma mensagem de WhatsApp na caixa de saída (tabela 'mensagem_saida').
+    Vai para o banco no mesmo lote do histórico de pedidos; a entrega é feita depois
+    por servicos/caixa_saida.py. Uma chave repetida é ignorada, então rodar o mesmo
+    dia de novo não manda a mesma mensagem duas vezes.
+    """
+    if not URL_BANCO_DADOS or not telefone:
+        return
+
+    with _trava_buffer:
+        _mensagens_pendentes.setdefault(chave_idempotencia, (telefone, mensagem))
+    _agendar_descarga()
+
+def registrar_diario_execucao(data_pedido, aluno_id: int, resultado: tuple, final: bool):
+    """
+    Anota no diário da execução o resultado de um aluno para o dia do pedido.
+    `resultado` é a tupla do relatório (prontuario, sucesso, mensagem, inicio, fim, tentativas);
+    `final` indica que o aluno não precisa ser processado de novo se a execução for retomada.
+    Vai para o banco no mesmo lote do histórico de pedidos.
+    """
+    if not URL_BANCO_DADOS:
+        return
+
+    prontuario, sucesso, mensagem, hora_inicio, hora_fim, tentativas = resultado
+    with _trava_buffer:
+        _diario_pendente[(data_pedido, aluno_id)] = (
+            prontuario, bool(sucesso), (mensagem or '')[:800], hora_inicio, hora_fim, tentativas, final
+        )
+    _agendar_descarga()
+
+@cronometrar('db_segundos')
+def buscar_diario_execucao(data_pedido, somente_finais: bool = True) -> dict:
+    """
+    Lê os resultados já anotados no diário para o dia do pedido (por padrão só os FINAIS;
+    o relatório do modo fila lê todos). Retorna
+    {aluno_id: (prontuario, sucesso, mensagem, inicio, fim, tentativas)}.
+    """
+    if not URL_BANCO_DADOS:
+        return {}
+
     try:
-        with psycopg.connect(URL_BANCO_DADOS) as conexao:
+        with _obter_pool().connection() as conexao:
             with conexao.cursor() as cursor:
                 cursor.execute("""
-                    INSERT INTO proximo_prato (dia_referente, prato_nome, updated_at)
-                    VALUES (%s, %s, NOW())
-                    ON CONFLICT (dia_referente) 
-                    DO UPDATE SET prato_nome = EXCLUDED.prato_nome, updated_at = NOW();
-                """, (data_referencia, nome_prato))
+                    SELECT aluno_id, prontuario, sucesso, mensagem, hora_inicio, hora_fim, tentativas
+                      FROM diario_execucao
+                     WHERE dia_pedido = %s
+                       AND (final OR NOT %s);
+                """, (data_pedido, somente_finais))
+                linhas = cursor.fetchall()
             conexao.commit()
+        return {linha[0]: tuple(linha[1:]) for linha in linhas}
     except Exception as e:
-        logging.error(f"❌ Erro ao salvar prato do dia no banco: {e}")
+        logging.error(f"Erro ao ler o diário da execução de {data_pedido}: {e}")
+        return {}
+
+@cronometrar('db_segundos')
+def buscar_pratos_por_datas(datas) -> dict:
+    """
+    Busca numa única consulta os pratos salvos para várias datas.
+    Retorna {data: nome_do_prato} só com as datas encontradas.
+    """
+    if not URL_BANCO_DADOS or not datas:
+        return {}
 
+    pratos = {}
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    SELECT dia_referente, prato_nome
+                      FROM proximo_prato
+                     WHERE dia_referente = ANY(%s);
+                """, (list(datas),))
+                pratos = dict(cursor.fetchall())
+    except Exception as e:
+        logging.error(f"Erro ao buscar pratos por data: {e}")
+
+    # Pratos ainda no buffer são mais novos que os do banco
+    with _trava_buffer:
+        pratos.update({dia: prato for dia, prato in _pratos_pendentes.items() if dia in datas})
+    return pratos
+
+@cronometrar('db_segundos')
 def buscar_prato_por_data(data_referencia) -> str | None:
     """
     Busca o prato salvo no banco para uma data específica.
@@ -154,8 +568,13 @@ def buscar_prato_por_data(data_referencia) -> str | None:
     if not URL_BANCO_DADOS:
         return None
 
+    # Um prato ainda no buffer é mais novo que o que está no banco
+    with _trava_buffer:
+        if data_referencia in _pratos_pendentes:
+            return _pratos_pendentes[data_referencia]
+
     try:
-        with psycopg.connect(URL_BANCO_DADOS) as conexao:
+        with _obter_pool().connection() as conexao:
             with conexao.cursor() as cursor:
                 cursor.execute("""
                     SELECT prato_nome
@@ -167,3 +586,456 @@ def buscar_prato_por_data(data_referencia) -> str | None:
     except Exception as e:
         logging.error(f"Erro ao buscar prato por data {data_referencia}: {e}")
         return None
+
+@cronometrar('db_segundos')
+def buscar_bloqueios_alunos_ativos() -> dict:
+    """
+    Retorna {aluno_id: [nomes bloqueados]} de todos os alunos ativos que têm
+    pelo menos um bloqueio (quem não tem bloqueio nunca é bloqueado).
+    """
+    if not URL_BANCO_DADOS:
+        return {}
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    SELECT a.id, array_agg(pb.nome ORDER BY pb.nome)
+                      FROM aluno a
+                      JOIN prato_bloqueado pb ON pb.aluno_id = a.id
+                     WHERE a.ativo = true
+                     GROUP BY a.id;
+                """)
+                return {aluno_id: list(nomes) for aluno_id, nomes in cursor.fetchall()}
+    except Exception as e:
+        logging.error(f"Erro ao buscar bloqueios dos alunos ativos: {e}")
+        return {}
+
+@cronometrar('db_segundos')
+def buscar_pratos_a_partir_de(data_inicial) -> dict:
+    """Retorna {data: nome_do_prato} de todos os cardápios salvos a partir da data informada."""
+    if not URL_BANCO_DADOS:
+        return {}
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    SELECT dia_referente, prato_nome
+                      FROM proximo_prato
+                     WHERE dia_referente >= %s
+                     ORDER BY dia_referente;
+                """, (data_inicial,))
+                pratos = dict(cursor.fetchall())
+    except Exception as e:
+        logging.error(f"Erro ao buscar cardápios a partir de {data_inicial}: {e}")
+        return {}
+
+    with _trava_buffer:
+        pratos.update({dia: prato for dia, prato in _pratos_pendentes.items() if dia >= data_inicial})
+    return pratos
+
+@cronometrar('db_segundos')
+def buscar_assinaturas_vereditos(datas) -> dict:
+    """Retorna {dia: assinatura} dos vereditos já gravados para as datas informadas."""
+    if not URL_BANCO_DADOS or not datas:
+        return {}
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    SELECT dia_referente, assinatura
+                      FROM veredito_assinatura
+                     WHERE dia_referente = ANY(%s);
+                """, (list(datas),))
+                return dict(cursor.fetchall())
+    except Exception as e:
+        logging.error(f"Erro ao buscar assinaturas dos vereditos de bloqueio: {e}")
+        return {}
+
+@cronometrar('db_segundos')
+def gravar_vereditos_bloqueio(assinaturas: dict, linhas: list[tuple]):
+    """
+    Substitui os vereditos de bloqueio das datas de `assinaturas` ({dia: assinatura}) na
+    tabela 'veredito_bloqueio' e grava a assinatura de cada dia, na mesma transação.
+    Cada linha é (aluno_id, dia_referente, bloqueado, itens). Aluno sem linha para um
+    dia não tem nenhum bloqueio cadastrado.
+    """
+    if not URL_BANCO_DADOS or not assinaturas:
+        return
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    DELETE FROM veredito_bloqueio
+                     WHERE dia_referente = ANY(%s);
+                """, (list(assinaturas),))
+                with cursor.copy(
+                    "COPY veredito_bloqueio (aluno_id, dia_referente, bloqueado, itens) FROM STDIN"
+                ) as copia:
+                    for linha in linhas:
+                        copia.write_row(linha)
+                cursor.execute("""
+                    INSERT INTO veredito_assinatura (dia_referente, assinatura)
+                    SELECT * FROM unnest(%s::date[], %s::text[])
+                    ON CONFLICT (dia_referente)
+                    DO UPDATE SET assinatura = EXCLUDED.assinatura, atualizado_em = NOW();
+                """, (list(assinaturas), list(assinaturas.values())))
+            conexao.commit()
+    except Exception as e:
+        logging.error(f"❌ Erro ao salvar vereditos de bloqueio: {e}")
+
+@cronometrar('db_segundos')
+def buscar_vereditos_bloqueio(data_referencia) -> dict | None:
+    """
+    Lê os vereditos já calculados para uma data.
+    Retorna {aluno_id: (bloqueado, itens)}, ou None se a leitura falhar.
+    """
+    if not URL_BANCO_DADOS:
+        return None
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    SELECT aluno_id, bloqueado, itens
+                      FROM veredito_bloqueio
+                     WHERE dia_referente = %s;
+                """, (data_referencia,))
+                return {aluno_id: (bloqueado, itens) for aluno_id, bloqueado, itens in cursor.fetchall()}
+    except Exception as e:
+        logging.error(f"Erro ao buscar vereditos de bloqueio de {data_referencia}: {e}")
+        return None
+
+@cronometrar('db_segundos')
+def reservar_mensagens(limite: int, segundos_reserva: int) -> list[tuple]:
+    """
+    Reserva um lote de mensagens prontas para envio da caixa de saída.
+    Usa FOR UPDATE SKIP LOCKED, então vários entregadores podem rodar juntos sem pegar a
+    mesma mensagem; a reserva empurra 'proxima_tentativa' para frente, e se o entregador
+    morrer no meio a mensagem volta a ficar disponível depois de `segundos_reserva`.
+
+    Returns:
+        list[tuple]: (id, telefone, mensagem, tentativas) de cada mensagem reservada.
+    """
+    if not URL_BANCO_DADOS:
+        return []
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE mensagem_saida m
+                       SET tentativas = m.tentativas + 1,
+                           proxima_tentativa = NOW() + make_interval(secs => %s)
+                     WHERE m.id IN (
+                           SELECT id
+                             FROM mensagem_saida
+                            WHERE enviada_em IS NULL
+                              AND proxima_tentativa <= NOW()
+                            ORDER BY proxima_tentativa
+                            LIMIT %s
+                              FOR UPDATE SKIP LOCKED
+                     )
+                 RETURNING m.id, m.telefone, m.mensagem, m.tentativas;
+                """, (segundos_reserva, limite))
+                mensagens = cursor.fetchall()
+            conexao.commit()
+            return mensagens
+    except Exception as e:
+        logging.error(f"❌ Erro ao reservar mensagens da caixa de saída: {e}")
+        return []
+
+@cronometrar('db_segundos')
+def marcar_mensagens_enviadas(ids: list[int]):
+    """Marca as mensagens como entregues (saem da fila)."""
+    if not URL_BANCO_DADOS or not ids:
+        return
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE mensagem_saida
+                       SET enviada_em = NOW(), ultimo_erro = NULL
+                     WHERE id = ANY(%s);
+                """, (list(ids),))
+            conexao.commit()
+    except Exception as e:
+        logging.error(f"❌ Erro ao marcar mensagens como enviadas: {e}")
+
+@cronometrar('db_segundos')
+def adiar_mensagem(id_mensagem: int, segundos: float, erro: str):
+    """Agenda uma nova tentativa de entrega daqui a `segundos` e guarda o motivo da falha."""
+    if not URL_BANCO_DADOS:
+        return
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE mensagem_saida
+                       SET proxima_tentativa = NOW() + make_interval(secs => %s),
+                           ultimo_erro = %s
+                     WHERE id = %s;
+                """, (segundos, (erro or "")[:500], id_mensagem))
+            conexao.commit()
+    except Exception as e:
+        logging.error(f"❌ Erro ao adiar mensagem {id_mensagem}: {e}")
+
+@cronometrar('db_segundos')
+def desistir_mensagem(id_mensagem: int, erro: str):
+    """Tira a mensagem da fila sem entregar (erro permanente ou tentativas esgotadas)."""
+    if not URL_BANCO_DADOS:
+        return
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE mensagem_saida
+                       SET proxima_tentativa = 'infinity',
+                           ultimo_erro = %s
+                     WHERE id = %s;
+                """, ((erro or "")[:500], id_mensagem))
+            conexao.commit()
+    except Exception as e:
+        logging.error(f"❌ Erro ao descartar mensagem {id_mensagem}: {e}")
+
+# === Fila de trabalho (modo com vários trabalhadores, ver fila_trabalho.py) ===
+
+@cronometrar('db_segundos')
+def carregar_fila(data_pedido, nome_dia_semana: str, texto_prato_dia: str, prazo, alunos: list[dict]) -> int:
+    """
+    Coloca os alunos do dia na tabela 'fila_pedido' e registra o dia em 'execucao_fila'.
+    Carregar o mesmo dia de novo (execução retomada) atualiza dados (cancelamento, bloqueio)
+    e horário de despacho de todo item que nenhum trabalhador está segurando (pendente,
+    concluído ou com reserva vencida) e o devolve à fila; só itens com reserva viva ficam
+    como estão. Retorna quantos alunos entraram (ou voltaram) na fila.
+    """
+    if not URL_BANCO_DADOS:
+        return 0
+
+    ids = [aluno['id'] for aluno in alunos]
+    dados = [
+        json.dumps({
+            'id': aluno['id'],
+            'prontuario': aluno['prontuario'],
+            'cancelou': aluno['cancelou'],
+            'telefone': aluno['telefone'],
+            'bloqueio': list(aluno['bloqueio']),
+        }, ensure_ascii=False)
+        for aluno in alunos
+    ]
+    despachos = [aluno.get('despacho') for aluno in alunos]
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO execucao_fila (dia_pedido, nome_dia_semana, texto_prato_dia, prazo)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (dia_pedido) DO UPDATE
+                       SET nome_dia_semana = EXCLUDED.nome_dia_semana,
+                           texto_prato_dia = EXCLUDED.texto_prato_dia,
+                           prazo = EXCLUDED.prazo,
+                           carregada_em = NOW(),
+                           relatorio_enviado_em = NULL;
+                """, (data_pedido, nome_dia_semana, texto_prato_dia, prazo))
+                cursor.execute("""
+                    INSERT INTO fila_pedido (dia_pedido, aluno_id, dados, despacho)
+                    SELECT %s, aluno, dados::jsonb, despacho
+                      FROM unnest(%s::int[], %s::text[], %s::timestamptz[]) AS novo(aluno, dados, despacho)
+                    ON CONFLICT (dia_pedido, aluno_id) DO UPDATE
+                       SET dados = EXCLUDED.dados, despacho = EXCLUDED.despacho, estado = 'pendente',
+                           trabalhador = NULL, reservado_ate = NULL
+                     WHERE fila_pedido.estado <> 'reservado' OR fila_pedido.reservado_ate < NOW();
+                """, (data_pedido, ids, dados, despachos))
+                pendentes = cursor.rowcount
+            conexao.commit()
+        return pendentes
+    except Exception as e:
+        logging.error(f"❌ Erro ao carregar a fila de {data_pedido}: {e}")
+        return 0
+
+@cronometrar('db_segundos')
+def buscar_execucao_fila(data_pedido) -> dict | None:
+    """Lê o que os trabalhadores precisam saber do dia carregado na fila (ou None se não foi carregado)."""
+    if not URL_BANCO_DADOS:
+        return None
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    SELECT nome_dia_semana, texto_prato_dia, prazo
+                      FROM execucao_fila
+                     WHERE dia_pedido = %s;
+                """, (data_pedido,))
+                linha = cursor.fetchone()
+        if linha is None:
+            return None
+        nome_dia_semana, texto_prato_dia, prazo = linha
+        return {'nome_dia_semana': nome_dia_semana, 'texto_prato_dia': texto_prato_dia, 'prazo': prazo}
+    except Exception as e:
+        logging.error(f"Erro ao ler a execução da fila de {data_pedido}: {e}")
+        return None
+
+@cronometrar('db_segundos')
+def reservar_itens_fila(data_pedido, trabalhador: str, limite: int, segundos_reserva: int,
+                        antecedencia: float) -> list[dict]:
+    """
+    Reserva para `trabalhador` até `limite` alunos da fila cujo despacho vence nos próximos
+    `antecedencia` segundos. Usa FOR UPDATE SKIP LOCKED, então vários trabalhadores (em
+    qualquer máquina) nunca pegam o mesmo aluno. Uma reserva vencida (trabalhador que morreu
+    ou parou de renová-la) volta a poder ser pega por outro.
+
+    Returns:
+        list[dict]: O aluno como preparado pelo coordenador, mais 'despacho' e 'tentativas'
+        (quantas vezes o item já foi reservado).
+    """
+    if not URL_BANCO_DADOS:
+        return []
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE fila_pedido f
+                       SET estado = 'reservado',
+                           trabalhador = %s,
+                           reservado_ate = NOW() + make_interval(secs => %s),
+                           tentativas = f.tentativas + 1
+                     WHERE (f.dia_pedido, f.aluno_id) IN (
+                           SELECT dia_pedido, aluno_id
+                             FROM fila_pedido
+                            WHERE dia_pedido = %s
+                              AND estado <> 'concluido'
+                              AND (estado = 'pendente' OR reservado_ate < NOW())
+                              AND (despacho IS NULL OR despacho <= NOW() + make_interval(secs => %s))
+                            ORDER BY despacho NULLS FIRST, aluno_id
+                            LIMIT %s
+                              FOR UPDATE SKIP LOCKED
+                     )
+                 RETURNING f.dados, f.despacho, f.tentativas;
+                """, (trabalhador, segundos_reserva, data_pedido, antecedencia, limite))
+                linhas = cursor.fetchall()
+            conexao.commit()
+        return [{**dados, 'despacho': despacho, 'tentativas': tentativas} for dados, despacho, tentativas in linhas]
+    except Exception as e:
+        logging.error(f"❌ Erro ao reservar alunos da fila: {e}")
+        return []
+
+@cronometrar('db_segundos')
+def renovar_reservas_fila(data_pedido, trabalhador: str, segundos_reserva: int) -> int:
+    """Estende as reservas ainda abertas de `trabalhador` (batimento enquanto ele está vivo)."""
+    if not URL_BANCO_DADOS:
+        return 0
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE fila_pedido
+                       SET reservado_ate = NOW() + make_interval(secs => %s)
+                     WHERE dia_pedido = %s
+                       AND trabalhador = %s
+                       AND estado = 'reservado';
+                """, (segundos_reserva, data_pedido, trabalhador))
+                renovadas = cursor.rowcount
+            conexao.commit()
+        return renovadas
+    except Exception as e:
+        logging.error(f"Erro ao renovar as reservas de {trabalhador}: {e}")
+        return 0
+
+@cronometrar('db_segundos')
+def concluir_item_fila(data_pedido, aluno_id: int):
+    """
+    Marca o aluno como concluído na fila e solta a reserva na hora, sem esperar o lote:
+    um trabalhador que morra logo depois não faz o aluno ser processado de novo. O
+    resultado dele no diário sai do buffer e vai na mesma transação (o item só aparece
+    como concluído junto com o resultado). Se a gravação falhar, os dois voltam para o
+    buffer e entram no próximo lote.
+    """
+    if not URL_BANCO_DADOS:
+        return
+
+    chave = (data_pedido, aluno_id)
+    with _trava_buffer:
+        diario = _diario_pendente.pop(chave, None)
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                if diario is not None:
+                    _gravar_diario(cursor, [(chave, diario)])
+                _gravar_fila(cursor, [chave])
+    except Exception as e:
+        logging.error(f"❌ Erro ao concluir o aluno {aluno_id} na fila (fica para o próximo lote): {e}")
+        with _trava_buffer:
+            if diario is not None:
+                _diario_pendente.setdefault(chave, diario)
+            _fila_pendente.add(chave)
+        _agendar_descarga()
+
+@cronometrar('db_segundos')
+def situacao_fila(data_pedido) -> dict:
+    """
+    Contagem da fila do dia: 'pendentes', 'reservados', 'concluidos', 'vencidas' (reservas
+    vencidas ainda não retomadas), 'retomados' (itens reservados mais de uma vez),
+    'trabalhadores' (quantos diferentes pegaram itens) e 'proximo_despacho'.
+    """
+    vazia = {
+        'pendentes': 0, 'reservados': 0, 'concluidos': 0, 'vencidas': 0,
+        'retomados': 0, 'trabalhadores': 0, 'proximo_despacho': None,
+    }
+    if not URL_BANCO_DADOS:
+        return vazia
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    SELECT count(*) FILTER (WHERE estado = 'pendente'),
+                           count(*) FILTER (WHERE estado = 'reservado'),
+                           count(*) FILTER (WHERE estado = 'concluido'),
+                           count(*) FILTER (WHERE estado = 'reservado' AND reservado_ate < NOW()),
+                           count(*) FILTER (WHERE tentativas > 1),
+                           count(DISTINCT trabalhador),
+                           min(despacho) FILTER (WHERE estado = 'pendente')
+                      FROM fila_pedido
+                     WHERE dia_pedido = %s;
+                """, (data_pedido,))
+                linha = cursor.fetchone()
+        return dict(zip(vazia.keys(), linha))
+    except Exception as e:
+        logging.error(f"Erro ao ler a situação da fila de {data_pedido}: {e}")
+        return vazia
+
+@cronometrar('db_segundos')
+def reservar_relatorio_fila(data_pedido) -> bool:
+    """
+    Marca o relatório do dia como enviado. Só a primeira chamada recebe True, então com
+    mais de um coordenador apenas um deles envia o relatório.
+    """
+    if not URL_BANCO_DADOS:
+        return False
+
+    try:
+        with _obter_pool().connection() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE execucao_fila
+                       SET relatorio_enviado_em = NOW()
+                     WHERE dia_pedido = %s
+                       AND relatorio_enviado_em IS NULL;
+                """, (data_pedido,))
+                reservado = cursor.rowcount == 1
+            conexao.commit()
+        return reservado
+    except Exception as e:
+        logging.error(f"❌ Erro ao marcar o relatório de {data_pedido}: {e}")
+        return False
@@ -0,0 +1,219 @@
+import json
+import hashlib
+import logging
+from collections import deque
+from sistema_pedido.utils import normalizar_texto
+from sistema_pedido.banco_dados import (
+    buscar_bloqueios_alunos_ativos, buscar_pratos_a_partir_de, buscar_assinaturas_vereditos,
+    gravar_vereditos_bloqueio, buscar_vereditos_bloqueio
+)
+
+# NumPy é opcional: sem ele a matriz de vereditos é calculada com conjuntos em Python puro
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class _Automato:
+    """
+    Autômato Aho-Corasick: encontra todas as ocorrências de vários termos num texto
+    percorrendo o texto uma única vez, não importa quantos termos existam.
+    """
+
+    def __init__(self, termos: list[str]):
+        self.transicoes = [{}]
+        self.falha = [0]
+        self.saida = [set()]
+
+        for id_termo, termo in enumerate(termos):
+            estado = 0
+            for letra in termo:
+                proximo = self.transicoes[estado].get(letra)
+                if proximo is None:
+                    proximo = len(self.transicoes)
+                    self.transicoes[estado][letra] = proximo
+                    self.transicoes.append({})
+                    self.falha.append(0)
+                    self.saida.append(set())
+                estado = proximo
+            self.saida[estado].add(id_termo)
+
+        # Liga cada estado ao maior sufixo que também é prefixo de algum termo (busca em largura)
+        fila = deque(self.transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for letra, proximo in self.transicoes[estado].items():
+                fila.append(proximo)
+                recuo = self.falha[estado]
+                while recuo and letra not in self.transicoes[recuo]:
+                    recuo = self.falha[recuo]
+                self.falha[proximo] = self.transicoes[recuo].get(letra, 0)
+                self.saida[proximo] |= self.saida[self.falha[proximo]]
+
+    def buscar(self, texto: str) -> set[int]:
+        """Retorna os ids de todos os termos que aparecem no texto."""
+        transicoes, falha, saida = self.transicoes, self.falha, self.saida
+        estado = 0
+        encontrados = set()
+        for letra in texto:
+            while estado and letra not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(letra, 0)
+            if saida[estado]:
+                encontrados |= saida[estado]
+        return encontrados
+
+class MotorBloqueios:
+    """
+    Verifica os bloqueios de todos os alunos contra o prato do dia de uma vez.
+
+    Junta os termos bloqueados do roster inteiro (normalizados e sem repetição),
+    procura todos no texto do prato numa única passada e depois o veredito de cada
+    aluno é só a interseção entre os termos dele e os termos encontrados.
+    """
+
+    def __init__(self, listas_bloqueios):
+        self.id_por_termo = {}
+        for lista in listas_bloqueios:
+            for bloqueio in lista:
+                termo = normalizar_texto(bloqueio)
+                if termo and termo not in self.id_por_termo:
+                    self.id_por_termo[termo] = len(self.id_por_termo)
+
+        self.termos = list(self.id_por_termo)
+        self._automato = _Automato(self.termos)
+        self.encontrados = set()
+
+    def termos_no_texto(self, texto: str) -> set[int]:
+        """Ids dos termos (de qualquer aluno) que aparecem no texto."""
+        return self._automato.buscar(normalizar_texto(texto))
+
+    def ids_do_aluno(self, lista_bloqueios: list[str]) -> list:
+        """Id de cada bloqueio da lista (None para bloqueios vazios), na mesma ordem."""
+        return [self.id_por_termo.get(normalizar_texto(bloqueio)) for bloqueio in lista_bloqueios]
+
+    def preparar(self, texto_cardapio: str) -> set[int]:
+        """Procura todos os termos no prato do dia. Deve ser chamada antes de verificar()."""
+        self.encontrados = self.termos_no_texto(texto_cardapio)
+        return self.encontrados
+
+    def verificar(self, lista_bloqueios: list[str]) -> tuple[bool, str]:
+        """
+        Verifica a lista de bloqueios do aluno usando o resultado de preparar().
+        Retorna (True, "item1, item2") se algum bloqueio do aluno está no prato, ou (False, "").
+        """
+        if not self.encontrados:
+            return False, ""
+
+        ids_aluno = self.ids_do_aluno(lista_bloqueios)
+        if self.encontrados.isdisjoint(ids_aluno):
+            return False, ""
+
+        # Mantém a ordem da lista do aluno, como a função original
+        encontrados = [
+            bloqueio for bloqueio, id_termo in zip(lista_bloqueios, ids_aluno)
+            if id_termo in self.encontrados
+        ]
+        return True, ", ".join(encontrados)
+
+def calcular_matriz_bloqueios(bloqueios_por_aluno: dict, pratos_por_data: dict) -> list[tuple]:
+    """
+    Calcula o veredito de bloqueio de cada aluno para cada dia de cardápio conhecido.
+
+    Monta a matriz alunos x termos (quem bloqueou o quê) e a matriz dias x termos
+    (o que aparece em cada prato); o produto das duas diz, de uma vez, quais pares
+    (aluno, dia) têm pelo menos um termo em comum.
+
+    Args:
+        bloqueios_por_aluno (dict): {aluno_id: [nomes bloqueados]}
+        pratos_por_data (dict): {data: texto do prato}
+
+    Returns:
+        list[tuple]: (aluno_id, data, bloqueado, itens) para todo par aluno x dia,
+        com `itens` no mesmo formato de MotorBloqueios.verificar ("item1, item2").
+    """
+    ids_alunos = list(bloqueios_por_aluno)
+    datas = list(pratos_por_data)
+    if not ids_alunos or not datas:
+        return []
+
+    motor = MotorBloqueios(bloqueios_por_aluno.values())
+    termos_por_aluno = [motor.ids_do_aluno(bloqueios_por_aluno[aluno_id]) for aluno_id in ids_alunos]
+    termos_por_data = [motor.termos_no_texto(pratos_por_data[dia]) for dia in datas]
+
+    if np is not None and motor.termos:
+        incidencia_alunos = np.zeros((len(ids_alunos), len(motor.termos)), dtype=np.int32)
+        for linha, ids in enumerate(termos_por_aluno):
+            incidencia_alunos[linha, [i for i in ids if i is not None]] = 1
+        incidencia_pratos = np.zeros((len(datas), len(motor.termos)), dtype=np.int32)
+        for linha, ids in enumerate(termos_por_data):
+            incidencia_pratos[linha, list(ids)] = 1
+        bloqueado = (incidencia_alunos @ incidencia_pratos.T) > 0
+        pares_bloqueados = {(int(a), int(d)) for a, d in np.argwhere(bloqueado)}
+    else:
+        pares_bloqueados = {
+            (a, d)
+            for a, ids in enumerate(termos_por_aluno)
+            for d, ids_prato in enumerate(termos_por_data)
+            if not ids_prato.isdisjoint(ids)
+        }
+
+    linhas = []
+    for a, aluno_id in enumerate(ids_alunos):
+        lista = bloqueios_por_aluno[aluno_id]
+        for d, dia in enumerate(datas):
+            if (a, d) in pares_bloqueados:
+                itens = ", ".join(
+                    bloqueio for bloqueio, id_termo in zip(lista, termos_por_aluno[a])
+                    if id_termo in termos_por_data[d]
+                )
+                linhas.append((aluno_id, dia, True, itens))
+            else:
+                linhas.append((aluno_id, dia, False, ""))
+    return linhas
+
+def assinatura_vereditos(prato: str, bloqueios_por_aluno: dict) -> str:
+    """Hash do que define os vereditos de um dia: o texto do prato e as listas de bloqueio."""
+    conteudo = json.dumps([prato, sorted(bloqueios_por_aluno.items())], ensure_ascii=False, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+def atualizar_vereditos(data_inicial, data_pedido=None, prato_pedido: str | None = None) -> dict | None:
+    """
+    Mantém a tabela 'veredito_bloqueio' em dia para todos os alunos ativos e todos os
+    cardápios salvos a partir de `data_inicial`. Só os dias cujo prato ou listas de
+    bloqueio mudaram desde o último cálculo (assinatura diferente) são recalculados e
+    regravados; sem mudança, nada é escrito.
+
+    Com `data_pedido`/`prato_pedido`, devolve os vereditos desse dia ({aluno_id: (bloqueado,
+    itens)}) para a execução usar no lugar de checar o roster de novo. Devolve None quando
+    não dá para confiar neles (prato salvo diferente do lido agora, dia sem cardápio ou
+    erro de leitura): aí quem chamou checa em memória.
+    """
+    pratos = {
+        dia: prato for dia, prato in buscar_pratos_a_partir_de(data_inicial).items()
+        # Textos de aviso do site ("não cadastrado", "não identificado") não são pratos
+        if prato and "não" not in prato.lower()
+    }
+    bloqueios_por_aluno = buscar_bloqueios_alunos_ativos()
+
+    assinaturas = {dia: assinatura_vereditos(prato, bloqueios_por_aluno) for dia, prato in pratos.items()}
+    gravadas = buscar_assinaturas_vereditos(list(pratos))
+    mudaram = {dia: assinatura for dia, assinatura in assinaturas.items() if gravadas.get(dia) != assinatura}
+
+    linhas = []
+    if mudaram:
+        linhas = calcular_matriz_bloqueios(bloqueios_por_aluno, {dia: pratos[dia] for dia in mudaram})
+        gravar_vereditos_bloqueio(mudaram, linhas)
+        total_bloqueados = sum(1 for linha in linhas if linha[2])
+        logging.info(
+            f"🧮 Vereditos de bloqueio: {len(bloqueios_por_aluno)} alunos x {len(mudaram)} dias "
+            f"recalculados ({total_bloqueados} bloqueios); {len(pratos) - len(mudaram)} dias já em dia."
+        )
+    else:
+        logging.info(f"🧮 Vereditos de bloqueio em dia para os {len(pratos)} cardápios salvos.")
+
+    if data_pedido is None or pratos.get(data_pedido) != prato_pedido:
+        return None
+    if data_pedido in mudaram:
+        return {aluno_id: (bloqueado, itens) for aluno_id, dia, bloqueado, itens in linhas if dia == data_pedido}
+    return buscar_vereditos_bloqueio(data_pedido)
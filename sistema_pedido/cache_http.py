@@ -0,0 +1,168 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from sistema_pedido.configuracao import PASTA_CACHE_HTTP, URLS_CACHE_HTTP
+
+# Contadores do cache HTTP: 'acerto' (servido do disco sem ir à rede), 'revalidado'
+# (servidor respondeu 304), 'falha' (página baixada inteira) e 'interpretacao_reaproveitada'
+# (conteúdo igual ao da última vez, então não precisou interpretar o HTML de novo)
+ESTATISTICAS_CACHE_HTTP = {'acerto': 0, 'revalidado': 0, 'falha': 0, 'interpretacao_reaproveitada': 0}
+_trava_estatisticas = threading.Lock()
+
+def _contar(evento: str):
+    with _trava_estatisticas:
+        ESTATISTICAS_CACHE_HTTP[evento] += 1
+
+def resumo_cache_http() -> str:
+    """Texto curto com os contadores do cache HTTP (para logs/relatório)."""
+    with _trava_estatisticas:
+        e = ESTATISTICAS_CACHE_HTTP
+        return (
+            f"Cache HTTP: {e['acerto']} acertos, {e['revalidado']} revalidados (304), "
+            f"{e['falha']} downloads completos, {e['interpretacao_reaproveitada']} interpretações reaproveitadas"
+        )
+
+def _chave(texto: str) -> str:
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+def _max_age(cabecalhos) -> int | None:
+    """Lê o max-age do Cache-Control. Retorna None se a resposta não pode ser reaproveitada sem revalidar."""
+    diretivas = [d.strip().lower() for d in cabecalhos.get('Cache-Control', '').split(',') if d.strip()]
+    if 'no-cache' in diretivas or 'no-store' in diretivas:
+        return None
+    for diretiva in diretivas:
+        if diretiva.startswith('max-age='):
+            try:
+                return int(diretiva.split('=', 1)[1])
+            except ValueError:
+                return None
+    return None
+
+class AdaptadorCacheHTTP(HTTPAdapter):
+    """
+    Adaptador do requests que guarda em disco as respostas GET das URLs configuradas
+    e faz GET condicional (If-None-Match / If-Modified-Since) nas próximas vezes.
+    Se o servidor responder 304, a página guardada é devolvida como se fosse um 200.
+    """
+
+    def __init__(self, pasta: str = PASTA_CACHE_HTTP, urls: list[str] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.pasta = Path(pasta)
+        self.urls = URLS_CACHE_HTTP if urls is None else urls
+
+    def _cacheavel(self, requisicao) -> bool:
+        return requisicao.method == 'GET' and any(requisicao.url.startswith(url) for url in self.urls)
+
+    def _arquivos(self, url: str) -> tuple[Path, Path]:
+        chave = _chave(url)
+        return self.pasta / f'{chave}.json', self.pasta / f'{chave}.corpo'
+
+    def _ler(self, url: str) -> tuple[dict, bytes] | None:
+        arquivo_meta, arquivo_corpo = self._arquivos(url)
+        try:
+            return json.loads(arquivo_meta.read_text(encoding='utf-8')), arquivo_corpo.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+    def _gravar(self, resposta):
+        cabecalhos = resposta.headers
+        if not (cabecalhos.get('ETag') or cabecalhos.get('Last-Modified') or _max_age(cabecalhos)):
+            return
+        max_age = _max_age(cabecalhos)
+        meta = {
+            'url': resposta.url,
+            'etag': cabecalhos.get('ETag'),
+            'last_modified': cabecalhos.get('Last-Modified'),
+            'content_type': cabecalhos.get('Content-Type'),
+            'encoding': resposta.encoding,
+            'expira_em': time.time() + max_age if max_age else None,
+        }
+        arquivo_meta, arquivo_corpo = self._arquivos(resposta.request.url)
+        try:
+            self.pasta.mkdir(parents=True, exist_ok=True)
+            arquivo_corpo.write_bytes(resposta.content)
+            arquivo_meta.write_text(json.dumps(meta), encoding='utf-8')
+        except OSError as e:
+            logging.warning(f"⚠️ Não consegui gravar o cache HTTP de {resposta.url}: {e}")
+
+    def _resposta_do_cache(self, requisicao, meta: dict, corpo: bytes, resposta=None):
+        """Monta um 200 com o corpo guardado (reaproveitando os cabeçalhos de um 304, se houver)."""
+        if resposta is None:
+            resposta = requests.Response()
+            resposta.url = requisicao.url
+            resposta.request = requisicao
+            resposta.connection = self
+            resposta.headers = CaseInsensitiveDict()
+        resposta.status_code = 200
+        resposta.reason = 'OK'
+        resposta._content = corpo
+        resposta._content_consumed = True
+        if meta.get('content_type'):
+            resposta.headers.setdefault('Content-Type', meta['content_type'])
+        resposta.encoding = meta.get('encoding')
+        return resposta
+
+    def send(self, requisicao, **kwargs):
+        if not self._cacheavel(requisicao):
+            return super().send(requisicao, **kwargs)
+
+        guardado = self._ler(requisicao.url)
+        if guardado:
+            meta, corpo = guardado
+            if meta.get('expira_em') and time.time() < meta['expira_em']:
+                _contar('acerto')
+                return self._resposta_do_cache(requisicao, meta, corpo)
+            if meta.get('etag'):
+                requisicao.headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                requisicao.headers['If-Modified-Since'] = meta['last_modified']
+
+        resposta = super().send(requisicao, **kwargs)
+
+        if resposta.status_code == 304 and guardado:
+            _contar('revalidado')
+            resposta.close()  # 304 não tem corpo: devolve a conexão ao pool antes de virar o 200 guardado
+            return self._resposta_do_cache(requisicao, guardado[0], guardado[1], resposta)
+
+        _contar('falha')
+        if resposta.status_code == 200 and not kwargs.get('stream'):
+            self._gravar(resposta)
+        return resposta
+
+def _hash_interpretacao(conteudo: bytes, versao) -> str:
+    # A versão do interpretador entra no hash: mudar o parser invalida o que ele gravou antes
+    return hashlib.sha256(f'{versao}\n'.encode('utf-8') + conteudo).hexdigest()
+
+def ler_interpretacao(nome: str, conteudo: bytes, versao=0, pasta: str = PASTA_CACHE_HTTP):
+    """
+    Devolve o resultado guardado da última interpretação de `conteudo` (ex: o cardápio
+    já convertido em dicionário), ou None se a página ou a `versao` do interpretador
+    mudaram desde então.
+    """
+    arquivo = Path(pasta) / f'interpretado_{nome}.json'
+    try:
+        guardado = json.loads(arquivo.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if guardado.get('hash') != _hash_interpretacao(conteudo, versao):
+        return None
+    _contar('interpretacao_reaproveitada')
+    return guardado.get('resultado')
+
+def gravar_interpretacao(nome: str, conteudo: bytes, resultado, versao=0, pasta: str = PASTA_CACHE_HTTP):
+    """Guarda o resultado (serializável em JSON) da interpretação de `conteudo`, indexado pelo hash + versão."""
+    arquivo = Path(pasta) / f'interpretado_{nome}.json'
+    try:
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        arquivo.write_text(
+            json.dumps({'hash': _hash_interpretacao(conteudo, versao), 'resultado': resultado}, ensure_ascii=False),
+            encoding='utf-8'
+        )
+    except OSError as e:
+        logging.warning(f"⚠️ Não consegui gravar o cache de interpretação '{nome}': {e}")
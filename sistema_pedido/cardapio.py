@@ -0,0 +1,74 @@
+import re
+from datetime import date
+from bs4 import BeautifulSoup
+from sistema_pedido.metricas import cronometrar
+
+MESES = {
+    'Janeiro': 1, 'Fevereiro': 2, 'Março': 3, 'Abril': 4, 'Maio': 5, 'Junho': 6,
+    'Julho': 7, 'Agosto': 8, 'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
+}
+
+# Padrões pré-compilados (o título do banner traz a data, ex: "Cardápio de 21 de Outubro de 2026")
+_RE_DATA_TITULO = re.compile(r'(\d{1,2})\s+de\s+([A-Za-zçÇ]+)\s+de\s+(\d{4})', re.IGNORECASE)
+_RE_OPCAO_1 = re.compile(r'Opção 1:\s*(.*?)(?:\s+Opção 2:|$)', re.IGNORECASE)
+
+# Versão de interpretar_cardapio guardada com o cache de interpretação: aumente ao mudar
+# o que o parser devolve, senão a página igual continua usando o resultado antigo
+VERSAO_INTERPRETACAO = 1
+
+def _data_do_titulo(texto_titulo: str) -> date | None:
+    """Converte o título do banner na data do cardápio. Retorna None se não reconhecer."""
+    match = _RE_DATA_TITULO.search(texto_titulo)
+    if not match:
+        return None
+    d, nome_mes, y = match.groups()
+    mes_num = MESES.get(nome_mes.capitalize())
+    if not mes_num:
+        return None
+    try:
+        return date(int(y), mes_num, int(d))
+    except ValueError:
+        return None
+
+def _extrair_prato_do_banner(banner):
+    """Extrai o nome do prato de um banner jumbotron."""
+    texto_banner = banner.get_text(" ", strip=True)
+    if "não cadastrado" in texto_banner.lower():
+        return "Cardápio não cadastrado"
+    
+    paragrafos = banner.find_all('p')
+    for p in paragrafos:
+        texto_p = p.get_text(" ", strip=True)
+        if "Prato Principal" in texto_p:
+            match_prato = _RE_OPCAO_1.search(texto_p)
+            if match_prato:
+                return match_prato.group(1).strip()
+            else:
+                return texto_p.replace("Prato Principal:", "").strip()
+    return "Prato não identificado no texto"
+
+@cronometrar('parse_segundos', alvo='cardapio')
+def interpretar_cardapio(html: str) -> dict:
+    """
+    Lê todos os banners 'jumbotron' da página numa única passada.
+
+    Returns:
+        dict: {data: nome_do_prato} para cada banner com data reconhecida.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    prato_por_data = {}
+    for banner in soup.select('.jumbotron'):
+        tag_titulo = banner.find('h2', class_='display-3')
+        if not tag_titulo:
+            continue
+        data_banner = _data_do_titulo(tag_titulo.get_text(" ", strip=True))
+        if data_banner:
+            prato_por_data[data_banner] = _extrair_prato_do_banner(banner)
+    return prato_por_data
+
+def pratos_alterados(prato_por_data: dict, pratos_salvos: dict) -> dict:
+    """Filtra só os dias que são novos ou cujo prato mudou em relação ao banco."""
+    return {
+        dia: prato for dia, prato in prato_por_data.items()
+        if pratos_salvos.get(dia) != prato
+    }
@@ -0,0 +1,89 @@
+"""
+Classificação das respostas do site (e dos erros de rede) que decide se vale tentar de novo.
+
+Cada resultado de realizar_pedido cai numa categoria; a POLITICAS diz, por categoria, se
+o pedido deve ser repetido, quanto esperar antes e se o erro merece alerta no WhatsApp.
+"""
+import re
+import threading
+from typing import NamedTuple
+from collections import Counter
+from sistema_pedido.configuracao import TEMPO_ESPERA_ERRO
+
+SUCESSO = 'sucesso'
+JA_PEDIDO = 'ja_pedido'                      # "Ticket Gerado anteriormente"
+FIM_DE_SEMANA = 'fim_de_semana'              # site não abre pedidos no fim de semana
+PULOU = 'pulou'                              # pulado pelo próprio sistema (preferência/dia)
+PRONTUARIO_INVALIDO = 'prontuario_invalido'  # prontuário não existe no site
+REDE = 'rede'                                # timeout, conexão recusada, site pausado pelo disjuntor
+SERVIDOR = 'servidor'                        # 5xx, erro interno, página sem aviso
+DESCONHECIDO = 'desconhecido'
+
+class PoliticaRetentativa(NamedTuple):
+    repetir: bool      # tentar de novo na mesma execução (e ao retomar a execução)
+    espera: float      # segundos antes da nova tentativa (limitado pela folga até o prazo)
+    relevante: bool    # merece alerta para os administradores
+
+POLITICAS = {
+    SUCESSO:             PoliticaRetentativa(repetir=False, espera=0, relevante=False),
+    JA_PEDIDO:           PoliticaRetentativa(repetir=False, espera=0, relevante=False),
+    FIM_DE_SEMANA:       PoliticaRetentativa(repetir=False, espera=0, relevante=False),
+    PULOU:               PoliticaRetentativa(repetir=False, espera=0, relevante=False),
+    PRONTUARIO_INVALIDO: PoliticaRetentativa(repetir=False, espera=0, relevante=True),
+    REDE:                PoliticaRetentativa(repetir=True, espera=min(5, TEMPO_ESPERA_ERRO), relevante=True),
+    SERVIDOR:            PoliticaRetentativa(repetir=True, espera=TEMPO_ESPERA_ERRO, relevante=True),
+    DESCONHECIDO:        PoliticaRetentativa(repetir=True, espera=TEMPO_ESPERA_ERRO, relevante=True),
+}
+
+# Um padrão por categoria, juntos numa única regex com grupos nomeados (uma busca só por
+# mensagem). Se a mensagem tiver trechos de mais de uma categoria, vale o que aparece primeiro.
+_PADROES = {
+    JA_PEDIDO: r'Gerado anteriormente|Ticket Gerado',
+    FIM_DE_SEMANA: r'Final de Semana',
+    PULOU: r'PULOU_PREF|Pulou por prefer.ncia|SKIP_DIA',
+    PRONTUARIO_INVALIDO: r'prontu.rio\s+(?:inv.lido|n.o\s+(?:encontrado|cadastrado|existe))',
+    REDE: (
+        r'Max retries exceeded|Connection (?:refused|reset|aborted)|Conex.o recusada'
+        r'|timed out|Timeout|Name or service not known|Temporary failure in name resolution'
+        r'|RemoteDisconnected|Site indispon.vel: pedido parado'
+    ),
+    SERVIDOR: (
+        r'\b5\d\d\b.{0,20}Error|Server Error|Erro interno|temporariamente indispon.vel'
+        r'|N.o encontrei mensagem de confirma..o|Token de seguran.a \(CSRF\) n.o encontrado'
+        r'|CSRF verification failed'
+    ),
+}
+_RE_CATEGORIAS = re.compile(
+    '|'.join(f'(?P<{categoria}>{padrao})' for categoria, padrao in _PADROES.items()),
+    re.IGNORECASE,
+)
+
+def classificar(sucesso: bool, mensagem: str) -> str:
+    """Devolve a categoria de um resultado (sucesso, mensagem) de realizar_pedido."""
+    if sucesso:
+        return SUCESSO
+    encontrado = _RE_CATEGORIAS.search(mensagem or '')
+    return encontrado.lastgroup if encontrado else DESCONHECIDO
+
+def politica(sucesso: bool, mensagem: str) -> PoliticaRetentativa:
+    return POLITICAS[classificar(sucesso, mensagem)]
+
+# Quantas tentativas caíram em cada categoria na execução (compartilhado entre as threads)
+ESTATISTICAS_CLASSIFICACAO = Counter()
+_trava_estatisticas = threading.Lock()
+
+def contar_categoria(categoria: str):
+    with _trava_estatisticas:
+        ESTATISTICAS_CLASSIFICACAO[categoria] += 1
+
+def reiniciar_contagem():
+    with _trava_estatisticas:
+        ESTATISTICAS_CLASSIFICACAO.clear()
+
+def resumo_classificacao() -> str:
+    """Texto curto com as tentativas por categoria (para logs/relatório)."""
+    with _trava_estatisticas:
+        if not ESTATISTICAS_CLASSIFICACAO:
+            return 'Respostas do site: nenhuma tentativa'
+        partes = [f'{quantidade} {categoria}' for categoria, quantidade in ESTATISTICAS_CLASSIFICACAO.most_common()]
+    return 'Respostas do site: ' + ', '.join(partes)
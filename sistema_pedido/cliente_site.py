@@ -1,94 +1,102 @@
+import codecs
 import requests
 import logging
-import re
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+import threading
+from datetime import date, datetime, timedelta
 from sistema_pedido.configuracao import (
-    URL_PRINCIPAL, TEMPO_TIMEOUT, FUSO_HORARIO, HORA_CORTE, MINUTO_CORTE
+    URL_PRINCIPAL, TEMPO_TIMEOUT, FUSO_HORARIO, HORA_CORTE, MINUTO_CORTE,
+    LEITURA_STREAMING, TAMANHO_BLOCO_LEITURA, URLS_CACHE_HTTP, MODO_HTTP
 )
-from sistema_pedido.banco_dados import atualizar_prato_dia, buscar_prato_por_data
-
-# Mensagens de erro que não precisamos alertar o admin (são "erros" normais de fluxo)
-PADROES_ERRO_IGNORAR = [
-    r'Gerado anteriormente', 
-    r'Ticket Gerado', 
-    r'PULOU_PREF', 
-    r'Pulou por prefer.ncia', 
-    r'SKIP_DIA',
-    r'Final de Semana'   # Site retorna isso quando tenta pedir em fim de semana
-]
+from sistema_pedido.banco_dados import atualizar_prato_dia, buscar_pratos_por_datas
+from sistema_pedido.cardapio import interpretar_cardapio, pratos_alterados, VERSAO_INTERPRETACAO
+from sistema_pedido.cache_http import AdaptadorCacheHTTP, ler_interpretacao, gravar_interpretacao
+from sistema_pedido.saude_site import ControladorSaude
+from sistema_pedido.classificacao import classificar, politica, SERVIDOR
+from sistema_pedido.transporte_gravado import AdaptadorGravacao, obter_reprodutor
+from sistema_pedido.extratores import extrair_token_csrf, extrair_alerta, alerta_completo
+from sistema_pedido.metricas import medir
 
 def validar_erro_relevante(mensagem: str) -> bool:
-    """Retorna True se o erro for grave e merecer alerta no WhatsApp."""
+    """
+    Retorna True se o erro for grave e merecer alerta no WhatsApp.
+    Ticket já gerado, fim de semana e pulos do próprio sistema são "erros" normais de fluxo.
+    """
     if not mensagem: return False
-    for padrao in PADROES_ERRO_IGNORAR:
-        if re.search(padrao, mensagem, re.IGNORECASE):
-            return False
-    return True
-
-def obter_token_csrf(sessao, url):
-    """Busca o token de segurança (CSRF) escondido no HTML da página."""
-    resposta = sessao.get(url, timeout=TEMPO_TIMEOUT)
+    return politica(False, mensagem).relevante
+
+def criar_sessao(com_cache: bool = False):
+    """
+    Cria uma sessão HTTP nova (cookies próprios, importante para o CSRF token).
+    Com com_cache=True, os GETs das URLs em URLS_CACHE_HTTP passam pelo cache em disco.
+    Com MODO_HTTP='gravar' ou 'reproduzir', a sessão grava/reproduz as respostas do site
+    (nesses modos o cache fica desligado, para a gravação ver o tráfego real).
+    """
+    sessao = requests.Session()
+    if MODO_HTTP in ('gravar', 'reproduzir'):
+        adaptador = AdaptadorGravacao() if MODO_HTTP == 'gravar' else obter_reprodutor()
+        sessao.mount('http://', adaptador)
+        sessao.mount('https://', adaptador)
+    elif com_cache and URLS_CACHE_HTTP:
+        adaptador = AdaptadorCacheHTTP()
+        sessao.mount('http://', adaptador)
+        sessao.mount('https://', adaptador)
+    return sessao
+
+# Contadores do cache de token CSRF (compartilhados entre as threads de pedido)
+ESTATISTICAS_TOKEN = {'reaproveitado': 0, 'buscado': 0, 'renovado_pelo_post': 0, 'invalidado': 0}
+_trava_estatisticas = threading.Lock()
+
+def _contar_token(evento: str):
+    with _trava_estatisticas:
+        ESTATISTICAS_TOKEN[evento] += 1
+
+def resumo_cache_token() -> str:
+    """Texto curto com a taxa de acerto do cache de token CSRF (para logs/relatório)."""
+    with _trava_estatisticas:
+        usos = ESTATISTICAS_TOKEN['reaproveitado'] + ESTATISTICAS_TOKEN['buscado']
+        taxa = (ESTATISTICAS_TOKEN['reaproveitado'] / usos * 100) if usos else 0.0
+        return (
+            f"Token CSRF: {taxa:.0f}% reaproveitado "
+            f"({ESTATISTICAS_TOKEN['reaproveitado']} do cache, {ESTATISTICAS_TOKEN['buscado']} buscados, "
+            f"{ESTATISTICAS_TOKEN['renovado_pelo_post']} renovados pelo POST, "
+            f"{ESTATISTICAS_TOKEN['invalidado']} rejeitados pelo site)"
+        )
+
+def obter_token_csrf(sessao, url, forcar: bool = False):
+    """
+    Devolve o token de segurança (CSRF) da sessão.
+    O token fica guardado na própria sessão (junto dos cookies) e é reaproveitado entre
+    pedidos; a página só é baixada de novo na primeira vez ou com forcar=True.
+    """
+    token = getattr(sessao, 'token_csrf', None)
+    if token and not forcar:
+        _contar_token('reaproveitado')
+        return token
+
+    with medir('http_segundos', endpoint='token'):
+        resposta = sessao.get(url, timeout=TEMPO_TIMEOUT)
     resposta.raise_for_status() # Lança erro se a página der 404/500
     
-    soup = BeautifulSoup(resposta.texto if hasattr(resposta, 'texto') else resposta.text, 'html.parser')
-    input_token = soup.find('input', {'name': 'csrfmiddlewaretoken'})
-    
-    if not input_token:
+    token = extrair_token_csrf(resposta.text)
+    if not token:
         raise RuntimeError('Token de segurança (CSRF) não encontrado na página.')
-    return input_token['value']
 
-def interpretar_resposta_pedido(html: str):
-    """Lê o HTML de resposta do pedido para saber se deu certo ou errado."""
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Procura mensagem de erro (alert-danger)
-    div_erro = soup.select_one('.alert.alert-danger.alert-dismissable.fade.in')
-    if div_erro:
-        return False, div_erro.get_text(" ", strip=True)
-    
-    # Procura mensagem de sucesso (alert-success)
-    div_sucesso = soup.select_one('.alert.alert-success.alert-dismissable.fade.in')
-    if div_sucesso:
-        return True, div_sucesso.get_text(" ", strip=True)
-        
-    return False, 'Não encontrei mensagem de confirmação no site.'
+    _contar_token('buscado')
+    sessao.token_csrf = token
+    return token
 
-def _extrair_prato_do_banner(banner):
-    """Extrai o nome do prato de um banner jumbotron."""
-    texto_banner = banner.get_text(" ", strip=True)
-    if "não cadastrado" in texto_banner.lower():
-        return "Cardápio não cadastrado"
-    
-    paragrafos = banner.find_all('p')
-    for p in paragrafos:
-        texto_p = p.get_text(" ", strip=True)
-        if "Prato Principal" in texto_p:
-            match_prato = re.search(r'Opção 1:\s*(.*?)(?:\s+Opção 2:|$)', texto_p, re.IGNORECASE)
-            if match_prato:
-                return match_prato.group(1).strip()
-            else:
-                return texto_p.replace("Prato Principal:", "").strip()
-    return "Prato não identificado no texto"
-
-
-def _buscar_banner_por_data(banners, data_alvo, meses):
-    """Procura um banner com a data especificada."""
-    for banner in banners:
-        tag_titulo = banner.find('h2', class_='display-3')
-        if not tag_titulo:
-            continue
-        texto_titulo = tag_titulo.get_text(" ", strip=True)
-        match = re.search(r'(\d{1,2})\s+de\s+([A-Za-zçÇ]+)\s+de\s+(\d{4})', texto_titulo, re.IGNORECASE)
-        if match:
-            d, nome_mes, y = match.groups()
-            mes_num = meses.get(nome_mes.capitalize())
-            if mes_num:
-                data_cardapio = datetime(int(y), mes_num, int(d)).date()
-                if data_cardapio == data_alvo:
-                    return banner
-    return None
+def _token_rejeitado(resposta, html: str) -> bool:
+    """Indica se o site recusou o POST por causa do token CSRF (expirado/inválido)."""
+    return resposta.status_code == 403 or 'CSRF verification failed' in html
+
+MENSAGEM_SEM_AVISO = 'Não encontrei mensagem de confirmação no site.'
 
+def interpretar_resposta_pedido(html: str):
+    """Lê o HTML de resposta do pedido para saber se deu certo ou errado."""
+    alerta = extrair_alerta(html)
+    if alerta:
+        return alerta
+    return False, MENSAGEM_SEM_AVISO
 
 def buscar_cardapio_site(sessao, data_pedido=None):
     """
@@ -118,34 +126,31 @@ def buscar_cardapio_site(sessao, data_pedido=None):
     if data_pedido and data_pedido != data_alvo_site:
         logging.info(f"📌 Data do PEDIDO é {data_pedido} (diferente do cardápio visível hoje)")
 
-    meses = {
-        'Janeiro': 1, 'Fevereiro': 2, 'Março': 3, 'Abril': 4, 'Maio': 5, 'Junho': 6,
-        'Julho': 7, 'Agosto': 8, 'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
-    }
-
     try:
-        resposta = sessao.get(URL_PRINCIPAL, timeout=TEMPO_TIMEOUT)
+        with medir('http_segundos', endpoint='cardapio'):
+            resposta = sessao.get(URL_PRINCIPAL, timeout=TEMPO_TIMEOUT)
         resposta.raise_for_status()
-        soup = BeautifulSoup(resposta.text, 'html.parser')
-        todos_banners = soup.select('.jumbotron')
-
-        # 1. Salva TODOS os banners encontrados no banco (para uso futuro)
-        prato_por_data = {}
-        for banner in todos_banners:
-            tag_titulo = banner.find('h2', class_='display-3')
-            if not tag_titulo:
-                continue
-            texto_titulo = tag_titulo.get_text(" ", strip=True)
-            match = re.search(r'(\d{1,2})\s+de\s+([A-Za-zçÇ]+)\s+de\s+(\d{4})', texto_titulo, re.IGNORECASE)
-            if match:
-                d, nome_mes, y = match.groups()
-                mes_num = meses.get(nome_mes.capitalize())
-                if mes_num:
-                    data_banner = datetime(int(y), mes_num, int(d)).date()
-                    prato_banner = _extrair_prato_do_banner(banner)
-                    prato_por_data[data_banner] = prato_banner
-                    atualizar_prato_dia(data_banner, prato_banner)
-                    logging.info(f"Cardápio salvo -> Dia: {data_banner} | Prato: {prato_banner}")
+        # 1. Lê todos os banners de uma vez e compara com o que já está no banco:
+        # só dias novos ou com prato diferente são gravados (em lote)
+        # Página idêntica à da última execução: reaproveita a interpretação guardada
+        interpretado = ler_interpretacao('cardapio', resposta.content, VERSAO_INTERPRETACAO)
+        if interpretado is not None:
+            prato_por_data = {date.fromisoformat(dia): prato for dia, prato in interpretado.items()}
+        else:
+            prato_por_data = interpretar_cardapio(resposta.text)
+            gravar_interpretacao(
+                'cardapio', resposta.content,
+                {dia.isoformat(): prato for dia, prato in prato_por_data.items()},
+                VERSAO_INTERPRETACAO
+            )
+        datas_consulta = set(prato_por_data) | ({data_pedido} if data_pedido else set())
+        pratos_salvos = buscar_pratos_por_datas(datas_consulta)
+
+        alterados = pratos_alterados(prato_por_data, pratos_salvos)
+        for data_banner, prato_banner in alterados.items():
+            atualizar_prato_dia(data_banner, prato_banner)
+            logging.info(f"Cardápio novo/alterado -> Dia: {data_banner} | Prato: {prato_banner}")
+        logging.info(f"🍽️ Cardápio: {len(prato_por_data)} dias no site, {len(alterados)} novos/alterados.")
 
         # 2. Determina qual prato retornar para checagem de bloqueios
         # PRIORIDADE: prato da data_pedido (dia que o aluno vai comer)
@@ -156,7 +161,7 @@ def buscar_cardapio_site(sessao, data_pedido=None):
             logging.info(f"✅ Prato da data do PEDIDO ({data_pedido}) encontrado no site: {prato_para_bloqueio}")
         elif data_pedido:
             # Tenta buscar do banco de dados (pode ter sido salvo em execução anterior)
-            prato_banco = buscar_prato_por_data(data_pedido)
+            prato_banco = pratos_salvos.get(data_pedido)
             if prato_banco and "não" not in prato_banco.lower() and "erro" not in prato_banco.lower():
                 prato_para_bloqueio = prato_banco
                 logging.info(f"✅ Prato da data do PEDIDO ({data_pedido}) encontrado no BANCO: {prato_para_bloqueio}")
@@ -179,19 +184,86 @@ def buscar_cardapio_site(sessao, data_pedido=None):
         logging.error(f"Erro ao ler cardápio do site: {e}")
         return "(erro na atualização)"
 
-def realizar_pedido(sessao, prontuario: str):
-    """Envia a requisição POST para fazer o pedido."""
+def _ler_resposta_pedido(resposta) -> tuple[str, bool]:
+    """
+    Lê o corpo da resposta do pedido em blocos e para assim que o aviso de erro/sucesso
+    estiver completo, liberando a conexão sem baixar o resto da página.
+    Se nenhum aviso aparecer, lê até o fim (mesmo resultado de resposta.text).
+
+    Returns:
+        tuple[str, bool]: (html lido, True se a página foi lida inteira)
+    """
+    decodificador = codecs.getincrementaldecoder(resposta.encoding or 'utf-8')(errors='replace')
+    html = ''
     try:
-        token = obter_token_csrf(sessao, URL_PRINCIPAL)
-        dados = {
-            'csrfmiddlewaretoken': token, 
-            'prontuario': prontuario, 
-            'tipo': '1' # Código para almoço padrão?
-        }
-        cabecalhos = {'Referer': URL_PRINCIPAL}
-        
-        resposta = sessao.post(URL_PRINCIPAL, data=dados, headers=cabecalhos, timeout=TEMPO_TIMEOUT)
-        return interpretar_resposta_pedido(resposta.text)
+        for bloco in resposta.iter_content(chunk_size=TAMANHO_BLOCO_LEITURA):
+            html += decodificador.decode(bloco)
+            if alerta_completo(html):
+                return html, False
+        return html + decodificador.decode(b'', final=True), True
+    finally:
+        resposta.close()
+
+def _enviar_pedido(sessao, token: str, prontuario: str):
+    """Faz o POST do pedido. Retorna (resposta, html, página_inteira)."""
+    dados = {
+        'csrfmiddlewaretoken': token, 
+        'prontuario': prontuario, 
+        'tipo': '1' # Código para almoço padrão?
+    }
+    cabecalhos = {'Referer': URL_PRINCIPAL}
+
+    # O tempo medido inclui a leitura do corpo (até o aviso, no modo streaming)
+    with medir('http_segundos', endpoint='pedido'):
+        if not LEITURA_STREAMING:
+            resposta = sessao.post(URL_PRINCIPAL, data=dados, headers=cabecalhos, timeout=TEMPO_TIMEOUT)
+            return resposta, resposta.text, True
+
+        resposta = sessao.post(URL_PRINCIPAL, data=dados, headers=cabecalhos, timeout=TEMPO_TIMEOUT, stream=True)
+        html, pagina_inteira = _ler_resposta_pedido(resposta)
+        return resposta, html, pagina_inteira
+
+def sondar_site() -> bool:
+    """Sondagem usada pelo disjuntor: o site respondeu a página inicial sem erro de servidor?"""
+    with criar_sessao() as sessao:
+        resposta = sessao.get(URL_PRINCIPAL, timeout=TEMPO_TIMEOUT)
+        return resposta.status_code < 500
+
+# Ritmo/concorrência dos pedidos e disjuntor, compartilhados por todas as threads de pedido
+controle_site = ControladorSaude(sonda=sondar_site)
+
+def realizar_pedido(sessao, prontuario: str, prazo: datetime | None = None):
+    """
+    Envia a requisição POST para fazer o pedido.
+    Passa pelo controle de saúde do site: espera a vez (ritmo, concorrência e disjuntor,
+    no máximo até `prazo`) e informa se o site respondeu bem (erro de rede, 5xx ou página sem aviso contam como falha).
+    """
+    try:
+        with controle_site.requisicao(prazo) as saude:
+            token = obter_token_csrf(sessao, URL_PRINCIPAL)
+            resposta, html, pagina_inteira = _enviar_pedido(sessao, token, prontuario)
+
+            # Token recusado: descarta o do cache, busca outro e tenta uma única vez mais
+            if _token_rejeitado(resposta, html):
+                _contar_token('invalidado')
+                sessao.token_csrf = None
+                token = obter_token_csrf(sessao, URL_PRINCIPAL, forcar=True)
+                resposta, html, pagina_inteira = _enviar_pedido(sessao, token, prontuario)
+
+            # Aviso de erro interno do site também conta como falha do site (não do aluno)
+            alerta = extrair_alerta(html)
+            if resposta.status_code >= 500 or alerta is None or classificar(*alerta) == SERVIDOR:
+                saude.falhou()
+
+        # A página devolvida pelo POST traz o formulário de novo: guarda o token mais recente.
+        # Se a leitura parou no aviso, o formulário não veio e o token do cache continua valendo.
+        if pagina_inteira:
+            token_novo = extrair_token_csrf(html)
+            if token_novo and token_novo != token:
+                _contar_token('renovado_pelo_post')
+                sessao.token_csrf = token_novo
+
+        return alerta or (False, MENSAGEM_SEM_AVISO)
         
     except Exception as e:
         return False, str(e)
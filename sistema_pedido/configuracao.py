@@ -5,11 +5,32 @@ from zoneinfo import ZoneInfo
 # === Configurações Gerais do Sistema ===
 
 # URL do site do refeitório onde os pedidos são feitos
-URL_PRINCIPAL = 'http://200.133.203.133/home'
+# (URL_SITE permite apontar para outro servidor, ex: o refeitório falso dos benchmarks)
+URL_PRINCIPAL = os.getenv('URL_SITE', 'http://200.133.203.133/home')
 
-# Intervalo máximo de atraso aleatório (em segundos) para simular comportamento humano
-# Isso evita que todos os pedidos sejam feitos exatamente no mesmo milissegundo
-ATRASO_MAXIMO = 120  
+# Os pedidos são espalhados em horários aleatórios dentro de uma janela (comportamento humano),
+# em vez de somar uma pausa aleatória por aluno. A janela termina FOLGA_CORTE_MINUTOS antes
+# do horário de corte e dura no máximo JANELA_DESPACHO segundos.
+JANELA_DESPACHO = int(os.getenv('JANELA_DESPACHO', 1800))
+FOLGA_CORTE_MINUTOS = int(os.getenv('FOLGA_CORTE_MINUTOS', 30))
+
+# Intervalo mínimo (em segundos) entre dois pedidos enviados ao site
+ESPACAMENTO_MINIMO = float(os.getenv('ESPACAMENTO_MINIMO', 2))
+
+# Cache HTTP em disco (GET condicional com ETag/Last-Modified) para as páginas do site.
+# URLS_CACHE_HTTP: prefixos de URL que podem usar o cache, separados por vírgula.
+# Vazio desliga o cache. Só a sessão que lê o cardápio usa o cache: as sessões de
+# pedido sempre baixam a página para receber token e cookies novos.
+PASTA_CACHE_HTTP = os.getenv('PASTA_CACHE_HTTP', '.cache_http')
+URLS_CACHE_HTTP = [url.strip() for url in os.getenv('URLS_CACHE_HTTP', URL_PRINCIPAL).split(',') if url.strip()]
+
+# Gravação/reprodução das respostas do site (testes de desempenho sem rede):
+# MODO_HTTP vazio (normal), 'gravar' (acessa o site e grava em ARQUIVO_HTTP) ou
+# 'reproduzir' (responde com as gravações). ESCALA_TEMPO_HTTP multiplica o tempo
+# de resposta gravado na reprodução (0 = responde na hora).
+MODO_HTTP = os.getenv('MODO_HTTP', '')
+ARQUIVO_HTTP = os.getenv('ARQUIVO_HTTP', 'gravacoes/refeitorio.jsonl.gz')
+ESCALA_TEMPO_HTTP = float(os.getenv('ESCALA_TEMPO_HTTP', 1))
 
 # Quantas vezes tentar fazer o pedido em caso de erro
 TENTATIVAS_PEDIDO = 2
@@ -20,6 +41,29 @@ TEMPO_ESPERA_ERRO = 30
 # Tempo limite (em segundos) para esperar uma resposta do site
 TEMPO_TIMEOUT = 10
 
+# Como ler o HTML das respostas do site: 'rapido' (regex direcionada, padrão),
+# 'lxml' (se instalado) ou 'bs4' (BeautifulSoup). Se o escolhido não achar nada, cai no bs4.
+EXTRATOR_HTML = os.getenv('EXTRATOR_HTML', 'rapido')
+
+# Lê a resposta do pedido em blocos e para de baixar assim que o aviso de erro/sucesso
+# estiver completo (o resto da página, com o cardápio inteiro, não é necessário)
+LEITURA_STREAMING = os.getenv('LEITURA_STREAMING', '1') == '1'
+TAMANHO_BLOCO_LEITURA = int(os.getenv('TAMANHO_BLOCO_LEITURA', 4096))
+
+# Quantos pedidos podem estar em andamento ao mesmo tempo (cada um com sua sessão/cookies)
+PEDIDOS_SIMULTANEOS = int(os.getenv('PEDIDOS_SIMULTANEOS', 4))
+
+# Controle de saúde do site (saude_site.py): respostas acima de LATENCIA_ALVO_SITE segundos
+# reduzem o ritmo; FALHAS_PARA_ABRIR falhas seguidas (ou TAXA_ERRO_ABRIR das últimas respostas)
+# pausam todos os pedidos por PAUSA_DISJUNTOR segundos (dobrando até PAUSA_MAXIMA_DISJUNTOR
+# enquanto o site não voltar). Depois de ESPERA_MAXIMA_SITE segundos parado, o pedido desiste.
+LATENCIA_ALVO_SITE = float(os.getenv('LATENCIA_ALVO_SITE', 3))
+FALHAS_PARA_ABRIR = int(os.getenv('FALHAS_PARA_ABRIR', 5))
+TAXA_ERRO_ABRIR = float(os.getenv('TAXA_ERRO_ABRIR', 0.5))
+PAUSA_DISJUNTOR = float(os.getenv('PAUSA_DISJUNTOR', 30))
+PAUSA_MAXIMA_DISJUNTOR = float(os.getenv('PAUSA_MAXIMA_DISJUNTOR', 300))
+ESPERA_MAXIMA_SITE = float(os.getenv('ESPERA_MAXIMA_SITE', 900))
+
 # === Configurações de E-mail (Gmail) ===
 EMAIL_USUARIO = os.getenv('EMAIL_USER')
 EMAIL_SENHA   = os.getenv('EMAIL_PASS')
@@ -38,6 +82,42 @@ ADMINISTRADORES = os.getenv('ADMINS_E164', '')
 # === Banco de Dados ===
 URL_BANCO_DADOS = os.getenv('DATABASE_URL')
 
+# Pool de conexões compartilhado por todas as consultas (evita um handshake TCP+TLS por consulta)
+POOL_MIN_CONEXOES = int(os.getenv('DB_POOL_MIN', 1))
+POOL_MAX_CONEXOES = int(os.getenv('DB_POOL_MAX', 4))
+
+# Tempo máximo (em segundos) esperando uma conexão livre no pool
+POOL_TEMPO_ESPERA = float(os.getenv('DB_POOL_TIMEOUT', 30))
+
+# Escritas no banco (histórico de pedidos e cardápio) são acumuladas e gravadas em lote:
+# grava quando juntar TAMANHO_LOTE_ESCRITA linhas ou a cada INTERVALO_ESCRITA segundos
+TAMANHO_LOTE_ESCRITA = int(os.getenv('DB_LOTE_TAMANHO', 50))
+INTERVALO_ESCRITA = float(os.getenv('DB_LOTE_INTERVALO', 10))
+
+# Uma linha do lote que falha em TENTATIVAS_ESCRITA descargas seguidas sai do buffer e vai
+# para ARQUIVO_ESCRITAS_REJEITADAS (JSON por linha), em vez de voltar para a fila de novo
+TENTATIVAS_ESCRITA = int(os.getenv('DB_TENTATIVAS_ESCRITA', 3))
+ARQUIVO_ESCRITAS_REJEITADAS = os.getenv('DB_ARQUIVO_REJEITADAS', 'escritas_rejeitadas.jsonl')
+
+# Histórico de pedidos particionado por mês de dia_pedido: quantos meses à frente ficam
+# com partição pronta e quantos meses de histórico ficam no banco antes de irem para
+# arquivos .csv.gz em DIRETORIO_ARQUIVO_PEDIDOS (python -m sistema_pedido.particoes arquivar)
+MESES_PARTICOES_FUTURAS = int(os.getenv('MESES_PARTICOES_FUTURAS', 3))
+MESES_RETENCAO_PEDIDOS = int(os.getenv('MESES_RETENCAO_PEDIDOS', 12))
+DIRETORIO_ARQUIVO_PEDIDOS = os.getenv('DIRETORIO_ARQUIVO_PEDIDOS', 'arquivo_pedidos')
+
+# Gravação/reprodução HTTP não é um dia de verdade: o histórico, o diário e a caixa de saída
+# iriam para o banco de produção (e a retomada trataria os alunos como resolvidos). Nesses
+# modos o banco vem de DATABASE_URL_REPRODUCAO (um banco descartável; vazio roda sem banco)
+# e e-mail e WhatsApp ficam desligados.
+if MODO_HTTP in ('gravar', 'reproduzir'):
+    URL_BANCO_DADOS = os.getenv('DATABASE_URL_REPRODUCAO', '')
+    if URL_BANCO_DADOS == os.getenv('DATABASE_URL'):
+        URL_BANCO_DADOS = ''  # nunca o banco de produção, mesmo se configurado igual
+    EMAIL_USUARIO = EMAIL_DESTINO = None
+    URL_BOT_WHATSAPP = None
+    ADMINISTRADORES = ''
+
 # === Configurações de Tempo e Fuso Horário ===
 # Fuso horário oficial do campus (São Paulo)
 FUSO_HORARIO = ZoneInfo('America/Sao_Paulo')
@@ -47,6 +127,27 @@ FUSO_HORARIO = ZoneInfo('America/Sao_Paulo')
 HORA_CORTE = 13
 MINUTO_CORTE = 15
 
+# === Daemon (python -m sistema_pedido.daemon) ===
+# Horários (hora de São Paulo, dias úteis) em que o daemon dispara a execução de pedidos;
+# os mesmos do cron do GitHub Actions (09:00 e 16:00 UTC)
+HORARIOS_EXECUCAO = [horario.strip() for horario in os.getenv('HORARIOS_EXECUCAO', '06:00,13:00').split(',') if horario.strip()]
+
+# De quanto em quanto tempo (s) o daemon relê o cardápio e entrega a caixa de saída entre execuções
+INTERVALO_CARDAPIO = int(os.getenv('INTERVALO_CARDAPIO', 1800))
+
+# Endpoint local de saúde/status do daemon (GET /saude e /metricas)
+HOST_SAUDE = os.getenv('HOST_SAUDE', '127.0.0.1')
+PORTA_SAUDE = int(os.getenv('PORTA_SAUDE', 8097))
+
+# Pasta onde cada execução grava suas métricas (JSON + formato texto do Prometheus)
+DIRETORIO_METRICAS = os.getenv('DIRETORIO_METRICAS', 'metricas')
+
+# Modo de perfilamento (cProfile + tracemalloc por fase). Também ligado com --perfilar.
+# Contra o site real os pedidos mantêm o espaçamento do agendador; com MODO_HTTP=reproduzir
+# o agendador não dorme entre eles
+PERFILAR = os.getenv('PERFILAR', '0') == '1'
+DIRETORIO_PERFIL = os.getenv('DIRETORIO_PERFIL', 'perfil')
+
 # Configuração básica de logs (mensagens no terminal)
 logging.basicConfig(
     format='%(asctime)s %(levelname)s: %(message)s',
@@ -60,9 +161,11 @@ def validar_configuracao():
         erros.append("EMAIL_USER não definido")
     if not EMAIL_SENHA:
         erros.append("EMAIL_PASS não definido")
-    if not URL_BANCO_DADOS:
+    if not URL_BANCO_DADOS and not MODO_HTTP:
         erros.append("DATABASE_URL não definido")
     
+    if MODO_HTTP:
+        logging.info("🎞️ MODO_HTTP=%s: sem banco de produção, e-mail ou WhatsApp nesta execução.", MODO_HTTP)
     if erros:
         logging.warning("⚠️ Algumas configurações estão faltando: %s", ", ".join(erros))
     else:
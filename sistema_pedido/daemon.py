@@ -0,0 +1,221 @@
+"""
+Daemon do sistema de pedidos: fica rodando ao lado do bot de WhatsApp em vez de subir
+do zero a cada execução do GitHub Actions.
+
+- Mantém aquecidos o pool do banco, a sessão do cardápio (com cache HTTP) e as threads de
+  pedido com as suas sessões (conexões keep-alive e token CSRF).
+- Dispara principal() nos HORARIOS_EXECUCAO dos dias úteis. Se subir depois de um horário
+  de hoje, roda esse horário na hora, desde que o corte dele ainda não tenha passado.
+- Entre execuções, a cada INTERVALO_CARDAPIO segundos, relê o cardápio, atualiza os
+  vereditos de bloqueio (só os dias que mudaram) e entrega a caixa de saída; uma vez por dia garante as partições
+  dos próximos meses do histórico e arquiva as que passaram de MESES_RETENCAO_PEDIDOS.
+- Responde em http://HOST_SAUDE:PORTA_SAUDE/saude (estado em JSON) e /metricas (formato
+  texto do Prometheus, da última execução).
+
+    python -m sistema_pedido.daemon
+
+SIGTERM/SIGINT encerram o daemon; uma execução em andamento termina antes.
+"""
+import json
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta, time as hora_do_dia
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from sistema_pedido.configuracao import (
+    FUSO_HORARIO, HORARIOS_EXECUCAO, INTERVALO_CARDAPIO, HOST_SAUDE, PORTA_SAUDE,
+    validar_configuracao
+)
+from sistema_pedido.utils import data_alvo_pedido
+from sistema_pedido.banco_dados import abrir_pool, estatisticas_pool, descarregar_escritas, fechar_pool
+from sistema_pedido.particoes import garantir_particoes, arquivar_particoes_antigas
+from sistema_pedido.bloqueios import atualizar_vereditos
+from sistema_pedido.cliente_site import buscar_cardapio_site, criar_sessao, controle_site
+from sistema_pedido.motor_pedidos import manter_trabalhadores, encerrar_trabalhadores
+from sistema_pedido.iniciar_pedidos import principal, alertar_erro_fatal
+from sistema_pedido.servicos.caixa_saida import drenar_caixa_saida
+from sistema_pedido import metricas
+
+# Dias (isoweekday) em que há execução de pedidos: segunda a sexta, como no cron
+DIAS_EXECUCAO = {1, 2, 3, 4, 5}
+
+# Estado exposto em /saude (atualizado pelo laço principal)
+_estado = {
+    'iniciado_em': None,
+    'executando': False,
+    'execucoes': 0,
+    'proxima_execucao': None,
+    'ultima_execucao': None,   # {'inicio', 'fim', 'sucesso', 'erro'}
+    'ultimo_cardapio': None,   # {'em', 'data_pedido', 'prato', 'erro'}
+}
+_trava_estado = threading.Lock()
+
+def _atualizar_estado(**valores):
+    with _trava_estado:
+        _estado.update(valores)
+
+def horarios_configurados() -> list[hora_do_dia]:
+    """HORARIOS_EXECUCAO ('HH:MM') convertidos e em ordem."""
+    return sorted(hora_do_dia.fromisoformat(horario) for horario in HORARIOS_EXECUCAO)
+
+def proximo_horario(agora: datetime, horarios: list[hora_do_dia]) -> datetime | None:
+    """Primeiro horário de execução depois de `agora` (só dias úteis). None se não há horários."""
+    for dias in range(8):
+        dia = agora.date() + timedelta(days=dias)
+        if dia.isoweekday() not in DIAS_EXECUCAO:
+            continue
+        for horario in horarios:
+            instante = datetime.combine(dia, horario, tzinfo=FUSO_HORARIO)
+            if instante > agora:
+                return instante
+    return None
+
+def horario_perdido(agora: datetime, horarios: list[hora_do_dia]) -> datetime | None:
+    """
+    Último horário de hoje que já passou (o daemon subiu depois dele) e que ainda pode ser
+    recuperado: rodando agora o pedido sai para o mesmo dia que sairia no horário, ou seja,
+    o corte (HORA_CORTE:MINUTO_CORTE) que vinha depois dele ainda não passou. None se não há.
+    Rodar de novo um horário que já tinha rodado é inofensivo: a execução retoma pelo diário.
+    """
+    if agora.isoweekday() not in DIAS_EXECUCAO:
+        return None
+    passados = [
+        instante for instante in (datetime.combine(agora.date(), horario, tzinfo=FUSO_HORARIO) for horario in horarios)
+        if instante <= agora
+    ]
+    if passados and data_alvo_pedido(passados[-1]) == data_alvo_pedido(agora):
+        return passados[-1]
+    return None
+
+# --- Endpoint de saúde ---
+
+class _ManipuladorSaude(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/saude':
+            with _trava_estado:
+                corpo = dict(_estado)
+            corpo['pool_banco'] = estatisticas_pool()
+            corpo['site'] = {'estado': controle_site.estado, **controle_site.estatisticas}
+            self._responder(200, 'application/json; charset=utf-8',
+                            json.dumps(corpo, ensure_ascii=False, default=str))
+        elif self.path == '/metricas':
+            self._responder(200, 'text/plain; version=0.0.4; charset=utf-8',
+                            metricas.formato_prometheus({'pool_banco': estatisticas_pool()}))
+        else:
+            self._responder(404, 'text/plain; charset=utf-8', 'não encontrado\n')
+
+    def _responder(self, status: int, tipo: str, texto: str):
+        corpo = texto.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+def iniciar_servidor_saude() -> ThreadingHTTPServer:
+    servidor = ThreadingHTTPServer((HOST_SAUDE, PORTA_SAUDE), _ManipuladorSaude)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='saude', daemon=True).start()
+    logging.info(f"🩺 Saúde do daemon em http://{HOST_SAUDE}:{PORTA_SAUDE}/saude")
+    return servidor
+
+# --- Tarefas ---
+
+def executar_pedidos_agendados(sessao_cardapio):
+    """Roda a execução completa de pedidos sem fechar o pool nem as sessões."""
+    inicio = datetime.now(FUSO_HORARIO)
+    _atualizar_estado(executando=True)
+    erro = None
+    try:
+        principal(fechar_banco=False, sessao_cardapio=sessao_cardapio)
+    except Exception as e:
+        erro = str(e)
+        logging.error(f"💀 ERRO FATAL na execução agendada: {e}")
+        alertar_erro_fatal(e)
+    finally:
+        with _trava_estado:
+            _estado['executando'] = False
+            _estado['execucoes'] += 1
+            _estado['ultima_execucao'] = {
+                'inicio': inicio, 'fim': datetime.now(FUSO_HORARIO), 'sucesso': erro is None, 'erro': erro,
+            }
+
+def atualizar_cardapio(sessao_cardapio):
+    """Relê o cardápio (o cache HTTP faz disso um GET condicional), atualiza os vereditos e entrega a caixa de saída."""
+    agora = datetime.now(FUSO_HORARIO)
+    data_pedido = data_alvo_pedido(agora)
+    try:
+        prato = buscar_cardapio_site(sessao_cardapio, data_pedido)
+        atualizar_vereditos(agora.date())
+        descarregar_escritas()
+        _atualizar_estado(ultimo_cardapio={'em': agora, 'data_pedido': data_pedido, 'prato': prato, 'erro': None})
+    except Exception as e:
+        logging.error(f"❌ Erro ao atualizar o cardápio: {e}")
+        _atualizar_estado(ultimo_cardapio={'em': agora, 'data_pedido': data_pedido, 'prato': None, 'erro': str(e)})
+    drenar_caixa_saida()
+
+# --- Laço principal ---
+
+def rodar():
+    validar_configuracao()
+    horarios = horarios_configurados()
+    parar = threading.Event()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sinal, lambda *_: parar.set())
+
+    # Aquece tudo antes do primeiro horário
+    abrir_pool()
+    manter_trabalhadores()
+    sessao_cardapio = criar_sessao(com_cache=True)
+    servidor = iniciar_servidor_saude()
+    _atualizar_estado(iniciado_em=datetime.now(FUSO_HORARIO))
+
+    agora = datetime.now(FUSO_HORARIO)
+    proxima = horario_perdido(agora, horarios)
+    if proxima is not None:
+        logging.warning(f"⏰ Daemon subiu depois do horário das {proxima:%H:%M} e antes do corte: executando agora.")
+    else:
+        proxima = proximo_horario(agora, horarios)
+    proximo_cardapio = datetime.now(FUSO_HORARIO)
+    dia_particoes = None
+    logging.info(f"⏰ Daemon no ar. Próxima execução: {proxima}")
+
+    try:
+        while not parar.is_set():
+            agora = datetime.now(FUSO_HORARIO)
+            _atualizar_estado(proxima_execucao=proxima)
+
+            if proxima is not None and agora >= proxima:
+                executar_pedidos_agendados(sessao_cardapio)
+                agora = datetime.now(FUSO_HORARIO)
+                proxima = proximo_horario(agora, horarios)
+                proximo_cardapio = agora + timedelta(seconds=INTERVALO_CARDAPIO)
+                logging.info(f"⏰ Próxima execução: {proxima}")
+            elif agora >= proximo_cardapio:
+                if dia_particoes != agora.date():
+                    try:
+                        garantir_particoes()
+                    except Exception as e:
+                        logging.error(f"❌ Erro ao criar as partições do histórico: {e}")
+                    try:
+                        arquivar_particoes_antigas()
+                    except Exception as e:
+                        logging.error(f"❌ Erro ao arquivar as partições antigas do histórico: {e}")
+                    dia_particoes = agora.date()
+                atualizar_cardapio(sessao_cardapio)
+                proximo_cardapio = datetime.now(FUSO_HORARIO) + timedelta(seconds=INTERVALO_CARDAPIO)
+            else:
+                alvo = min(instante for instante in (proxima, proximo_cardapio) if instante is not None)
+                parar.wait((alvo - agora).total_seconds())
+    finally:
+        logging.info("👋 Encerrando o daemon.")
+        servidor.shutdown()
+        encerrar_trabalhadores()
+        sessao_cardapio.close()
+        fechar_pool()
+
+if __name__ == '__main__':
+    rodar()
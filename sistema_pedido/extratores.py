@@ -0,0 +1,177 @@
+import re
+import html as html_lib
+import logging
+from bs4 import BeautifulSoup
+from sistema_pedido.configuracao import EXTRATOR_HTML
+from sistema_pedido.metricas import cronometrar
+
+# lxml é opcional: se não estiver instalado, o backend 'lxml' cai no extrator rápido
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Classes que identificam os avisos do site (mesma regra do seletor CSS antigo)
+CLASSES_ALERTA_ERRO = {'alert', 'alert-danger', 'alert-dismissable', 'fade', 'in'}
+CLASSES_ALERTA_SUCESSO = {'alert', 'alert-success', 'alert-dismissable', 'fade', 'in'}
+
+# === Extrator rápido (regex pré-compiladas, sem montar árvore do HTML) ===
+_RE_VALOR = re.compile(r'''\bvalue\s*=\s*["']([^"']*)["']''', re.IGNORECASE)
+_RE_NOME_TOKEN = re.compile(r'''\bname\s*=\s*["']csrfmiddlewaretoken["']''', re.IGNORECASE)
+_RE_DIV_ALERTA = re.compile(
+    r'''<div\b[^>]*\bclass\s*=\s*["']([^"']*\balert-(?:danger|success)\b[^"']*)["'][^>]*>''',
+    re.IGNORECASE
+)
+_RE_DIV_ABRE_FECHA = re.compile(r'<(/?)div\b[^>]*>', re.IGNORECASE)
+_RE_TAG = re.compile(r'<[^>]*>')
+
+def _texto_sem_tags(trecho: str) -> str:
+    """Equivalente ao get_text(" ", strip=True) do BeautifulSoup para um trecho de HTML."""
+    partes = (html_lib.unescape(parte).strip() for parte in _RE_TAG.split(trecho))
+    return " ".join(parte for parte in partes if parte)
+
+def _fechamento_div(html: str, inicio: int) -> int | None:
+    """A partir do fim de uma tag <div>, acha onde começa o </div> correspondente."""
+    profundidade = 1
+    for tag in _RE_DIV_ABRE_FECHA.finditer(html, inicio):
+        profundidade += -1 if tag.group(1) else 1
+        if profundidade == 0:
+            return tag.start()
+    return None
+
+def _token_rapido(html: str) -> str | None:
+    posicao = html.find('csrfmiddlewaretoken')
+    while posicao != -1:
+        inicio_tag = html.rfind('<', 0, posicao)
+        fim_tag = html.find('>', posicao)
+        tag = html[inicio_tag:fim_tag + 1]
+        if tag[:6].lower() == '<input' and _RE_NOME_TOKEN.search(tag):
+            valor = _RE_VALOR.search(tag)
+            if valor:
+                return html_lib.unescape(valor.group(1))
+        posicao = html.find('csrfmiddlewaretoken', posicao + 1)
+    return None
+
+def _alerta_rapido(html: str) -> tuple[bool, str] | None:
+    encontrados = {}
+    for div in _RE_DIV_ALERTA.finditer(html):
+        classes = set(div.group(1).split())
+        if CLASSES_ALERTA_ERRO <= classes:
+            tipo = False
+        elif CLASSES_ALERTA_SUCESSO <= classes:
+            tipo = True
+        else:
+            continue
+        if tipo in encontrados:
+            continue
+        fim = _fechamento_div(html, div.end())
+        if fim is None:
+            continue
+        encontrados[tipo] = _texto_sem_tags(html[div.end():fim])
+        if False in encontrados:
+            break
+
+    # Igual ao comportamento antigo: o aviso de erro tem prioridade sobre o de sucesso
+    for tipo in (False, True):
+        if tipo in encontrados:
+            return tipo, encontrados[tipo]
+    return None
+
+def alerta_completo(html: str) -> bool:
+    """
+    Indica se o trecho de HTML já decide o aviso do pedido, para a leitura em streaming
+    parar de baixar a resposta. Como em extrair_alerta, o aviso de erro tem prioridade,
+    então só o primeiro aviso de erro inteiro (até o </div>) decide antes do fim: um aviso
+    de sucesso não basta, porque um aviso de erro em qualquer ponto abaixo dele na página
+    ainda mudaria o resultado.
+    """
+    for div in _RE_DIV_ALERTA.finditer(html):
+        if CLASSES_ALERTA_ERRO <= set(div.group(1).split()):
+            return _fechamento_div(html, div.end()) is not None
+    return False
+
+# === Extrator lxml (opcional) ===
+def _xpath_classes(classes: set) -> str:
+    condicoes = " and ".join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {classe} ')" for classe in sorted(classes)
+    )
+    return f"//div[{condicoes}]"
+
+_XPATH_ERRO = _xpath_classes(CLASSES_ALERTA_ERRO)
+_XPATH_SUCESSO = _xpath_classes(CLASSES_ALERTA_SUCESSO)
+
+def _token_lxml(html: str) -> str | None:
+    valores = lxml_html.fromstring(html).xpath('//input[@name="csrfmiddlewaretoken"]/@value')
+    return valores[0] if valores else None
+
+def _alerta_lxml(html: str) -> tuple[bool, str] | None:
+    arvore = lxml_html.fromstring(html)
+    for tipo, xpath in ((False, _XPATH_ERRO), (True, _XPATH_SUCESSO)):
+        divs = arvore.xpath(xpath)
+        if divs:
+            partes = (texto.strip() for texto in divs[0].itertext())
+            return tipo, " ".join(parte for parte in partes if parte)
+    return None
+
+# === Extrator BeautifulSoup (lógica original, usada como rede de segurança) ===
+def _token_bs4(html: str) -> str | None:
+    soup = BeautifulSoup(html, 'html.parser')
+    input_token = soup.find('input', {'name': 'csrfmiddlewaretoken'})
+    return input_token['value'] if input_token else None
+
+def _alerta_bs4(html: str) -> tuple[bool, str] | None:
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Procura mensagem de erro (alert-danger)
+    div_erro = soup.select_one('.alert.alert-danger.alert-dismissable.fade.in')
+    if div_erro:
+        return False, div_erro.get_text(" ", strip=True)
+
+    # Procura mensagem de sucesso (alert-success)
+    div_sucesso = soup.select_one('.alert.alert-success.alert-dismissable.fade.in')
+    if div_sucesso:
+        return True, div_sucesso.get_text(" ", strip=True)
+
+    return None
+
+BACKENDS = {
+    'rapido': (_token_rapido, _alerta_rapido),
+    'lxml': (_token_lxml, _alerta_lxml),
+    'bs4': (_token_bs4, _alerta_bs4),
+}
+
+def _backend_configurado(nome: str) -> str:
+    if nome not in BACKENDS:
+        logging.warning(f"⚠️ Extrator HTML '{nome}' desconhecido. Usando o rápido.")
+        return 'rapido'
+    if nome == 'lxml' and lxml_html is None:
+        logging.warning("⚠️ lxml não está instalado. Usando o extrator rápido.")
+        return 'rapido'
+    return nome
+
+_BACKEND = _backend_configurado(EXTRATOR_HTML)
+
+@cronometrar('parse_segundos', alvo='token')
+def extrair_token_csrf(html: str, backend: str | None = None) -> str | None:
+    """
+    Procura o valor do input 'csrfmiddlewaretoken' no HTML.
+    Usa o backend configurado e, se ele não achar nada, repete com o BeautifulSoup.
+    """
+    nome = backend or _BACKEND
+    token = BACKENDS[nome][0](html)
+    if token is None and nome != 'bs4':
+        token = _token_bs4(html)
+    return token
+
+@cronometrar('parse_segundos', alvo='alerta')
+def extrair_alerta(html: str, backend: str | None = None) -> tuple[bool, str] | None:
+    """
+    Procura o aviso de erro/sucesso que o site mostra depois de um pedido.
+    Retorna (sucesso, texto) ou None se a página não tiver aviso.
+    Usa o backend configurado e, se ele não achar nada, repete com o BeautifulSoup.
+    """
+    nome = backend or _BACKEND
+    alerta = BACKENDS[nome][1](html)
+    if alerta is None and nome != 'bs4':
+        alerta = _alerta_bs4(html)
+    return alerta
@@ -0,0 +1,214 @@
+"""
+Modo fila: a execução do dia dividida entre vários processos trabalhadores, em uma ou
+várias máquinas, coordenados pelo banco (tabelas 'execucao_fila' e 'fila_pedido').
+
+- O coordenador faz a preparação de sempre (cardápio, vereditos, roster, bloqueios e
+  horários de despacho) e coloca os alunos na fila. Depois espera a fila esvaziar e monta
+  o relatório único de e-mail/WhatsApp a partir do diário da execução.
+- Cada trabalhador roda PEDIDOS_SIMULTANEOS threads; cada thread reserva um aluno por vez
+  (FOR UPDATE SKIP LOCKED) quando o horário de despacho dele está chegando. A reserva vale
+  SEGUNDOS_RESERVA e é renovada enquanto o trabalhador está vivo; se ele morrer, ela vence
+  e o aluno volta a ser pego por outro trabalhador.
+
+    python -m sistema_pedido.fila_trabalho coordenar [--trabalhar]
+    python -m sistema_pedido.fila_trabalho trabalhar [--dia AAAA-MM-DD]
+
+A saúde do site (disjuntor/AIMD) é controlada por processo: com N trabalhadores, o limite de
+pedidos simultâneos no site é N x PEDIDOS_SIMULTANEOS.
+"""
+import os
+import time
+import socket
+import logging
+import argparse
+import threading
+from datetime import datetime, date
+from functools import partial
+from sistema_pedido.configuracao import FUSO_HORARIO, validar_configuracao
+from sistema_pedido.utils import data_alvo_pedido
+from sistema_pedido.banco_dados import (
+    carregar_fila, buscar_execucao_fila, reservar_itens_fila, renovar_reservas_fila,
+    concluir_item_fila, situacao_fila, reservar_relatorio_fila, buscar_diario_execucao
+)
+from sistema_pedido.cliente_site import controle_site
+from sistema_pedido.classificacao import resumo_classificacao
+from sistema_pedido.metricas import medir
+from sistema_pedido.motor_pedidos import executar_em_paralelo
+from sistema_pedido.iniciar_pedidos import (
+    preparar_dia, processar_e_anotar, enviar_relatorios, reiniciar_execucao, encerrar_execucao
+)
+from sistema_pedido.servicos.caixa_saida import drenar_caixa_saida
+
+# Por quanto tempo um aluno reservado fica preso ao trabalhador sem renovação
+SEGUNDOS_RESERVA = 120
+
+# Um aluno é reservado até esse tanto de segundos antes do horário de despacho dele
+ANTECEDENCIA = 10
+
+# Intervalo máximo entre consultas à fila quando não há nada para pegar agora
+INTERVALO_FILA = 5
+
+# Quanto o coordenador espera a fila esvaziar (e o trabalhador espera a fila ser carregada)
+ESPERA_MAXIMA_FILA = 2 * 3600
+
+def nome_trabalhador() -> str:
+    """Identifica o processo na fila (máquina + pid)."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+def _aberto(situacao: dict) -> int:
+    return situacao['pendentes'] + situacao['reservados']
+
+def _aguardar_carga(data_pedido) -> dict:
+    """Espera o coordenador carregar o dia na fila e devolve o contexto do dia."""
+    limite = time.monotonic() + ESPERA_MAXIMA_FILA
+    while True:
+        execucao = buscar_execucao_fila(data_pedido)
+        if execucao is not None:
+            return execucao
+        if time.monotonic() >= limite:
+            raise TimeoutError(f'A fila de {data_pedido} não foi carregada em {ESPERA_MAXIMA_FILA}s')
+        logging.info(f"⏳ Aguardando o coordenador carregar a fila de {data_pedido}...")
+        time.sleep(INTERVALO_FILA)
+
+def _laco_thread(data_pedido, trabalhador: str, processar) -> int:
+    """
+    Uma thread do trabalhador: reserva um aluno, processa, marca como concluído e repete
+    até a fila do dia não ter mais nada pendente nem reservado. Retorna quantos processou.
+    """
+    processados = 0
+    while True:
+        itens = reservar_itens_fila(data_pedido, trabalhador, 1, SEGUNDOS_RESERVA, ANTECEDENCIA)
+        if itens:
+            aluno = itens[0]
+            if aluno['tentativas'] > 1:
+                logging.warning(f"♻️ Retomando {aluno['prontuario']}: a reserva anterior venceu.")
+            processar(aluno)
+            concluir_item_fila(data_pedido, aluno['id'])
+            processados += 1
+            continue
+
+        situacao = situacao_fila(data_pedido)
+        if not _aberto(situacao):
+            return processados
+
+        # Nada para pegar agora: espera o próximo despacho (ou reservas alheias vencerem)
+        espera = INTERVALO_FILA
+        if situacao['proximo_despacho'] is not None:
+            falta = (situacao['proximo_despacho'] - datetime.now(FUSO_HORARIO)).total_seconds() - ANTECEDENCIA
+            espera = min(max(falta, 0.1), INTERVALO_FILA)
+        time.sleep(espera)
+
+def trabalhar(data_pedido: date | None = None) -> int:
+    """
+    Processa alunos da fila do dia até ela esvaziar. Retorna quantos alunos este
+    trabalhador processou.
+    """
+    data_pedido = data_pedido or data_alvo_pedido(datetime.now(FUSO_HORARIO))
+    trabalhador = nome_trabalhador()
+    execucao = _aguardar_carga(data_pedido)
+    logging.info(f"👷 Trabalhador {trabalhador} pegando alunos da fila de {data_pedido}.")
+
+    processar = partial(
+        processar_e_anotar,
+        data_pedido=data_pedido,
+        texto_prato_dia=execucao['texto_prato_dia'],
+        nome_dia_semana=execucao['nome_dia_semana'],
+        prazo=execucao['prazo'].astimezone(FUSO_HORARIO),
+    )
+
+    # Batimento: renova as reservas deste trabalhador enquanto ele estiver vivo
+    parar = threading.Event()
+
+    def _renovar():
+        while not parar.wait(SEGUNDOS_RESERVA / 3):
+            renovar_reservas_fila(data_pedido, trabalhador, SEGUNDOS_RESERVA)
+
+    batimento = threading.Thread(target=_renovar, name='batimento-fila', daemon=True)
+    batimento.start()
+    try:
+        with medir('fase_segundos', fase='pedidos'):
+            processados = sum(executar_em_paralelo(partial(_laco_thread, data_pedido, trabalhador, processar)))
+    finally:
+        parar.set()
+
+    logging.info(f"🏁 Trabalhador {trabalhador} terminou: {processados} alunos processados.")
+    logging.info(f"🩺 {controle_site.resumo()}")
+    logging.info(f"🏷️ {resumo_classificacao()}")
+    return processados
+
+def _aguardar_fila_vazia(data_pedido) -> dict:
+    """Espera todos os alunos do dia serem concluídos (ou o tempo máximo) e devolve a situação final."""
+    limite = time.monotonic() + ESPERA_MAXIMA_FILA
+    while True:
+        situacao = situacao_fila(data_pedido)
+        if not _aberto(situacao) or time.monotonic() >= limite:
+            return situacao
+        logging.info(
+            f"⏳ Fila de {data_pedido}: {situacao['pendentes']} pendentes, {situacao['reservados']} "
+            f"reservados, {situacao['concluidos']} concluídos."
+        )
+        time.sleep(INTERVALO_FILA * 3)
+
+def coordenar(com_trabalhador: bool = False):
+    """
+    Prepara o dia, carrega a fila, espera os trabalhadores terminarem e envia o relatório
+    combinado (uma vez só, mesmo com mais de um coordenador). Com `com_trabalhador`, este
+    processo também pega alunos da fila enquanto espera.
+    """
+    agora = datetime.now(FUSO_HORARIO)
+    dia = preparar_dia(agora)
+    data_pedido = dia['data_pedido']
+
+    carregados = carregar_fila(
+        data_pedido, dia['nome_dia_semana'], dia['texto_prato_dia'], dia['prazo'], dia['alunos']
+    )
+    logging.info(f"📥 {carregados} alunos colocados na fila de {data_pedido}.")
+
+    if com_trabalhador:
+        trabalhar(data_pedido)
+    situacao = _aguardar_fila_vazia(data_pedido)
+
+    if not reservar_relatorio_fila(data_pedido):
+        logging.info("📨 O relatório deste dia já foi enviado por outro coordenador.")
+        return
+
+    # O diário tem o resultado de todos os alunos do dia (os deste carregamento e os já
+    # resolvidos antes); o roster é ordenado por prontuário, o relatório também
+    diario = buscar_diario_execucao(data_pedido, somente_finais=False)
+    detalhes_execucao = sorted(diario.values(), key=lambda resultado: resultado[0])
+    resumo_fila = [
+        f'Modo fila: {situacao["concluidos"]} alunos concluídos por {situacao["trabalhadores"]} trabalhadores',
+        f'Retomados após reserva vencida: {situacao["retomados"]}',
+    ]
+    if _aberto(situacao):
+        resumo_fila.append(
+            f'ATENÇÃO: {_aberto(situacao)} alunos ainda na fila após {ESPERA_MAXIMA_FILA}s de espera'
+        )
+    if dia['resolvidos']:
+        resumo_fila.append(f'Execução retomada: {len(dia["resolvidos"])} resultados reaproveitados do diário do dia')
+
+    with medir('fase_segundos', fase='relatorios'):
+        enviar_relatorios(
+            agora, data_pedido, dia['nome_dia_semana'], dia['texto_prato_dia'], detalhes_execucao, resumo_fila
+        )
+    with medir('fase_segundos', fase='caixa_saida'):
+        drenar_caixa_saida()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Execução de pedidos dividida entre vários trabalhadores.')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    coordenador = subcomandos.add_parser('coordenar', help='carrega a fila do dia e envia o relatório no final')
+    coordenador.add_argument('--trabalhar', action='store_true', help='também processa alunos da fila')
+    trabalhador = subcomandos.add_parser('trabalhar', help='processa alunos da fila até ela esvaziar')
+    trabalhador.add_argument('--dia', type=date.fromisoformat, help='dia do pedido (padrão: data-alvo de agora)')
+    args = parser.parse_args()
+
+    reiniciar_execucao()
+    try:
+        validar_configuracao()
+        if args.comando == 'coordenar':
+            coordenar(com_trabalhador=args.trabalhar)
+        else:
+            trabalhar(args.dia)
+    finally:
+        encerrar_execucao()
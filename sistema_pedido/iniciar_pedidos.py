@@ -1,145 +1,172 @@
+import sys
 import time
-import random
-import requests
 import logging
 from datetime import datetime
+from functools import partial
+from contextlib import contextmanager
 from sistema_pedido.configuracao import (
-    FUSO_HORARIO, ATRASO_MAXIMO, TENTATIVAS_PEDIDO, TEMPO_ESPERA_ERRO, 
-    validar_configuracao
+    FUSO_HORARIO, TENTATIVAS_PEDIDO, URL_BANCO_DADOS, PERFILAR, validar_configuracao
 )
-from sistema_pedido.utils import data_alvo_pedido, verificar_bloqueios, DIAS_SEMANA_PT
+from sistema_pedido.utils import data_alvo_pedido, DIAS_SEMANA_PT
+from sistema_pedido.bloqueios import MotorBloqueios, atualizar_vereditos
 from sistema_pedido.cliente_site import (
-    buscar_cardapio_site, realizar_pedido, validar_erro_relevante
+    buscar_cardapio_site, realizar_pedido, validar_erro_relevante, criar_sessao,
+    resumo_cache_token, ESTATISTICAS_TOKEN, controle_site
 )
 from sistema_pedido.banco_dados import (
-    buscar_alunos_para_dia, buscar_pratos_bloqueados,
-    registrar_historico_pedido, buscar_cancelamento_direto,
-    buscar_telefone_aluno
+    buscar_contexto_do_dia, registrar_historico_pedido, enfileirar_mensagem, fechar_pool,
+    abrir_pool, estatisticas_pool, registrar_diario_execucao, buscar_diario_execucao, descarregar_escritas
+)
+from sistema_pedido.cache_http import resumo_cache_http, ESTATISTICAS_CACHE_HTTP
+from sistema_pedido.classificacao import (
+    classificar, POLITICAS, contar_categoria, reiniciar_contagem, resumo_classificacao,
+    ESTATISTICAS_CLASSIFICACAO
+)
+from sistema_pedido import metricas
+from sistema_pedido.metricas import medir
+from sistema_pedido.perfilador import ativar as ativar_perfilamento, perfilar_fase
+from sistema_pedido.motor_pedidos import executar_pedidos, sessao_do_trabalhador
+from sistema_pedido.agendador import (
+    calcular_prazo, planejar_despachos, aguardar_ate, espera_retentativa
 )
 from sistema_pedido.servicos.email import enviar_email
-from sistema_pedido.servicos.whatsapp import notificar_administradores, enviar_mensagem_aluno
+from sistema_pedido.servicos.whatsapp import (
+    notificar_administradores, numeros_administradores, aguardar_envios
+)
+from sistema_pedido.servicos.caixa_saida import drenar_caixa_saida
 
-def principal():
-    """Função principal que gerencia todo o processo de pedidos."""
-    validar_configuracao()
-    agora = datetime.now(FUSO_HORARIO)
-    
-    # Cria uma sessão HTTP para manter cookies (importante para o CSRF token)
-    sessao = requests.Session()
+@contextmanager
+def _fase(nome: str):
+    """Mede a fase nas métricas da execução e, no modo de perfilamento, perfila também."""
+    with medir('fase_segundos', fase=nome), perfilar_fase(nome):
+        yield
 
-    # 1. Calcula para qual data vamos fazer os pedidos
-    data_pedido = data_alvo_pedido(agora)
-    dia_semana_iso = data_pedido.isoweekday()
-    nome_dia_semana = DIAS_SEMANA_PT.get(dia_semana_iso, 'dia-desconhecido')
+def processar_aluno(aluno: dict, data_pedido, texto_prato_dia: str, nome_dia_semana: str, prazo: datetime):
+    """
+    Processa um aluno do roster: pula (cancelamento/bloqueio) ou faz o pedido no site.
+    Roda dentro de uma thread trabalhadora do motor de pedidos. O veredito de bloqueio
+    já vem em aluno['bloqueio'] e, para quem vai pedir, aluno['despacho'] traz o
+    horário sorteado pelo agendador.
 
-    logging.info(f"📅 Data alvo do pedido: {data_pedido} ({nome_dia_semana})")
+    Returns:
+        tuple: (prontuario, sucesso, mensagem, hora_inicio, hora_fim, tentativas)
+    """
+    id_aluno = aluno['id']
+    prontuario = aluno['prontuario']
 
-    # 2. Atualiza o cardápio no banco e descobre o prato do DIA ALVO DO PEDIDO
-    # IMPORTANTE: passa data_pedido para buscar o prato correto (do dia que o aluno vai comer)
-    # e não o prato de hoje (que pode ser diferente, ex: sexta pedindo para segunda)
-    texto_prato_dia = buscar_cardapio_site(sessao, data_pedido)
+    # 4. Checa se o aluno cancelou manualmente (via Bot) para este dia
+    if aluno['cancelou']:
+        hora_inicio = hora_fim = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
 
-    logging.info(f"🍛 Texto usado para checar bloqueios (prato de {data_pedido}): {texto_prato_dia}")
+        motivo = 'NAO_PEDIU: CANCELADO_DIRETAMENTE pelo Bot.'
+        logging.info(f"⏭️ PULOU: {prontuario} cancelou diretamente.")
+
+        return (prontuario, True, motivo, hora_inicio, hora_fim, 0)
+
+    # 5. Verifica restrições alimentares (veredito já calculado para o roster inteiro)
+    deve_pular, motivo_bloqueio = aluno['bloqueio']
+
+    if deve_pular:
+        hora_inicio = hora_fim = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
+
+        motivo = f'NAO_PEDIU: prato contém bloqueios -> {motivo_bloqueio}'
+        logging.info(f"🚫 BLOQUEADO: {prontuario} por {motivo_bloqueio}")
+
+        registrar_historico_pedido(id_aluno, data_pedido, motivo)
+
+        # Avisa o aluno por WhatsApp que o pedido não foi feito (via caixa de saída,
+        # gravada no mesmo lote do histórico; a chave evita aviso repetido no mesmo dia)
+        telefone_aluno = aluno['telefone']
+        if telefone_aluno:
+            data_fmt = data_pedido.strftime('%d/%m')
+            msg_aluno = (
+                f"Oi! Seu almoço de *{nome_dia_semana}* ({data_fmt}) "
+                f"não foi pedido porque o prato (*{texto_prato_dia}*) "
+                f"contém item da sua lista de exclusão: *{motivo_bloqueio}*."
+            )
+            enfileirar_mensagem(telefone_aluno, msg_aluno, f'bloqueio:{id_aluno}:{data_pedido.isoformat()}')
+
+        return (prontuario, True, motivo, hora_inicio, hora_fim, 0)
 
-    # Lista para guardar o relatório de execução
-    detalhes_execucao = []
-    
-    # 3. Busca alunos que querem almoçar nesse dia da semana
-    alunos = buscar_alunos_para_dia(dia_semana_iso)
-    logging.info(f"👥 Encontrados {len(alunos)} alunos para processar.")
-
-    for aluno in alunos:
-        id_aluno = aluno['id']
-        prontuario = aluno['prontuario']
-        
-        # 4. Checa se o aluno cancelou manualmente (via Bot) para este dia
-        if buscar_cancelamento_direto(id_aluno, data_pedido):
-            hora_inicio = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
-            # Pausa aleatória para parecer humano
-            time.sleep(random.randint(0, ATRASO_MAXIMO))
-            hora_fim = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
-            
-            motivo = 'NAO_PEDIU: CANCELADO_DIRETAMENTE pelo Bot.'
-            logging.info(f"⏭️ PULOU: {prontuario} cancelou diretamente.")
-            
-            detalhes_execucao.append((prontuario, True, motivo, hora_inicio, hora_fim, 0))
-            continue
-        
-        # 5. Verifica restrições alimentares (bloqueios)
-        lista_bloqueios = buscar_pratos_bloqueados(prontuario)
-        deve_pular, motivo_bloqueio = verificar_bloqueios(texto_prato_dia, lista_bloqueios)
-        
-        if deve_pular:
-            hora_inicio = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
-            time.sleep(random.randint(0, ATRASO_MAXIMO))
-            hora_fim = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
-
-            motivo = f'NAO_PEDIU: prato contém bloqueios -> {motivo_bloqueio}'
-            logging.info(f"🚫 BLOQUEADO: {prontuario} por {motivo_bloqueio}")
-
-            registrar_historico_pedido(id_aluno, data_pedido, motivo)
-            detalhes_execucao.append((prontuario, True, motivo, hora_inicio, hora_fim, 0))
-
-            # Avisa o aluno por WhatsApp que o pedido não foi feito
-            telefone_aluno = buscar_telefone_aluno(id_aluno)
-            if telefone_aluno:
-                data_fmt = data_pedido.strftime('%d/%m')
-                msg_aluno = (
-                    f"Oi! Seu almoço de *{nome_dia_semana}* ({data_fmt}) "
-                    f"não foi pedido porque o prato (*{texto_prato_dia}*) "
-                    f"contém item da sua lista de exclusão: *{motivo_bloqueio}*."
-                )
-                enviar_mensagem_aluno(telefone_aluno, msg_aluno)
-
-            continue
-
-        # 6. Tenta realizar o pedido
-        time.sleep(random.randint(0, ATRASO_MAXIMO))
-        hora_inicio = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
-        
-        sucesso_pedido = False
-        mensagem_resultado = ''
-        tentativa = 0
-        
-        for tentativa in range(1, TENTATIVAS_PEDIDO + 1):
-            logging.info(f"🔄 Tentativa {tentativa} para {prontuario}...")
-            try:
-                sucesso_pedido, mensagem_resultado = realizar_pedido(sessao, prontuario)
-                if sucesso_pedido:
-                    logging.info(f"✅ Sucesso para {prontuario}: {mensagem_resultado}")
-                    break
-                else:
-                    logging.warning(f"⚠️ Falha para {prontuario}: {mensagem_resultado}")
-                    raise ValueError(mensagem_resultado) # Força cair no except para tentar de novo ou sair
-            except Exception as e:
-                mensagem_resultado = str(e)
-                if tentativa < TENTATIVAS_PEDIDO:
-                    time.sleep(TEMPO_ESPERA_ERRO)
-        
-        hora_fim = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
-        detalhes_execucao.append((prontuario, sucesso_pedido, mensagem_resultado, hora_inicio, hora_fim, tentativa))
-    
-        # 7. Salva o resultado no banco
+    # 6. Tenta realizar o pedido (com a sessão/cookies desta thread)
+    sessao = sessao_do_trabalhador()
+    aguardar_ate(aluno['despacho'])
+    hora_inicio = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
+
+    sucesso_pedido = False
+    mensagem_resultado = ''
+    tentativa = 0
+
+    for tentativa in range(1, TENTATIVAS_PEDIDO + 1):
+        logging.info(f"🔄 Tentativa {tentativa} para {prontuario}...")
+        try:
+            sucesso_pedido, mensagem_resultado = realizar_pedido(sessao, prontuario, prazo)
+        except Exception as e:
+            sucesso_pedido, mensagem_resultado = False, str(e)
+
+        categoria = classificar(sucesso_pedido, mensagem_resultado)
+        contar_categoria(categoria)
         if sucesso_pedido:
-            motivo_log = f'PEDIU_OK: {mensagem_resultado}'
-        else:
-            motivo_log = f'ERRO_PEDIDO: {mensagem_resultado}'
-        
-        registrar_historico_pedido(id_aluno, data_pedido, motivo_log)
+            logging.info(f"✅ Sucesso para {prontuario}: {mensagem_resultado}")
+            break
+
+        logging.warning(f"⚠️ Falha para {prontuario} ({categoria}): {mensagem_resultado}")
+        # Ticket já gerado, fim de semana, prontuário inválido...: repetir não muda nada
+        if not POLITICAS[categoria].repetir or tentativa == TENTATIVAS_PEDIDO:
+            break
+
+        # A espera depende da categoria e usa só a folga que sobra até o prazo
+        espera = espera_retentativa(prazo, POLITICAS[categoria].espera)
+        time.sleep(espera)
+        metricas.observar('espera_retentativa_segundos', espera, categoria=categoria)
+
+    hora_fim = datetime.now(FUSO_HORARIO).strftime('%H:%M:%S')
+
+    # 7. Salva o resultado no banco
+    if sucesso_pedido:
+        motivo_log = f'PEDIU_OK: {mensagem_resultado}'
+    else:
+        motivo_log = f'ERRO_PEDIDO: {mensagem_resultado}'
+
+    registrar_historico_pedido(id_aluno, data_pedido, motivo_log)
 
+    return (prontuario, sucesso_pedido, mensagem_resultado, hora_inicio, hora_fim, tentativa)
+
+def resultado_final(sucesso: bool, mensagem: str) -> bool:
+    """
+    Indica se o resultado de um aluno é definitivo para o dia (pedido feito, pulado por
+    cancelamento/bloqueio, ticket já gerado ou outra categoria que a política não repete).
+    Só os outros são refeitos ao retomar a execução.
+    """
+    return not POLITICAS[classificar(sucesso, mensagem)].repetir
+
+def processar_e_anotar(aluno: dict, data_pedido, **kwargs):
+    """Roda processar_aluno e anota o resultado no diário da execução do dia."""
+    resultado = processar_aluno(aluno, data_pedido, **kwargs)
+    _, sucesso, mensagem, *_ = resultado
+    registrar_diario_execucao(data_pedido, aluno['id'], resultado, resultado_final(sucesso, mensagem))
+    return resultado
+
+def enviar_relatorios(agora, data_pedido, nome_dia_semana: str, texto_prato_dia: str,
+                      detalhes_execucao: list, linhas_extras: list[str] | None = None):
+    """
+    Envia o relatório completo por e-mail e o alerta de falhas relevantes no WhatsApp.
+    `linhas_extras` entram no cabeçalho do e-mail (ex: resumo do agendamento).
+    """
     # 8. Gera Relatório por E-mail
     linhas_email = [f'Relatório Auto-Almoço — {agora.strftime("%d/%m/%Y")}']
     linhas_email.append(f'Data-alvo: {data_pedido.strftime("%d/%m/%Y")} ({nome_dia_semana})')
-    
+    linhas_email.extend(linhas_extras or [])
+
     total_sucesso = sum(1 for _, ok, _, _, _, _ in detalhes_execucao if ok)
     linhas_email.append(f'Sucesso: {total_sucesso}/{len(detalhes_execucao)}\n')
     linhas_email.append('Prontuário | Status | Começou -> Terminou | Tentativas | Mensagem')
     linhas_email.append('-' * 72)
-    
+
     for pront, ok, msg, ini, fim, tent in detalhes_execucao:
         status_txt = 'OK ' if ok else 'FALHOU'
         linhas_email.append(f'{pront} | {status_txt} | {ini}→{fim} | {tent} | {msg}')
-        
+
     enviar_email('Relatório Auto-Almoço', '\n'.join(linhas_email))
 
     # 9. Envia Alerta no WhatsApp (apenas erros relevantes)
@@ -147,40 +174,239 @@ def principal():
         (p, m) for (p, ok, m, *_ ) in detalhes_execucao 
         if (not ok) and validar_erro_relevante(m)
     ]
-    
+
     if lista_erros:
         corpo_zap = []
         corpo_zap.append('🚨 *Falhas no Auto-Almoço:*')
         corpo_zap.append(agora.strftime('%d/%m %H:%M'))
         corpo_zap.append(f'Prato: {texto_prato_dia}')
         corpo_zap.append('')
-        
+
         for i, (pront, msg) in enumerate(lista_erros[:20], start=1):
             corpo_zap.append(f'{i}. {pront}: {msg}')
-            
+
         if len(lista_erros) > 20:
             corpo_zap.append(f'... (+{len(lista_erros)-20} falhas)')
-        
-        notificar_administradores('\n'.join(corpo_zap))
-        logging.info("📱 Alerta de erros enviado para o WhatsApp.")
+
+        if URL_BANCO_DADOS:
+            for numero in numeros_administradores():
+                chave = f'alerta:{agora.strftime("%Y%m%d%H%M")}:{data_pedido.isoformat()}:{numero}'
+                enfileirar_mensagem(numero, '\n'.join(corpo_zap), chave)
+        else:
+            notificar_administradores('\n'.join(corpo_zap))
+        logging.info("📱 Alerta de erros enfileirado para o WhatsApp.")
+
+def preparar_dia(agora: datetime, sessao_cardapio=None) -> dict:
+    """
+    Passos 1-4 da execução: data-alvo, cardápio, vereditos, roster (sem quem já tem resultado
+    final no diário do dia), bloqueios e o horário de despacho de cada pedido.
+    Usada pela execução normal e pelo coordenador do modo fila (fila_trabalho).
+    `sessao_cardapio` reaproveita uma sessão já aberta (daemon); sem ela, uma sessão é
+    criada e fechada aqui.
+
+    Returns:
+        dict: 'data_pedido', 'nome_dia_semana', 'texto_prato_dia', 'roster', 'resolvidos',
+        'alunos' (os que faltam processar), 'inicio_despacho', 'prazo' e 'previsao_fim'.
+    """
+    # Sessão HTTP usada para ler o cardápio, com cache em disco
+    # (os pedidos usam uma sessão por thread, sem cache)
+    sessao = sessao_cardapio or criar_sessao(com_cache=True)
+
+    # 1. Calcula para qual data vamos fazer os pedidos
+    data_pedido = data_alvo_pedido(agora)
+    dia_semana_iso = data_pedido.isoweekday()
+    nome_dia_semana = DIAS_SEMANA_PT.get(dia_semana_iso, 'dia-desconhecido')
+
+    logging.info(f"📅 Data alvo do pedido: {data_pedido} ({nome_dia_semana})")
+
+    # 2. Atualiza o cardápio no banco e descobre o prato do DIA ALVO DO PEDIDO
+    # IMPORTANTE: passa data_pedido para buscar o prato correto (do dia que o aluno vai comer)
+    # e não o prato de hoje (que pode ser diferente, ex: sexta pedindo para segunda)
+    with _fase('cardapio'):
+        texto_prato_dia = buscar_cardapio_site(sessao, data_pedido)
+    if sessao_cardapio is None:
+        sessao.close()
+
+    logging.info(f"🍛 Texto usado para checar bloqueios (prato de {data_pedido}): {texto_prato_dia}")
+
+    # Mantém os vereditos de bloqueio de todos os cardápios conhecidos (só recalcula os
+    # dias cujo prato ou listas de bloqueio mudaram) e já traz os do dia do pedido
+    with _fase('vereditos'):
+        vereditos = atualizar_vereditos(agora.date(), data_pedido, texto_prato_dia)
+
+    # 3. Busca alunos que querem almoçar nesse dia da semana, já com cancelamento,
+    # bloqueios e telefone de cada um (uma única consulta para o dia inteiro)
+    with _fase('roster'):
+        roster = buscar_contexto_do_dia(dia_semana_iso, data_pedido)
+        # Execução retomada (a anterior quebrou no meio): quem já tem resultado final
+        # no diário do dia entra no relatório como estava e não é processado de novo
+        resolvidos = buscar_diario_execucao(data_pedido)
+        alunos = [aluno for aluno in roster if aluno['id'] not in resolvidos]
+    logging.info(f"👥 Encontrados {len(roster)} alunos para processar.")
+    if len(alunos) < len(roster):
+        logging.info(
+            f"♻️ Retomando a execução de {data_pedido}: {len(roster) - len(alunos)} alunos já "
+            f"resolvidos, faltam {len(alunos)}."
+        )
+
+    # 4. Bloqueios do roster: usa os vereditos gravados para o prato do dia; sem eles
+    # (prato mudou agora, dia sem cardápio ou erro no banco) checa todo o roster numa passada só
+    with _fase('bloqueios'):
+        if vereditos is not None:
+            for aluno in alunos:
+                aluno['bloqueio'] = vereditos.get(aluno['id'], (False, ""))
+        else:
+            motor_bloqueios = MotorBloqueios(aluno['bloqueios'] for aluno in alunos)
+            motor_bloqueios.preparar(texto_prato_dia)
+            for aluno in alunos:
+                aluno['bloqueio'] = motor_bloqueios.verificar(aluno['bloqueios'])
+
+    # Sorteia o horário de envio de cada pedido dentro da janela até o prazo.
+    # Quem cancelou ou tem bloqueio não vai ao site, então não ocupa horário.
+    inicio_despacho = datetime.now(FUSO_HORARIO)
+    prazo = calcular_prazo(inicio_despacho)
+    alunos_para_pedir = [
+        aluno for aluno in alunos
+        if not aluno['cancelou'] and not aluno['bloqueio'][0]
+    ]
+    despachos = planejar_despachos(len(alunos_para_pedir), inicio_despacho, prazo)
+    for aluno, instante in zip(alunos_para_pedir, despachos):
+        aluno['despacho'] = instante
+
+    previsao_fim = despachos[-1] if despachos else inicio_despacho
+    logging.info(
+        f"🗓️ {len(despachos)} pedidos agendados entre {inicio_despacho.strftime('%H:%M:%S')} "
+        f"e {previsao_fim.strftime('%H:%M:%S')} (prazo {prazo.strftime('%H:%M:%S')})."
+    )
+
+    return {
+        'data_pedido': data_pedido,
+        'nome_dia_semana': nome_dia_semana,
+        'texto_prato_dia': texto_prato_dia,
+        'roster': roster,
+        'resolvidos': resolvidos,
+        'alunos': alunos,
+        'inicio_despacho': inicio_despacho,
+        'prazo': prazo,
+        'previsao_fim': previsao_fim,
+    }
+
+def reiniciar_execucao():
+    """Zera métricas, saúde do site e contagem de respostas antes de uma execução."""
+    metricas.reiniciar()
+    controle_site.reiniciar()
+    reiniciar_contagem()
+
+def encerrar_execucao(fechar_banco: bool = True):
+    """
+    Espera as mensagens de WhatsApp em segundo plano, devolve/fecha as conexões do banco
+    e grava as métricas da execução (JSON + formato do Prometheus), mesmo se ela quebrou.
+    Com fechar_banco=False (daemon) só grava o buffer de escrita e o pool continua aberto.
+    """
+    aguardar_envios()
+    contadores = {
+        'pool_banco': estatisticas_pool(),
+        'token_csrf': dict(ESTATISTICAS_TOKEN),
+        'cache_http': dict(ESTATISTICAS_CACHE_HTTP),
+        'saude_site': dict(controle_site.estatisticas),
+        'respostas_site': dict(ESTATISTICAS_CLASSIFICACAO),
+    }
+    if fechar_banco:
+        fechar_pool()
+    else:
+        descarregar_escritas()
+    metricas.exportar(contadores)
+
+def principal(fechar_banco: bool = True, sessao_cardapio=None):
+    """
+    Função principal que gerencia todo o processo de pedidos.
+    O daemon chama com fechar_banco=False e a sua sessão do cardápio, para manter as
+    conexões abertas entre uma execução e outra.
+    """
+    reiniciar_execucao()
+    try:
+        validar_configuracao()
+        abrir_pool()  # aplica as migrações pendentes; se falharem, a execução para aqui
+        agora = datetime.now(FUSO_HORARIO)
+
+        dia = preparar_dia(agora, sessao_cardapio)
+        data_pedido = dia['data_pedido']
+        roster, resolvidos, alunos = dia['roster'], dia['resolvidos'], dia['alunos']
+        inicio_despacho, prazo, previsao_fim = dia['inicio_despacho'], dia['prazo'], dia['previsao_fim']
+
+        # 5-7. Processa os alunos em paralelo; o relatório mantém a ordem do roster
+        processar = partial(
+            processar_e_anotar,
+            data_pedido=data_pedido,
+            texto_prato_dia=dia['texto_prato_dia'],
+            nome_dia_semana=dia['nome_dia_semana'],
+            prazo=prazo,
+        )
+        with _fase('pedidos'):
+            novos_resultados = iter(executar_pedidos(alunos, processar))
+        detalhes_execucao = [
+            resolvidos[aluno['id']] if aluno['id'] in resolvidos else next(novos_resultados)
+            for aluno in roster
+        ]
+
+        fim_real = datetime.now(FUSO_HORARIO)
+        atraso = (fim_real - previsao_fim).total_seconds()
+        logging.info(
+            f"🏁 Despacho terminou às {fim_real.strftime('%H:%M:%S')} "
+            f"(previsto {previsao_fim.strftime('%H:%M:%S')}, diferença {atraso:+.0f}s)."
+        )
+        resumo_agenda = [
+            f'Janela: {inicio_despacho.strftime("%H:%M:%S")} -> prazo {prazo.strftime("%H:%M:%S")}',
+            f'Término previsto: {previsao_fim.strftime("%H:%M:%S")} | real: {fim_real.strftime("%H:%M:%S")} ({atraso:+.0f}s)',
+            resumo_cache_token(),
+            resumo_cache_http(),
+            controle_site.resumo(),
+            resumo_classificacao(),
+        ]
+        if resolvidos:
+            resumo_agenda.append(f'Execução retomada: {len(resolvidos)} resultados reaproveitados do diário do dia')
+        logging.info(f"🔑 {resumo_cache_token()}")
+        logging.info(f"🗄️ {resumo_cache_http()}")
+        logging.info(f"🩺 {controle_site.resumo()}")
+        logging.info(f"🏷️ {resumo_classificacao()}")
+
+        # 8-9. Relatórios
+        with _fase('relatorios'):
+            enviar_relatorios(
+                agora, data_pedido, dia['nome_dia_semana'], dia['texto_prato_dia'],
+                detalhes_execucao, resumo_agenda
+            )
+
+        # 10. Entrega o que está na caixa de saída (avisos de bloqueio e alertas).
+        # O que não for entregue agora fica no banco para a próxima drenagem.
+        with _fase('caixa_saida'):
+            drenar_caixa_saida()
+    finally:
+        # Espera os envios em segundo plano, fecha o banco e grava as métricas,
+        # mesmo se a execução quebrar no meio
+        encerrar_execucao(fechar_banco)
+
+def alertar_erro_fatal(erro: Exception):
+    """Tenta avisar os administradores por WhatsApp de que a execução quebrou."""
+    try:
+        agora = datetime.now(FUSO_HORARIO).strftime('%d/%m %H:%M')
+        notificar_administradores(
+            f"💀 *ERRO FATAL no Auto-Almoço*\n"
+            f"{agora}\n\n"
+            f"O script quebrou antes de terminar:\n"
+            f"```{str(erro)[:500]}```"
+        )
+        aguardar_envios()
+    except Exception:
+        logging.error("Não conseguiu enviar alerta de erro fatal por WhatsApp.")
 
 if __name__ == '__main__':
+    if PERFILAR or '--perfilar' in sys.argv[1:]:
+        ativar_perfilamento()
     try:
         principal()
     except Exception as e:
         logging.error(f"💀 ERRO FATAL: {e}")
         # Tenta notificar admins por WhatsApp antes de morrer
-        try:
-            from sistema_pedido.servicos.whatsapp import notificar_administradores
-            from datetime import datetime
-            from sistema_pedido.configuracao import FUSO_HORARIO
-            agora = datetime.now(FUSO_HORARIO).strftime('%d/%m %H:%M')
-            notificar_administradores(
-                f"💀 *ERRO FATAL no Auto-Almoço*\n"
-                f"{agora}\n\n"
-                f"O script quebrou antes de terminar:\n"
-                f"```{str(e)[:500]}```"
-            )
-        except Exception:
-            logging.error("Não conseguiu enviar alerta de erro fatal por WhatsApp.")
+        alertar_erro_fatal(e)
         raise  # Re-lança o erro para o GitHub Actions registrar o exit code 1
@@ -0,0 +1,133 @@
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime
+from sistema_pedido.configuracao import DIRETORIO_METRICAS, FUSO_HORARIO
+
+# Limites (em segundos) dos baldes dos histogramas, do jeito que o Prometheus espera
+BALDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900)
+
+# {(nome, ((rotulo, valor), ...)): [amostras em segundos]}
+_amostras = {}
+_trava = threading.Lock()
+
+def reiniciar():
+    """Apaga as medições (chamada no começo de cada execução)."""
+    with _trava:
+        _amostras.clear()
+
+def observar(nome: str, segundos: float, **rotulos):
+    """Registra uma medição de duração no histograma `nome` com os rótulos informados."""
+    chave = (nome, tuple(sorted((k, str(v)) for k, v in rotulos.items())))
+    with _trava:
+        _amostras.setdefault(chave, []).append(segundos)
+
+@contextmanager
+def medir(nome: str, **rotulos):
+    """Mede o tempo do bloco `with` e registra no histograma `nome`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nome, time.perf_counter() - inicio, **rotulos)
+
+def cronometrar(nome: str, **rotulos):
+    """Decorador: mede cada chamada da função. Sem rótulos, usa o nome da função como 'funcao'."""
+    def decorador(funcao):
+        rotulos_finais = rotulos or {'funcao': funcao.__name__}
+
+        @wraps(funcao)
+        def embrulho(*args, **kwargs):
+            with medir(nome, **rotulos_finais):
+                return funcao(*args, **kwargs)
+        return embrulho
+    return decorador
+
+def _percentil(ordenadas: list[float], fracao: float) -> float:
+    indice = min(len(ordenadas) - 1, max(0, round(fracao * (len(ordenadas) - 1))))
+    return ordenadas[indice]
+
+def resumo() -> list[dict]:
+    """Estatísticas de cada série medida (quantidade, total, média, mínimo, p50, p95, máximo)."""
+    with _trava:
+        series = {chave: sorted(valores) for chave, valores in _amostras.items()}
+
+    linhas = []
+    for (nome, rotulos), valores in sorted(series.items()):
+        linhas.append({
+            'metrica': nome,
+            'rotulos': dict(rotulos),
+            'quantidade': len(valores),
+            'total_s': round(sum(valores), 6),
+            'media_s': round(sum(valores) / len(valores), 6),
+            'min_s': round(valores[0], 6),
+            'p50_s': round(_percentil(valores, 0.5), 6),
+            'p95_s': round(_percentil(valores, 0.95), 6),
+            'max_s': round(valores[-1], 6),
+        })
+    return linhas
+
+def _rotulos_prometheus(rotulos: dict) -> str:
+    partes = []
+    for chave, valor in rotulos.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{chave}="{valor}"')
+    return ','.join(partes)
+
+def formato_prometheus(contadores: dict | None = None) -> str:
+    """Gera o texto no formato de exposição do Prometheus (histogramas + contadores avulsos)."""
+    with _trava:
+        series = {chave: list(valores) for chave, valores in _amostras.items()}
+
+    linhas = []
+    nomes_declarados = set()
+    for (nome, rotulos), valores in sorted(series.items()):
+        metrica = f'sistema_pedido_{nome}'
+        if metrica not in nomes_declarados:
+            linhas.append(f'# TYPE {metrica} histogram')
+            nomes_declarados.add(metrica)
+        rotulos = dict(rotulos)
+        for limite in BALDES:
+            quantidade = sum(1 for valor in valores if valor <= limite)
+            linhas.append(f'{metrica}_bucket{{{_rotulos_prometheus({**rotulos, "le": limite})}}} {quantidade}')
+        linhas.append(f'{metrica}_bucket{{{_rotulos_prometheus({**rotulos, "le": "+Inf"})}}} {len(valores)}')
+        linhas.append(f'{metrica}_sum{{{_rotulos_prometheus(rotulos)}}} {sum(valores)}')
+        linhas.append(f'{metrica}_count{{{_rotulos_prometheus(rotulos)}}} {len(valores)}')
+
+    if contadores:
+        linhas.append('# TYPE sistema_pedido_contador gauge')
+        for grupo, valores in sorted(contadores.items()):
+            for chave, valor in sorted((valores or {}).items()):
+                if isinstance(valor, (int, float)):
+                    rotulos = _rotulos_prometheus({'grupo': grupo, 'nome': chave})
+                    linhas.append(f'sistema_pedido_contador{{{rotulos}}} {valor}')
+
+    return '\n'.join(linhas) + '\n'
+
+def exportar(contadores: dict | None = None, pasta: str = DIRETORIO_METRICAS):
+    """
+    Grava as medições da execução em `pasta`: ultima_execucao.json (resumo legível por
+    máquina) e ultima_execucao.prom (formato texto do Prometheus).
+
+    Args:
+        contadores (dict): Contadores extras por grupo, ex: {'cache_http': {'acerto': 3}}.
+    """
+    destino = Path(pasta)
+    try:
+        destino.mkdir(parents=True, exist_ok=True)
+        conteudo = {
+            'gerado_em': datetime.now(FUSO_HORARIO).isoformat(),
+            'series': resumo(),
+            'contadores': contadores or {},
+        }
+        (destino / 'ultima_execucao.json').write_text(
+            json.dumps(conteudo, ensure_ascii=False, indent=2, default=str), encoding='utf-8'
+        )
+        (destino / 'ultima_execucao.prom').write_text(formato_prometheus(contadores), encoding='utf-8')
+        logging.info(f"📊 Métricas da execução gravadas em {destino}/")
+    except OSError as e:
+        logging.warning(f"⚠️ Não consegui gravar as métricas em {destino}: {e}")
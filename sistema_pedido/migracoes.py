@@ -0,0 +1,430 @@
+"""
+Migrações versionadas do esquema do banco usado pelo sistema de pedidos.
+
+Cada migração tem um número de versão e roda uma única vez, na sua própria transação;
+as versões aplicadas ficam na tabela 'versao_esquema'. Um advisory lock do Postgres
+impede que dois processos (execução agendada, drenagem da caixa de saída, daemon...)
+migrem ao mesmo tempo. Roda sozinho na primeira conexão do processo (banco_dados) ou
+pela linha de comando:
+
+    python -m sistema_pedido.migracoes            # aplica as pendentes (inclusive as manuais)
+    python -m sistema_pedido.migracoes status     # lista aplicadas/pendentes
+
+As migrações em MIGRACOES_MANUAIS (reescrita de tabelas grandes, como o particionamento
+de 'pedido') não rodam na conexão automática: ficam pendentes até alguém rodar a linha de
+comando, e as seguintes são aplicadas normalmente.
+
+As tabelas aluno, pedido, proximo_prato etc. continuam sendo criadas pelo Bot; as
+migrações só acrescentam o que o sistema de pedidos precisa.
+"""
+import sys
+import logging
+import psycopg
+from sistema_pedido.configuracao import URL_BANCO_DADOS, MESES_PARTICOES_FUTURAS
+
+# Chave do advisory lock das migrações (qualquer número fixo, único neste banco)
+CHAVE_TRAVA_MIGRACOES = 7_270_001
+
+# Valores do enum status_pedido e o prefixo do motivo (gravado pelo sistema e pelo Bot)
+# que leva a cada um; motivo sem prefixo conhecido vira 'OUTRO'
+PREFIXOS_STATUS = (
+    ('CANCELADO_DIRETAMENTE', 'CANCELADO'),
+    ('PEDIU_OK', 'PEDIU_OK'),
+    ('ERRO_PEDIDO', 'ERRO_PEDIDO'),
+    ('NAO_PEDIU', 'NAO_PEDIU'),
+)
+STATUS_PEDIDO = ('PEDIU_OK', 'ERRO_PEDIDO', 'NAO_PEDIU', 'CANCELADO', 'OUTRO')
+
+def status_do_motivo(motivo: str) -> str:
+    """Mesmo cálculo da função SQL status_do_motivo(), para gravar o status junto com o motivo."""
+    for prefixo, status in PREFIXOS_STATUS:
+        if (motivo or '').startswith(prefixo):
+            return status
+    return 'OUTRO'
+
+MIGRACOES = [
+    (1, 'tabelas auxiliares do sistema de pedidos', [
+        """
+        CREATE TABLE IF NOT EXISTS veredito_bloqueio (
+            aluno_id      INTEGER NOT NULL,
+            dia_referente DATE    NOT NULL,
+            bloqueado     BOOLEAN NOT NULL,
+            itens         TEXT    NOT NULL DEFAULT '',
+            atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (aluno_id, dia_referente)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS mensagem_saida (
+            id                 BIGSERIAL PRIMARY KEY,
+            chave_idempotencia TEXT NOT NULL UNIQUE,
+            telefone           TEXT NOT NULL,
+            mensagem           TEXT NOT NULL,
+            tentativas         INTEGER NOT NULL DEFAULT 0,
+            proxima_tentativa  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            enviada_em         TIMESTAMPTZ,
+            ultimo_erro        TEXT,
+            criada_em          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS mensagem_saida_pendentes
+            ON mensagem_saida (proxima_tentativa)
+         WHERE enviada_em IS NULL;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS diario_execucao (
+            dia_pedido    DATE    NOT NULL,
+            aluno_id      INTEGER NOT NULL,
+            prontuario    TEXT    NOT NULL,
+            sucesso       BOOLEAN NOT NULL,
+            mensagem      TEXT    NOT NULL DEFAULT '',
+            hora_inicio   TEXT,
+            hora_fim      TEXT,
+            tentativas    INTEGER NOT NULL DEFAULT 0,
+            final         BOOLEAN NOT NULL,
+            atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (dia_pedido, aluno_id)
+        );
+        """,
+    ]),
+    (2, 'coluna status em pedido (enum derivado do prefixo do motivo)', [
+        f"""
+        DO $$
+        BEGIN
+            CREATE TYPE status_pedido AS ENUM ({', '.join(f"'{status}'" for status in STATUS_PEDIDO)});
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$;
+        """,
+        "ALTER TABLE pedido ADD COLUMN IF NOT EXISTS status status_pedido;",
+        f"""
+        CREATE OR REPLACE FUNCTION status_do_motivo(motivo TEXT) RETURNS status_pedido
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT CASE
+                {' '.join(f"WHEN motivo LIKE '{prefixo}%' THEN '{status}'" for prefixo, status in PREFIXOS_STATUS)}
+                ELSE 'OUTRO'
+            END::status_pedido
+        $$;
+        """,
+        # O Bot grava só o motivo (INSERT e UPDATE do cancelamento): o gatilho preenche o status
+        """
+        CREATE OR REPLACE FUNCTION pedido_preencher_status() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                IF NEW.status IS NULL THEN
+                    NEW.status := status_do_motivo(NEW.motivo);
+                END IF;
+            ELSIF NEW.motivo IS DISTINCT FROM OLD.motivo AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+                NEW.status := status_do_motivo(NEW.motivo);
+            END IF;
+            RETURN NEW;
+        END $$;
+        """,
+        "DROP TRIGGER IF EXISTS pedido_status ON pedido;",
+        """
+        CREATE TRIGGER pedido_status
+            BEFORE INSERT OR UPDATE OF motivo, status ON pedido
+            FOR EACH ROW EXECUTE FUNCTION pedido_preencher_status();
+        """,
+        # Preenche o histórico que já existia
+        "UPDATE pedido SET status = status_do_motivo(motivo) WHERE status IS NULL;",
+    ]),
+    (3, 'índices de pedido por aluno/dia e de cancelamentos', [
+        "CREATE INDEX IF NOT EXISTS pedido_aluno_dia ON pedido (aluno_id, dia_pedido);",
+        """
+        CREATE INDEX IF NOT EXISTS pedido_cancelados
+            ON pedido (dia_pedido, aluno_id)
+         WHERE status = 'CANCELADO';
+        """,
+        "ANALYZE pedido;",
+    ]),
+    (4, 'pedido particionado por mês de dia_pedido', [
+        # Cria as partições mensais (pedido_AAAA_MM) que faltam entre duas datas
+        """
+        CREATE OR REPLACE FUNCTION garantir_particoes_pedido(inicio DATE, fim DATE) RETURNS INTEGER
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            mes       DATE := date_trunc('month', inicio)::date;
+            seguinte  DATE;
+            nome      TEXT;
+            na_padrao BOOLEAN;
+            criadas   INTEGER := 0;
+        BEGIN
+            WHILE mes <= fim LOOP
+                nome := 'pedido_' || to_char(mes, 'YYYY_MM');
+                seguinte := (mes + INTERVAL '1 month')::date;
+                IF to_regclass(nome) IS NULL THEN
+                    na_padrao := false;
+                    IF to_regclass('pedido_padrao') IS NOT NULL THEN
+                        EXECUTE 'SELECT EXISTS (SELECT 1 FROM pedido_padrao WHERE dia_pedido >= $1 AND dia_pedido < $2)'
+                           INTO na_padrao USING mes, seguinte;
+                    END IF;
+                    IF na_padrao THEN
+                        -- Linhas do mês caíram na partição padrão: vão para a partição nova antes de anexá-la
+                        EXECUTE format('CREATE TABLE %I (LIKE pedido INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)', nome);
+                        EXECUTE format(
+                            'WITH movidas AS (DELETE FROM pedido_padrao WHERE dia_pedido >= %L AND dia_pedido < %L RETURNING *) '
+                            'INSERT INTO %I SELECT * FROM movidas', mes, seguinte, nome);
+                        EXECUTE format('ALTER TABLE pedido ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                                       nome, mes, seguinte);
+                    ELSE
+                        EXECUTE format('CREATE TABLE %I PARTITION OF pedido FOR VALUES FROM (%L) TO (%L)',
+                                       nome, mes, seguinte);
+                    END IF;
+                    criadas := criadas + 1;
+                END IF;
+                mes := seguinte;
+            END LOOP;
+            RETURN criadas;
+        END $$;
+        """,
+        # Troca a tabela comum por uma particionada com as mesmas colunas e copia o histórico.
+        # A sequência do id passa para a tabela nova (o Bot continua inserindo sem informar o id).
+        # Chaves primária/únicas e índices da tabela antiga são recriados depois da cópia; numa
+        # tabela particionada toda chave única precisa incluir dia_pedido, que é acrescentado.
+        # Dia fora das partições mensais (ou nulo) cai em pedido_padrao em vez de dar erro.
+        f"""
+        DO $$
+        DECLARE
+            sequencia  TEXT;
+            restricao  TEXT;
+            primeiro   DATE;
+            colunas    TEXT[];
+            comando    TEXT;
+            depois     TEXT[] := '{{}}';
+            r          RECORD;
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'pedido'::regclass) THEN
+                RETURN;
+            END IF;
+
+            -- A tabela antiga é apagada no fim (sem CASCADE): uma chave estrangeira de outra
+            -- tabela apontando para pedido faria o DROP falhar depois da cópia inteira
+            SELECT string_agg(format('%s (%s)', conname, conrelid::regclass), ', ')
+              INTO comando
+              FROM pg_constraint
+             WHERE contype = 'f' AND confrelid = 'pedido'::regclass;
+            IF comando IS NOT NULL THEN
+                RAISE EXCEPTION 'Chaves estrangeiras apontam para pedido: %. Remova-as antes de particionar.', comando
+                    USING HINT = 'Numa tabela particionada a chave referenciada teria que incluir dia_pedido.';
+            END IF;
+
+            ALTER TABLE pedido RENAME TO pedido_sem_particao;
+            CREATE TABLE pedido (
+                LIKE pedido_sem_particao INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED INCLUDING STORAGE
+            ) PARTITION BY RANGE (dia_pedido);
+
+            FOR restricao IN
+                SELECT pg_get_constraintdef(oid)
+                  FROM pg_constraint
+                 WHERE conrelid = 'pedido_sem_particao'::regclass
+                   AND contype IN ('f', 'c')
+            LOOP
+                EXECUTE format('ALTER TABLE pedido ADD %s', restricao);
+            END LOOP;
+
+            FOR r IN
+                SELECT c.conname, c.contype, array_agg(a.attname::text ORDER BY k.ordem) AS colunas
+                  FROM pg_constraint c
+                 CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ordem)
+                  JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                 WHERE c.conrelid = 'pedido_sem_particao'::regclass
+                   AND c.contype IN ('p', 'u')
+                 GROUP BY c.conname, c.contype
+            LOOP
+                colunas := r.colunas;
+                IF NOT 'dia_pedido' = ANY(colunas) THEN
+                    colunas := colunas || 'dia_pedido'::text;
+                END IF;
+                depois := depois || format(
+                    'ALTER TABLE pedido ADD CONSTRAINT %I %s (%s)', r.conname,
+                    CASE r.contype WHEN 'p' THEN 'PRIMARY KEY' ELSE 'UNIQUE' END,
+                    (SELECT string_agg(quote_ident(coluna), ', ') FROM unnest(colunas) AS coluna)
+                );
+            END LOOP;
+
+            FOR r IN
+                SELECT i.indexrelid, i.indisunique, ic.relname AS nome,
+                       i.indexprs IS NULL AND i.indpred IS NULL AS simples,
+                       ARRAY(SELECT a.attname::text
+                               FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ordem)
+                               JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                              ORDER BY k.ordem) AS colunas
+                  FROM pg_index i
+                  JOIN pg_class ic ON ic.oid = i.indexrelid
+                 WHERE i.indrelid = 'pedido_sem_particao'::regclass
+                   AND NOT EXISTS (SELECT 1 FROM pg_constraint c
+                                    WHERE c.conrelid = i.indrelid AND c.conindid = i.indexrelid)
+            LOOP
+                IF NOT r.indisunique THEN
+                    depois := depois || regexp_replace(
+                        pg_get_indexdef(r.indexrelid), ' ON [^ ]+ USING ', ' ON pedido USING '
+                    );
+                ELSIF r.simples THEN
+                    colunas := r.colunas;
+                    IF NOT 'dia_pedido' = ANY(colunas) THEN
+                        colunas := colunas || 'dia_pedido'::text;
+                    END IF;
+                    depois := depois || format(
+                        'CREATE UNIQUE INDEX %I ON pedido (%s)', r.nome,
+                        (SELECT string_agg(quote_ident(coluna), ', ') FROM unnest(colunas) AS coluna)
+                    );
+                ELSE
+                    RAISE EXCEPTION 'Índice único % de pedido tem expressão ou WHERE: recrie-o com dia_pedido antes de particionar', r.nome;
+                END IF;
+            END LOOP;
+
+            IF (SELECT attidentity FROM pg_attribute
+                 WHERE attrelid = 'pedido_sem_particao'::regclass AND attname = 'id') = '' THEN
+                sequencia := pg_get_serial_sequence('pedido_sem_particao', 'id');
+                IF sequencia IS NOT NULL THEN
+                    EXECUTE format('ALTER SEQUENCE %s OWNED BY pedido.id', sequencia);
+                END IF;
+            END IF;
+
+            CREATE TABLE pedido_padrao PARTITION OF pedido DEFAULT;
+            SELECT min(dia_pedido) INTO primeiro FROM pedido_sem_particao;
+            PERFORM garantir_particoes_pedido(
+                COALESCE(primeiro, CURRENT_DATE),
+                (CURRENT_DATE + INTERVAL '{MESES_PARTICOES_FUTURAS} months')::date
+            );
+            INSERT INTO pedido SELECT * FROM pedido_sem_particao;
+
+            sequencia := pg_get_serial_sequence('pedido', 'id');
+            IF sequencia IS NOT NULL THEN
+                PERFORM setval(sequencia, (SELECT COALESCE(max(id), 0) + 1 FROM pedido), false);
+            END IF;
+
+            DROP TABLE pedido_sem_particao;
+            FOREACH comando IN ARRAY depois LOOP
+                EXECUTE comando;
+            END LOOP;
+        END $$;
+        """,
+        # Gatilho e índices da tabela antiga foram embora com ela: recria no pai (valem para as partições)
+        "DROP TRIGGER IF EXISTS pedido_status ON pedido;",
+        """
+        CREATE TRIGGER pedido_status
+            BEFORE INSERT OR UPDATE OF motivo, status ON pedido
+            FOR EACH ROW EXECUTE FUNCTION pedido_preencher_status();
+        """,
+        "CREATE INDEX IF NOT EXISTS pedido_aluno_dia ON pedido (aluno_id, dia_pedido);",
+        """
+        CREATE INDEX IF NOT EXISTS pedido_cancelados
+            ON pedido (dia_pedido, aluno_id)
+         WHERE status = 'CANCELADO';
+        """,
+        "ANALYZE pedido;",
+    ]),
+    (5, 'fila de trabalho do modo com vários trabalhadores', [
+        # Uma linha por dia carregado na fila: o que os trabalhadores precisam saber do dia
+        # e a marca de que o relatório já foi enviado (só um coordenador envia)
+        """
+        CREATE TABLE IF NOT EXISTS execucao_fila (
+            dia_pedido           DATE PRIMARY KEY,
+            nome_dia_semana      TEXT NOT NULL,
+            texto_prato_dia      TEXT NOT NULL,
+            prazo                TIMESTAMPTZ NOT NULL,
+            carregada_em         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            relatorio_enviado_em TIMESTAMPTZ
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS fila_pedido (
+            dia_pedido    DATE    NOT NULL,
+            aluno_id      INTEGER NOT NULL,
+            dados         JSONB   NOT NULL,
+            despacho      TIMESTAMPTZ,
+            estado        TEXT    NOT NULL DEFAULT 'pendente',
+            trabalhador   TEXT,
+            reservado_ate TIMESTAMPTZ,
+            tentativas    INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia_pedido, aluno_id)
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS fila_pedido_abertos
+            ON fila_pedido (dia_pedido, despacho)
+         WHERE estado <> 'concluido';
+        """,
+    ]),
+    (6, 'assinatura dos vereditos de bloqueio por dia', [
+        # Hash do prato do dia + listas de bloqueio usadas no cálculo: se não mudou, os
+        # vereditos gravados continuam valendo e não são recalculados
+        """
+        CREATE TABLE IF NOT EXISTS veredito_assinatura (
+            dia_referente DATE PRIMARY KEY,
+            assinatura    TEXT NOT NULL,
+            atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """,
+    ]),
+]
+
+# Migrações que só rodam pela linha de comando: a 4 reescreve 'pedido' inteira (renomeia,
+# copia e apaga a tabela antiga), o que não deve acontecer no meio de uma execução agendada
+MIGRACOES_MANUAIS = {4}
+
+def _versoes_aplicadas(conexao) -> set[int]:
+    conexao.execute("""
+        CREATE TABLE IF NOT EXISTS versao_esquema (
+            versao      INTEGER PRIMARY KEY,
+            nome        TEXT NOT NULL,
+            aplicada_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+    """)
+    return {linha[0] for linha in conexao.execute("SELECT versao FROM versao_esquema;").fetchall()}
+
+def aplicar_migracoes(url_banco: str | None = URL_BANCO_DADOS, manuais: bool = False) -> list[int]:
+    """
+    Aplica as migrações pendentes, em ordem, cada uma na sua transação. As de
+    MIGRACOES_MANUAIS só entram com `manuais` (linha de comando); sem isso são puladas
+    com um aviso e as seguintes continuam.
+    Retorna as versões aplicadas agora (lista vazia se o esquema já estava em dia).
+    """
+    if not url_banco:
+        return []
+
+    aplicadas_agora = []
+    with psycopg.connect(url_banco, autocommit=True) as conexao:
+        conexao.execute("SELECT pg_advisory_lock(%s);", (CHAVE_TRAVA_MIGRACOES,))
+        try:
+            aplicadas = _versoes_aplicadas(conexao)
+            for versao, nome, comandos in MIGRACOES:
+                if versao in aplicadas:
+                    continue
+                if versao in MIGRACOES_MANUAIS and not manuais:
+                    logging.warning(
+                        f"⏸️ Migração {versao} ({nome}) pendente: rode `python -m sistema_pedido.migracoes` para aplicá-la."
+                    )
+                    continue
+                logging.info(f"🧱 Aplicando migração {versao}: {nome}")
+                with conexao.transaction():
+                    for comando in comandos:
+                        conexao.execute(comando)
+                    conexao.execute(
+                        "INSERT INTO versao_esquema (versao, nome) VALUES (%s, %s);", (versao, nome)
+                    )
+                aplicadas_agora.append(versao)
+        finally:
+            conexao.execute("SELECT pg_advisory_unlock(%s);", (CHAVE_TRAVA_MIGRACOES,))
+    return aplicadas_agora
+
+def status_migracoes(url_banco: str | None = URL_BANCO_DADOS) -> list[tuple[int, str, bool]]:
+    """Lista (versão, nome, aplicada?) de todas as migrações conhecidas."""
+    with psycopg.connect(url_banco, autocommit=True) as conexao:
+        aplicadas = _versoes_aplicadas(conexao)
+    return [(versao, nome, versao in aplicadas) for versao, nome, _ in MIGRACOES]
+
+if __name__ == '__main__':
+    if not URL_BANCO_DADOS:
+        sys.exit("DATABASE_URL não definido.")
+
+    if sys.argv[1:] == ['status']:
+        for versao, nome, aplicada in status_migracoes():
+            manual = ' (manual)' if versao in MIGRACOES_MANUAIS else ''
+            print(f"{'✅' if aplicada else '⏳'} {versao:>3}  {nome}{manual}")
+    else:
+        versoes = aplicar_migracoes(manuais=True)
+        print(f"Migrações aplicadas: {versoes}" if versoes else "Esquema já está atualizado.")
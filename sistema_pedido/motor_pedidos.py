@@ -0,0 +1,92 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sistema_pedido.configuracao import PEDIDOS_SIMULTANEOS
+from sistema_pedido.cliente_site import criar_sessao
+from sistema_pedido.perfilador import em_trabalhador
+
+# Cada thread trabalhadora tem a sua própria sessão HTTP (cookies + token CSRF),
+# já que requests.Session não deve ser compartilhada entre threads
+_dados_thread = threading.local()
+_sessoes_criadas = []
+_trava_sessoes = threading.Lock()
+
+# Modo residente (daemon): threads trabalhadoras fixas, cujas sessões (conexões keep-alive
+# e token CSRF) sobrevivem de uma execução para a outra
+_executor_residente = None
+
+def sessao_do_trabalhador():
+    """Devolve a sessão HTTP da thread atual, criando na primeira chamada."""
+    sessao = getattr(_dados_thread, 'sessao', None)
+    if sessao is None:
+        sessao = criar_sessao()
+        _dados_thread.sessao = sessao
+        with _trava_sessoes:
+            _sessoes_criadas.append(sessao)
+    return sessao
+
+def _fechar_sessoes():
+    """Fecha as sessões abertas pelas threads trabalhadoras."""
+    with _trava_sessoes:
+        while _sessoes_criadas:
+            _sessoes_criadas.pop().close()
+
+def executar_pedidos(alunos: list[dict], processar, limite: int = PEDIDOS_SIMULTANEOS) -> list:
+    """
+    Executa processar(aluno) para todos os alunos, com até `limite` em andamento ao mesmo tempo.
+
+    Args:
+        alunos (list[dict]): Roster do dia.
+        processar (callable): Função que recebe um aluno e devolve a tupla de resultado.
+        limite (int): Quantidade máxima de pedidos simultâneos.
+
+    Returns:
+        list: Os resultados na mesma ordem dos alunos.
+    """
+    limite = max(1, limite)
+    processar = em_trabalhador(processar)
+    if _executor_residente is not None:
+        logging.info(f"⚙️ Processando {len(alunos)} alunos com as threads residentes.")
+        return list(_executor_residente.map(processar, alunos))
+
+    logging.info(f"⚙️ Processando {len(alunos)} alunos com até {limite} pedidos simultâneos.")
+    try:
+        with ThreadPoolExecutor(max_workers=limite, thread_name_prefix='pedido') as executor:
+            return list(executor.map(processar, alunos))
+    finally:
+        _fechar_sessoes()
+
+def executar_em_paralelo(tarefa, limite: int = PEDIDOS_SIMULTANEOS) -> list:
+    """
+    Roda tarefa() em `limite` threads trabalhadoras ao mesmo tempo (cada uma com a sua
+    sessão HTTP, que dura até a tarefa terminar). Usado pelo modo fila, em que cada thread
+    vai buscando alunos na fila do banco em vez de receber uma lista pronta.
+
+    Returns:
+        list: O retorno de cada thread.
+    """
+    limite = max(1, limite)
+    tarefa = em_trabalhador(tarefa)
+    try:
+        with ThreadPoolExecutor(max_workers=limite, thread_name_prefix='pedido') as executor:
+            futuros = [executor.submit(tarefa) for _ in range(limite)]
+            return [futuro.result() for futuro in futuros]
+    finally:
+        _fechar_sessoes()
+
+def manter_trabalhadores(limite: int = PEDIDOS_SIMULTANEOS):
+    """
+    Liga o modo residente: executar_pedidos passa a usar `limite` threads fixas e não fecha
+    as sessões delas no final. Usado pelo daemon; desligue com encerrar_trabalhadores().
+    """
+    global _executor_residente
+    if _executor_residente is None:
+        _executor_residente = ThreadPoolExecutor(max_workers=max(1, limite), thread_name_prefix='pedido')
+
+def encerrar_trabalhadores():
+    """Desliga o modo residente: termina as threads fixas e fecha as sessões delas."""
+    global _executor_residente
+    if _executor_residente is not None:
+        _executor_residente.shutdown(wait=True)
+        _executor_residente = None
+    _fechar_sessoes()
@@ -0,0 +1,140 @@
+"""
+Manutenção das partições mensais do histórico de pedidos (tabela 'pedido').
+
+A tabela é particionada por mês de dia_pedido (pedido_AAAA_MM, migração 4, aplicada só
+pela linha de comando das migrações); dia sem partição mensal cai em pedido_padrao. Este módulo:
+
+- garante que existam as partições do mês atual e dos MESES_PARTICOES_FUTURAS seguintes
+  (roda sozinho na primeira conexão do processo, junto com as migrações; sem a migração 4
+  não faz nada), trazendo da partição padrão as linhas que já estavam lá;
+- arquiva as partições mais velhas que MESES_RETENCAO_PEDIDOS: cada uma é exportada para
+  DIRETORIO_ARQUIVO_PEDIDOS/pedido_AAAA_MM.csv.gz e só então desanexada e apagada.
+
+    python -m sistema_pedido.particoes             # lista as partições
+    python -m sistema_pedido.particoes garantir
+    python -m sistema_pedido.particoes arquivar
+"""
+import os
+import re
+import sys
+import gzip
+import logging
+from pathlib import Path
+from datetime import date, datetime
+import psycopg
+from psycopg import sql
+from sistema_pedido.configuracao import (
+    URL_BANCO_DADOS, FUSO_HORARIO, MESES_PARTICOES_FUTURAS, MESES_RETENCAO_PEDIDOS,
+    DIRETORIO_ARQUIVO_PEDIDOS
+)
+
+_RE_PARTICAO = re.compile(r'^pedido_(\d{4})_(\d{2})$')
+
+def _somar_meses(dia: date, meses: int) -> date:
+    """Primeiro dia do mês que fica `meses` depois (ou antes, se negativo) do mês de `dia`."""
+    indice = dia.year * 12 + dia.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+def garantir_particoes(url_banco: str | None = URL_BANCO_DADOS, meses_a_frente: int = MESES_PARTICOES_FUTURAS) -> int:
+    """
+    Cria as partições que faltam do mês atual até `meses_a_frente` meses depois. Retorna
+    quantas criou (0 se 'pedido' ainda não foi particionada pela migração 4).
+    """
+    if not url_banco:
+        return 0
+
+    hoje = datetime.now(FUSO_HORARIO).date()
+    with psycopg.connect(url_banco, autocommit=True) as conexao:
+        particionada = conexao.execute(
+            "SELECT to_regprocedure('garantir_particoes_pedido(date, date)') IS NOT NULL;"
+        ).fetchone()[0]
+        if not particionada:
+            return 0
+        criadas = conexao.execute(
+            "SELECT garantir_particoes_pedido(%s, %s);", (hoje, _somar_meses(hoje, meses_a_frente))
+        ).fetchone()[0]
+    if criadas:
+        logging.info(f"🗂️ {criadas} partições novas criadas para o histórico de pedidos.")
+    return criadas
+
+def listar_particoes(conexao) -> list[tuple[str, date]]:
+    """(nome, primeiro dia do mês) de cada partição de 'pedido', da mais velha para a mais nova."""
+    linhas = conexao.execute("""
+        SELECT c.relname
+          FROM pg_inherits i
+          JOIN pg_class c ON c.oid = i.inhrelid
+         WHERE i.inhparent = 'pedido'::regclass;
+    """).fetchall()
+    particoes = []
+    for (nome,) in linhas:
+        encontrado = _RE_PARTICAO.match(nome)
+        if encontrado:
+            particoes.append((nome, date(int(encontrado[1]), int(encontrado[2]), 1)))
+    return sorted(particoes, key=lambda particao: particao[1])
+
+def _exportar_particao(cursor, nome: str, destino: Path):
+    """Grava a partição inteira em CSV comprimido (escreve num .tmp e renomeia no final)."""
+    temporario = destino.with_name(destino.name + '.tmp')
+    comando = sql.SQL("COPY {} TO STDOUT (FORMAT csv, HEADER)").format(sql.Identifier(nome))
+    with open(temporario, 'wb') as bruto:
+        with gzip.GzipFile(filename=destino.stem, mode='wb', fileobj=bruto) as arquivo:
+            with cursor.copy(comando) as copia:
+                for bloco in copia:
+                    arquivo.write(bloco)
+        bruto.flush()
+        os.fsync(bruto.fileno())
+    os.replace(temporario, destino)
+
+def arquivar_particoes_antigas(
+    url_banco: str | None = URL_BANCO_DADOS,
+    meses_retencao: int = MESES_RETENCAO_PEDIDOS,
+    pasta: str = DIRETORIO_ARQUIVO_PEDIDOS,
+) -> list[Path]:
+    """
+    Exporta para .csv.gz e remove do banco as partições de meses anteriores à retenção.
+    Cada partição é tratada numa transação: bloqueia a escrita, exporta, desanexa e apaga;
+    se a exportação falhar, nada é apagado. Retorna os arquivos gerados.
+    """
+    if not url_banco:
+        return []
+
+    corte = _somar_meses(datetime.now(FUSO_HORARIO).date(), -meses_retencao)
+    Path(pasta).mkdir(parents=True, exist_ok=True)
+    arquivos = []
+
+    with psycopg.connect(url_banco) as conexao:
+        antigas = [nome for nome, mes in listar_particoes(conexao) if mes < corte]
+        conexao.commit()
+
+        for nome in antigas:
+            destino = Path(pasta) / f'{nome}.csv.gz'
+            tabela = sql.Identifier(nome)
+            try:
+                with conexao.transaction():
+                    with conexao.cursor() as cursor:
+                        cursor.execute(sql.SQL("LOCK TABLE {} IN SHARE MODE;").format(tabela))
+                        _exportar_particao(cursor, nome, destino)
+                        cursor.execute(sql.SQL("ALTER TABLE pedido DETACH PARTITION {};").format(tabela))
+                        cursor.execute(sql.SQL("DROP TABLE {};").format(tabela))
+                arquivos.append(destino)
+                logging.info(f"📦 Partição {nome} arquivada em {destino} e removida do banco.")
+            except Exception as e:
+                logging.error(f"❌ Erro ao arquivar a partição {nome}: {e}")
+                break
+
+    return arquivos
+
+if __name__ == '__main__':
+    if not URL_BANCO_DADOS:
+        sys.exit("DATABASE_URL não definido.")
+
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'listar'
+    if comando == 'garantir':
+        print(f"Partições criadas: {garantir_particoes()}")
+    elif comando == 'arquivar':
+        gerados = arquivar_particoes_antigas()
+        print('\n'.join(str(arquivo) for arquivo in gerados) or "Nenhuma partição fora da retenção.")
+    else:
+        with psycopg.connect(URL_BANCO_DADOS) as conexao:
+            for nome, mes in listar_particoes(conexao):
+                print(f"{nome}  {mes:%m/%Y}")
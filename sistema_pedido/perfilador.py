@@ -0,0 +1,168 @@
+"""
+Modo de perfilamento da execução de pedidos.
+
+Ligado com PERFILAR=1 ou `python -m sistema_pedido.iniciar_pedidos --perfilar`, tanto
+numa execução real (lenta) quanto com MODO_HTTP=reproduzir.
+Para cada fase da execução (cardápio, roster, pedidos, relatórios...) grava em
+DIRETORIO_PERFIL:
+    <fase>.pstats / <fase>.txt  -> cProfile da thread principal somado ao das threads
+                                   trabalhadoras (funções mais caras)
+    <fase>.folded               -> pilhas amostradas de TODAS as threads, no formato
+                                   "collapsed" (entrada do flamegraph.pl / speedscope)
+    <fase>_memoria.txt          -> maiores alocações da fase (tracemalloc)
+Contra o site real o agendador mantém o espaçamento dos pedidos; só com MODO_HTTP=reproduzir
+ele deixa de dormir até o horário sorteado de cada pedido.
+"""
+import io
+import sys
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import functools
+import tracemalloc
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from sistema_pedido.configuracao import DIRETORIO_PERFIL
+
+INTERVALO_AMOSTRAGEM = 0.01    # segundos entre duas amostras de pilha
+QUADROS_TRACEMALLOC = 1       # só a linha que alocou: pilhas mais fundas deixam o tracemalloc bem mais lento
+TOP_FUNCOES = 40
+TOP_ALOCACOES = 25
+
+_ativo = False
+
+# Perfis das tarefas das threads trabalhadoras durante a fase em andamento (None fora de fase)
+_perfis_trabalhadores = None
+_trava_perfis = threading.Lock()
+
+def ativar():
+    """Liga o modo de perfilamento para o resto do processo."""
+    global _ativo
+    if _ativo:
+        return
+    _ativo = True
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(QUADROS_TRACEMALLOC)
+    logging.info(f"🔬 Modo de perfilamento ligado (relatórios em {DIRETORIO_PERFIL}/).")
+
+def perfil_ativo() -> bool:
+    return _ativo
+
+def em_trabalhador(tarefa):
+    """
+    Envolve uma tarefa das threads trabalhadoras: durante uma fase perfilada ela roda sob
+    um cProfile próprio (o cProfile só enxerga a thread que o ligou), somado ao perfil da
+    fase no final.
+    """
+    @functools.wraps(tarefa)
+    def perfilada(*args, **kwargs):
+        perfis = _perfis_trabalhadores
+        if perfis is None:
+            return tarefa(*args, **kwargs)
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Outro perfilador já ativo (Python 3.12+ só aceita um por vez): fica só a amostragem
+            return tarefa(*args, **kwargs)
+        try:
+            return tarefa(*args, **kwargs)
+        finally:
+            perfil.disable()
+            with _trava_perfis:
+                perfis.append(perfil)
+    return perfilada
+
+def _nome_quadro(quadro) -> str:
+    codigo = quadro.f_code
+    modulo = quadro.f_globals.get('__name__') or Path(codigo.co_filename).stem
+    return f'{modulo}:{codigo.co_name}'
+
+class _Amostrador(threading.Thread):
+    """Thread que fotografa periodicamente a pilha de todas as outras threads."""
+
+    def __init__(self):
+        super().__init__(name='amostrador-perfil', daemon=True)
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        proprio = threading.get_ident()
+        nomes = {}
+        while not self._parar.wait(INTERVALO_AMOSTRAGEM):
+            for thread in threading.enumerate():
+                nomes[thread.ident] = thread.name
+            for ident, quadro in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = []
+                while quadro is not None:
+                    pilha.append(_nome_quadro(quadro))
+                    quadro = quadro.f_back
+                pilha.append(nomes.get(ident, f'thread-{ident}'))
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+def _gravar_relatorios(nome: str, perfil: cProfile.Profile, perfis_trabalhadores: list,
+                       amostrador: _Amostrador, memoria_antes, memoria_depois, duracao: float):
+    pasta = Path(DIRETORIO_PERFIL)
+    pasta.mkdir(parents=True, exist_ok=True)
+
+    texto = io.StringIO()
+    estatisticas = pstats.Stats(perfil, stream=texto)
+    if perfis_trabalhadores:
+        estatisticas.add(*perfis_trabalhadores)
+    estatisticas.dump_stats(pasta / f'{nome}.pstats')
+    if perfis_trabalhadores:
+        texto.write(f'Thread principal + {len(perfis_trabalhadores)} tarefas das threads trabalhadoras '
+                    f'(tempos somados entre threads)\n\n')
+    estatisticas.sort_stats('cumulative').print_stats(TOP_FUNCOES)
+    (pasta / f'{nome}.txt').write_text(texto.getvalue(), encoding='utf-8')
+
+    linhas = [f'{pilha} {quantidade}' for pilha, quantidade in amostrador.pilhas.most_common()]
+    (pasta / f'{nome}.folded').write_text('\n'.join(linhas) + '\n', encoding='utf-8')
+
+    diferencas = memoria_depois.compare_to(memoria_antes, 'lineno')
+    linhas = [f'Fase {nome}: {duracao:.2f}s, pico de memória rastreada {tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB', '']
+    linhas.extend(str(diferenca) for diferenca in diferencas[:TOP_ALOCACOES])
+    (pasta / f'{nome}_memoria.txt').write_text('\n'.join(linhas) + '\n', encoding='utf-8')
+
+@contextmanager
+def perfilar_fase(nome: str):
+    """Perfila o bloco `with` como a fase `nome` (não faz nada se o modo estiver desligado)."""
+    global _perfis_trabalhadores
+    if not _ativo:
+        yield
+        return
+
+    amostrador = _Amostrador()
+    perfil = cProfile.Profile()
+    perfis_trabalhadores, anteriores = [], _perfis_trabalhadores
+    _perfis_trabalhadores = perfis_trabalhadores
+    tracemalloc.reset_peak()
+    memoria_antes = tracemalloc.take_snapshot()
+    inicio = time.perf_counter()
+    amostrador.start()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        _perfis_trabalhadores = anteriores
+        amostrador.parar()
+        duracao = time.perf_counter() - inicio
+        with _trava_perfis:
+            perfis_trabalhadores = list(perfis_trabalhadores)
+        try:
+            _gravar_relatorios(
+                nome, perfil, perfis_trabalhadores, amostrador, memoria_antes, tracemalloc.take_snapshot(), duracao
+            )
+            logging.info(f"🔬 Perfil da fase '{nome}' gravado ({duracao:.2f}s, {sum(amostrador.pilhas.values())} amostras).")
+        except OSError as e:
+            logging.warning(f"⚠️ Não consegui gravar o perfil da fase '{nome}': {e}")
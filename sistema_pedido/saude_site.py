@@ -0,0 +1,235 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from collections import deque
+from contextlib import contextmanager
+from sistema_pedido.configuracao import (
+    PEDIDOS_SIMULTANEOS, LATENCIA_ALVO_SITE, FALHAS_PARA_ABRIR, TAXA_ERRO_ABRIR,
+    PAUSA_DISJUNTOR, PAUSA_MAXIMA_DISJUNTOR, ESPERA_MAXIMA_SITE
+)
+
+FECHADO = 'fechado'          # site saudável: pedidos liberados (dentro do limite atual)
+ABERTO = 'aberto'            # site caído: ninguém envia até a próxima sondagem
+MEIO_ABERTO = 'meio-aberto'  # sondando o site para decidir se volta a liberar
+
+TAMANHO_JANELA = 20          # quantos resultados recentes entram na taxa de erro/latência
+AMOSTRAS_MINIMAS = 10        # a taxa de erro só abre o disjuntor com pelo menos isso de amostras
+INTERVALO_APOS_FALHA = 0.5   # intervalo mínimo entre envios logo depois de uma falha (s)
+INTERVALO_MAXIMO = 10.0      # teto do intervalo entre envios (s)
+REDUCAO_INTERVALO = 0.1      # quanto o intervalo diminui a cada sucesso rápido (s)
+
+class SiteIndisponivel(RuntimeError):
+    """O disjuntor continuou aberto por mais de ESPERA_MAXIMA_SITE segundos (ou até o prazo da execução)."""
+
+class ResultadoRequisicao:
+    """Marcador devolvido por ControladorSaude.requisicao(): chame falhou() se o site respondeu mal."""
+
+    def __init__(self):
+        self.sucesso = True
+
+    def falhou(self):
+        self.sucesso = False
+
+class ControladorSaude:
+    """
+    Controla o ritmo dos pedidos de acordo com a saúde do site do refeitório.
+
+    - AIMD: cada resposta boa e rápida aumenta um pouco o número de pedidos simultâneos
+      e diminui o intervalo entre envios; cada falha (ou resposta lenta) corta a
+      concorrência pela metade e dobra o intervalo.
+    - Disjuntor: com FALHAS_PARA_ABRIR falhas seguidas (ou taxa de erro recente acima de
+      TAXA_ERRO_ABRIR), todos os envios param. Depois de uma pausa o site é sondado com
+      `sonda()`; se responder, os envios voltam aos poucos, senão a pausa dobra.
+
+    Uso: `with controlador.requisicao() as resultado: ...` e `resultado.falhou()` se
+    a resposta do site veio quebrada.
+    """
+
+    def __init__(self, sonda=None, limite_maximo: int = PEDIDOS_SIMULTANEOS):
+        self.sonda = sonda
+        self.limite_maximo = max(1, limite_maximo)
+        self._cond = threading.Condition()
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Volta ao estado inicial (site considerado saudável) e zera os contadores."""
+        with self._cond:
+            self.estado = FECHADO
+            self.limite = float(self.limite_maximo)
+            self.intervalo = 0.0
+            self._em_andamento = 0
+            self._proximo_envio = 0.0
+            self._janela = deque(maxlen=TAMANHO_JANELA)
+            self._falhas_seguidas = 0
+            self._pausa = PAUSA_DISJUNTOR
+            self._reabrir_em = 0.0
+            self.estatisticas = {
+                'requisicoes': 0, 'falhas': 0, 'lentas': 0, 'aberturas': 0,
+                'sondagens': 0, 'segundos_pausado': 0.0,
+            }
+            self._aberto_desde = None
+            self._desistiu = False
+            self._cond.notify_all()
+
+    # --- Entrada/saída de cada requisição ---
+
+    def entrar(self, prazo: datetime | None = None):
+        """
+        Espera até poder enviar (disjuntor fechado, vaga de concorrência e intervalo).
+        A espera vai no máximo até ESPERA_MAXIMA_SITE ou até `prazo` (o que vier antes);
+        se o disjuntor já fez alguém desistir, os próximos falham na hora em vez de
+        esperarem o próprio tempo limite, até uma sondagem achar o site de volta.
+        """
+        limite_espera = time.monotonic() + ESPERA_MAXIMA_SITE
+        motivo = f'há mais de {ESPERA_MAXIMA_SITE:.0f}s'
+        if prazo is not None:
+            limite_prazo = time.monotonic() + (prazo - datetime.now(prazo.tzinfo)).total_seconds()
+            if limite_prazo < limite_espera:
+                limite_espera, motivo = limite_prazo, f'até o prazo da execução ({prazo:%H:%M:%S})'
+
+        with self._cond:
+            while True:
+                agora = time.monotonic()
+                if self.estado == ABERTO and agora >= self._reabrir_em:
+                    self._sondar()
+                    continue
+
+                if (self.estado == FECHADO and self._em_andamento < int(self.limite)
+                        and agora >= self._proximo_envio):
+                    self._em_andamento += 1
+                    self._proximo_envio = agora + self.intervalo
+                    return
+
+                if self.estado != FECHADO and self._desistiu:
+                    raise SiteIndisponivel(
+                        f'Site indisponível: pedido parado (disjuntor {self.estado} desde a última desistência)'
+                    )
+
+                if agora >= limite_espera:
+                    if self.estado != FECHADO:
+                        self._desistiu = True
+                    raise SiteIndisponivel(f'Site indisponível: pedido parado {motivo} ({self.estado})')
+
+                if self.estado == ABERTO:
+                    espera = self._reabrir_em - agora
+                elif self.estado == FECHADO and self._em_andamento < int(self.limite):
+                    espera = self._proximo_envio - agora
+                else:
+                    espera = None  # acorda quando alguém terminar ou a sondagem decidir (notify_all)
+                espera = limite_espera - agora if espera is None else min(espera, limite_espera - agora)
+                self._cond.wait(max(espera, 0.001))
+
+    def sair(self, sucesso: bool, latencia: float):
+        """Registra o resultado de uma requisição e ajusta ritmo/concorrência/disjuntor."""
+        with self._cond:
+            self._em_andamento -= 1
+            self.estatisticas['requisicoes'] += 1
+            self._janela.append((sucesso, latencia))
+
+            if sucesso:
+                self._falhas_seguidas = 0
+                if latencia > LATENCIA_ALVO_SITE:
+                    self.estatisticas['lentas'] += 1
+                    self._diminuir()
+                else:
+                    self._aumentar()
+            else:
+                self.estatisticas['falhas'] += 1
+                self._falhas_seguidas += 1
+                self._diminuir()
+                if self.estado == FECHADO and self._deve_abrir():
+                    self._abrir()
+
+            self._cond.notify_all()
+
+    @contextmanager
+    def requisicao(self, prazo: datetime | None = None):
+        """Context manager: entra (esperando no máximo até `prazo`), mede a latência e sai (exceção conta como falha)."""
+        self.entrar(prazo)
+        resultado = ResultadoRequisicao()
+        inicio = time.perf_counter()
+        try:
+            yield resultado
+        except Exception:
+            resultado.falhou()
+            raise
+        finally:
+            self.sair(resultado.sucesso, time.perf_counter() - inicio)
+
+    # --- AIMD ---
+
+    def _aumentar(self):
+        # +1 pedido simultâneo a cada "rodada" de sucessos; intervalo cai devagar
+        self.limite = min(self.limite_maximo, self.limite + 1 / self.limite)
+        self.intervalo = max(0.0, self.intervalo - REDUCAO_INTERVALO)
+
+    def _diminuir(self):
+        self.limite = max(1.0, self.limite / 2)
+        self.intervalo = min(INTERVALO_MAXIMO, max(self.intervalo * 2, INTERVALO_APOS_FALHA))
+
+    # --- Disjuntor ---
+
+    def _deve_abrir(self) -> bool:
+        if self._falhas_seguidas >= FALHAS_PARA_ABRIR:
+            return True
+        if len(self._janela) < AMOSTRAS_MINIMAS:
+            return False
+        falhas = sum(1 for sucesso, _ in self._janela if not sucesso)
+        return falhas / len(self._janela) >= TAXA_ERRO_ABRIR
+
+    def _abrir(self):
+        self.estado = ABERTO
+        self.estatisticas['aberturas'] += 1
+        self._reabrir_em = time.monotonic() + self._pausa
+        if self._aberto_desde is None:
+            self._aberto_desde = time.monotonic()
+        logging.warning(
+            f"⛔ Site do refeitório instável ({self._falhas_seguidas} falhas seguidas): "
+            f"pedidos pausados por {self._pausa:.0f}s."
+        )
+
+    def _sondar(self):
+        """Chamada com a trava: faz a sondagem (sem a trava) e fecha ou reabre o disjuntor."""
+        self.estado = MEIO_ABERTO
+        self.estatisticas['sondagens'] += 1
+        self._cond.release()
+        try:
+            ok = bool(self.sonda()) if self.sonda else True
+        except Exception as e:
+            logging.warning(f"⚠️ Sondagem do site falhou: {e}")
+            ok = False
+        finally:
+            self._cond.acquire()
+
+        if ok:
+            pausado = time.monotonic() - self._aberto_desde
+            self.estatisticas['segundos_pausado'] += pausado
+            self._aberto_desde = None
+            self._desistiu = False
+            self.estado = FECHADO
+            self._falhas_seguidas = 0
+            self._janela.clear()
+            self._pausa = PAUSA_DISJUNTOR
+            # Volta devagar (1 por vez, intervalo curto): o AIMD acelera conforme os sucessos
+            self.limite = 1.0
+            self.intervalo = INTERVALO_APOS_FALHA
+            logging.info(f"✅ Site do refeitório respondeu de novo após {pausado:.0f}s: retomando os pedidos.")
+        else:
+            self._pausa = min(self._pausa * 2, PAUSA_MAXIMA_DISJUNTOR)
+            self.estado = ABERTO
+            self._reabrir_em = time.monotonic() + self._pausa
+            logging.warning(f"⛔ Site ainda fora do ar: nova sondagem em {self._pausa:.0f}s.")
+        self._cond.notify_all()
+
+    def resumo(self) -> str:
+        """Texto curto com a saúde do site na execução (para logs/relatório)."""
+        with self._cond:
+            e = self.estatisticas
+            taxa = (e['falhas'] / e['requisicoes'] * 100) if e['requisicoes'] else 0.0
+            return (
+                f"Site: {e['requisicoes']} requisições, {taxa:.0f}% com falha, {e['lentas']} lentas; "
+                f"disjuntor abriu {e['aberturas']}x ({e['segundos_pausado']:.0f}s pausado, "
+                f"{e['sondagens']} sondagens); terminou com {int(self.limite)} simultâneos "
+                f"e {self.intervalo:.1f}s entre envios"
+            )
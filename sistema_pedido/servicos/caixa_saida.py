@@ -0,0 +1,91 @@
+"""
+Entregador da caixa de saída de WhatsApp (tabela 'mensagem_saida').
+
+O processo de pedidos só grava as mensagens no banco; este módulo faz a entrega,
+com novas tentativas espaçadas enquanto o bot estiver fora do ar.
+
+Uso:
+    python -m sistema_pedido.servicos.caixa_saida              # entrega o que estiver pronto e sai
+    python -m sistema_pedido.servicos.caixa_saida --continuo   # fica rodando (modo worker)
+"""
+import sys
+import time
+import logging
+from concurrent.futures import wait
+from sistema_pedido.banco_dados import (
+    reservar_mensagens, marcar_mensagens_enviadas, adiar_mensagem, desistir_mensagem,
+    descarregar_escritas, fechar_pool
+)
+from sistema_pedido.servicos.whatsapp import (
+    obter_despachante, tentar_envio, ENVIADA, DESISTIR
+)
+
+# Quantas mensagens reservar por vez
+TAMANHO_LOTE = 50
+
+# Por quanto tempo uma mensagem reservada fica "presa" ao entregador (se ele morrer, volta para a fila)
+SEGUNDOS_RESERVA = 120
+
+# Espera entre tentativas: 30s, 60s, 120s... até no máximo 1 hora
+ESPERA_INICIAL = 30
+ESPERA_MAXIMA = 3600
+
+# Depois de tantas tentativas a mensagem é descartada
+MAX_TENTATIVAS = 12
+
+# Intervalo (em segundos) entre verificações no modo contínuo
+INTERVALO_CONTINUO = 15
+
+def drenar_caixa_saida(limite_lotes: int | None = None) -> int:
+    """
+    Entrega as mensagens prontas da caixa de saída, lote por lote, até a fila esvaziar
+    (ou até `limite_lotes`). Os envios de cada lote rodam em paralelo.
+    Retorna quantas mensagens foram entregues.
+    """
+    descarregar_escritas()
+    entregues = 0
+    lotes = 0
+
+    while limite_lotes is None or lotes < limite_lotes:
+        mensagens = reservar_mensagens(TAMANHO_LOTE, SEGUNDOS_RESERVA)
+        if not mensagens:
+            break
+        lotes += 1
+
+        executor = obter_despachante()
+        futuros = {
+            executor.submit(tentar_envio, telefone, texto): (id_mensagem, telefone, tentativas)
+            for id_mensagem, telefone, texto, tentativas in mensagens
+        }
+        wait(futuros)
+
+        enviados = []
+        for futuro, (id_mensagem, telefone, tentativas) in futuros.items():
+            resultado, problema = futuro.result()
+            if resultado == ENVIADA:
+                enviados.append(id_mensagem)
+            elif resultado == DESISTIR or tentativas >= MAX_TENTATIVAS:
+                logging.error(f"🚨 Mensagem {id_mensagem} para {telefone} descartada: {problema}")
+                desistir_mensagem(id_mensagem, problema)
+            else:
+                espera = min(ESPERA_INICIAL * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+                logging.warning(f"⏳ {problema} para {telefone}. Nova tentativa em {espera}s.")
+                adiar_mensagem(id_mensagem, espera, problema)
+
+        marcar_mensagens_enviadas(enviados)
+        entregues += len(enviados)
+
+    if entregues:
+        logging.info(f"📬 Caixa de saída: {entregues} mensagens entregues.")
+    return entregues
+
+if __name__ == '__main__':
+    try:
+        if '--continuo' in sys.argv:
+            while True:
+                drenar_caixa_saida()
+                time.sleep(INTERVALO_CONTINUO)
+        else:
+            drenar_caixa_saida()
+    finally:
+        fechar_pool()
@@ -4,6 +4,7 @@ from email.message import EmailMessage
 from sistema_pedido.configuracao import (
     EMAIL_USUARIO, EMAIL_SENHA, SERVIDOR_SMTP, PORTA_SMTP, EMAIL_DESTINO
 )
+from sistema_pedido.metricas import medir
 
 def enviar_email(assunto: str, corpo: str):
     """
@@ -25,7 +26,7 @@ def enviar_email(assunto: str, corpo: str):
 
     try:
         # Conecta ao servidor SMTP (ex: Gmail)
-        with smtplib.SMTP(SERVIDOR_SMTP, PORTA_SMTP) as smtp:
+        with medir('smtp_segundos'), smtplib.SMTP(SERVIDOR_SMTP, PORTA_SMTP) as smtp:
             smtp.starttls() # Inicia criptografia TLS para segurança
             smtp.login(EMAIL_USUARIO, EMAIL_SENHA)
             smtp.send_message(mensagem)
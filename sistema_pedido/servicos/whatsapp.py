@@ -1,80 +1,139 @@
 import requests
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 from sistema_pedido.configuracao import URL_BOT_WHATSAPP, ADMINISTRADORES
+from sistema_pedido.metricas import medir
 
-# Configuração de retry para notificações críticas
+# Configuração de retry para notificações
 MAX_TENTATIVAS = 3
-ESPERA_ENTRE_TENTATIVAS = 15  # segundos
+ESPERA_ENTRE_TENTATIVAS = 5  # segundos (dobra a cada nova tentativa: 5, 10, ...)
+
+# Quantas mensagens podem estar sendo enviadas ao bot ao mesmo tempo
+LIMITE_ENVIOS_SIMULTANEOS = 4
+
+# As mensagens são enviadas em segundo plano: quem chama só enfileira e segue em frente.
+# Uma sessão HTTP compartilhada mantém as conexões com o bot abertas (keep-alive).
+_sessao_http = None
+_executor = None
+_envios_pendentes = []
+_trava_envios = threading.Lock()
+
+def obter_despachante():
+    """Cria (na primeira chamada) a sessão HTTP e o pool de threads de envio."""
+    global _sessao_http, _executor
+    with _trava_envios:
+        if _executor is None:
+            _sessao_http = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=LIMITE_ENVIOS_SIMULTANEOS)
+            _sessao_http.mount('http://', adaptador)
+            _sessao_http.mount('https://', adaptador)
+            _executor = ThreadPoolExecutor(max_workers=LIMITE_ENVIOS_SIMULTANEOS, thread_name_prefix='whatsapp')
+        return _executor
+
+# Resultado de uma tentativa de envio
+ENVIADA = 'enviada'      # bot aceitou a mensagem
+REPETIR = 'repetir'      # falha temporária (bot offline, timeout): vale tentar de novo
+DESISTIR = 'desistir'    # falha permanente (4xx, erro inesperado): não adianta repetir
+
+def tentar_envio(numero: str, mensagem: str) -> tuple[str, str]:
+    """
+    Faz uma única tentativa de envio ao bot.
+    Retorna (ENVIADA | REPETIR | DESISTIR, descrição do problema).
+    """
+    obter_despachante()
+    try:
+        payload = {
+            "number": numero,
+            "message": mensagem
+        }
+        with medir('http_segundos', endpoint='whatsapp'):
+            resposta = _sessao_http.post(URL_BOT_WHATSAPP, json=payload, timeout=15)
+
+        if resposta.status_code == 200:
+            return ENVIADA, ""
+        elif resposta.status_code == 503:
+            # Bot conectado mas WhatsApp offline - retry pode ajudar
+            return REPETIR, "Bot offline (503)"
+        else:
+            # Não dá retry em erros 4xx (dados errados, etc)
+            return DESISTIR, f"Erro {resposta.status_code}: {resposta.text[:200]}"
+
+    except requests.exceptions.ConnectionError:
+        return REPETIR, "Conexão recusada"
+    except requests.exceptions.Timeout:
+        return REPETIR, "Timeout"
+    except Exception as erro:
+        return DESISTIR, f"Erro inesperado: {erro}"
+
+def _enviar_com_retry(numero: str, mensagem: str, descricao: str) -> bool:
+    """
+    Envia uma mensagem ao bot, tentando de novo com espera exponencial se o bot
+    estiver indisponível. Roda numa thread de envio, sem segurar quem pediu o envio.
+    """
+    for tentativa in range(1, MAX_TENTATIVAS + 1):
+        resultado, problema = tentar_envio(numero, mensagem)
+
+        if resultado == ENVIADA:
+            logging.info(f"📱 Mensagem enviada para {descricao} {numero}")
+            return True
+        if resultado == DESISTIR:
+            logging.error(f"❌ {problema} ao notificar {numero}")
+            return False
+
+        logging.warning(f"⏳ {problema} para {numero}. Tentativa {tentativa}/{MAX_TENTATIVAS}")
+
+        # Espera antes de tentar novamente (só esta mensagem espera)
+        if tentativa < MAX_TENTATIVAS:
+            time.sleep(ESPERA_ENTRE_TENTATIVAS * 2 ** (tentativa - 1))
+
+    logging.error(f"🚨 FALHA TOTAL: Não conseguiu notificar {numero} após {MAX_TENTATIVAS} tentativas!")
+    return False
+
+def _enfileirar(numero: str, mensagem: str, descricao: str):
+    futuro = obter_despachante().submit(_enviar_com_retry, numero, mensagem, descricao)
+    with _trava_envios:
+        _envios_pendentes.append(futuro)
+    return futuro
 
 def notificar_administradores(mensagem: str):
     """
     Envia uma mensagem de alerta para os números de administradores configurados
     via API do bot WhatsApp.
     
-    Inclui retry automático para evitar perda de alertas em caso de
-    indisponibilidade temporária (ex: bot reiniciando após deploy).
+    O envio acontece em segundo plano, com retry automático para evitar perda de
+    alertas em caso de indisponibilidade temporária (ex: bot reiniciando após deploy).
+    Use aguardar_envios() antes de encerrar o processo.
     """
     if not URL_BOT_WHATSAPP or not ADMINISTRADORES:
         logging.warning("⚠️ Bot URL ou Admins não configurados. Alerta WhatsApp ignorado.")
         return
 
-    # Limpa espaços e separa por vírgula para pegar cada número
-    lista_admins = [num.strip() for num in ADMINISTRADORES.split(',') if num.strip()]
-    
-    for numero in lista_admins:
-        enviado = False
-        for tentativa in range(1, MAX_TENTATIVAS + 1):
-            try:
-                payload = {
-                    "number": numero,
-                    "message": mensagem
-                }
-                resposta = requests.post(URL_BOT_WHATSAPP, json=payload, timeout=15)
-                
-                if resposta.status_code == 200:
-                    logging.info(f"📱 Alerta enviado para {numero}")
-                    enviado = True
-                    break
-                elif resposta.status_code == 503:
-                    # Bot conectado mas WhatsApp offline - retry pode ajudar
-                    logging.warning(f"⏳ Bot offline (503) para {numero}. Tentativa {tentativa}/{MAX_TENTATIVAS}")
-                else:
-                    logging.error(f"❌ Erro {resposta.status_code} ao notificar {numero}: {resposta.text}")
-                    enviado = True  # Não dá retry em erros 4xx (dados errados, etc)
-                    break
-
-            except requests.exceptions.ConnectionError:
-                logging.warning(f"⏳ Conexão recusada para {numero}. Tentativa {tentativa}/{MAX_TENTATIVAS}")
-            except requests.exceptions.Timeout:
-                logging.warning(f"⏳ Timeout ao notificar {numero}. Tentativa {tentativa}/{MAX_TENTATIVAS}")
-            except Exception as erro:
-                logging.error(f"❌ Erro inesperado ao notificar {numero}: {erro}")
-                break  # Erro desconhecido, não tenta de novo
-
-            # Espera antes de tentar novamente
-            if tentativa < MAX_TENTATIVAS:
-                time.sleep(ESPERA_ENTRE_TENTATIVAS)
-
-        if not enviado:
-            logging.error(f"🚨 FALHA TOTAL: Não conseguiu notificar {numero} após {MAX_TENTATIVAS} tentativas!")
-
-def enviar_mensagem_aluno(telefone: str, mensagem: str):
+    for numero in numeros_administradores():
+        _enfileirar(numero, mensagem, 'admin')
+
+def numeros_administradores() -> list[str]:
+    """Lista de telefones dos administradores configurados em ADMINS_E164."""
+    return [num.strip() for num in ADMINISTRADORES.split(',') if num.strip()]
+
+def aguardar_envios(tempo_limite: float | None = None) -> int:
     """
-    Envia uma mensagem para um aluno específico via API do bot WhatsApp.
-    Usa apenas 1 tentativa — se falhar, só loga (não é crítico).
+    Espera terminar todos os envios enfileirados (chamar no fim da execução).
+    Retorna quantas mensagens não foram entregues.
     """
-    if not URL_BOT_WHATSAPP or not telefone:
-        return
+    with _trava_envios:
+        pendentes = list(_envios_pendentes)
+        _envios_pendentes.clear()
 
-    try:
-        payload = {"number": telefone, "message": mensagem}
-        resposta = requests.post(URL_BOT_WHATSAPP, json=payload, timeout=15)
-
-        if resposta.status_code == 200:
-            logging.info(f"📱 Mensagem enviada para aluno {telefone}")
-        else:
-            logging.warning(f"⚠️ Falha ao enviar para {telefone}: {resposta.status_code}")
-    except Exception as e:
-        logging.warning(f"⚠️ Erro ao enviar mensagem para {telefone}: {e}")
+    if not pendentes:
+        return 0
 
+    concluidos, nao_concluidos = wait(pendentes, timeout=tempo_limite)
+    falhas = len(nao_concluidos) + sum(1 for futuro in concluidos if futuro.exception() or not futuro.result())
+    if falhas:
+        logging.warning(f"⚠️ {falhas} de {len(pendentes)} mensagens de WhatsApp não foram entregues.")
+    else:
+        logging.info(f"📱 {len(pendentes)} mensagens de WhatsApp entregues.")
+    return falhas
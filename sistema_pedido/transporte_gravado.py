@@ -0,0 +1,165 @@
+"""
+Gravação e reprodução das conversas HTTP com o site do refeitório.
+
+Com MODO_HTTP=gravar, cada requisição real (GET do cardápio/token, POST do pedido) é
+guardada em ARQUIVO_HTTP (JSON Lines comprimido com gzip). Com MODO_HTTP=reproduzir, as
+sessões não vão à rede: cada requisição é respondida com a gravação correspondente,
+esperando o mesmo tempo que o site levou multiplicado por ESCALA_TEMPO_HTTP
+(0 responde na hora, 0.5 pela metade do tempo, 2 simula um dia duas vezes mais lento).
+
+As requisições são casadas por método + caminho + campos do formulário (sem o token CSRF,
+que muda a cada sessão). Várias gravações com a mesma chave são devolvidas na ordem em que
+foram gravadas; a última se repete quando acabam.
+"""
+import gzip
+import json
+import time
+import base64
+import atexit
+import logging
+import threading
+from pathlib import Path
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qsl
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from sistema_pedido.configuracao import ARQUIVO_HTTP, ESCALA_TEMPO_HTTP, FUSO_HORARIO
+
+# Cabeçalhos guardados na gravação (o resto não muda nada para o sistema)
+CABECALHOS_GRAVADOS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Set-Cookie')
+
+# Campos do formulário que mudam a cada sessão e não identificam a requisição
+CAMPOS_IGNORADOS = {'csrfmiddlewaretoken'}
+
+def _chave(metodo: str, url: str, corpo) -> str:
+    partes = urlsplit(url)
+    caminho = partes.path + (f'?{partes.query}' if partes.query else '')
+    if isinstance(corpo, bytes):
+        corpo = corpo.decode('utf-8', errors='replace')
+    campos = sorted((k, v) for k, v in parse_qsl(corpo or '') if k not in CAMPOS_IGNORADOS)
+    return f"{metodo} {caminho} {'&'.join(f'{k}={v}' for k, v in campos)}".rstrip()
+
+class AdaptadorGravacao(HTTPAdapter):
+    """Adaptador que faz a requisição de verdade e grava requisição + resposta + tempo gasto."""
+
+    def __init__(self, arquivo: str = ARQUIVO_HTTP, **kwargs):
+        super().__init__(**kwargs)
+        self.arquivo = Path(arquivo)
+
+    def send(self, requisicao, **kwargs):
+        inicio = time.perf_counter()
+        resposta = super().send(requisicao, **kwargs)
+        corpo = resposta.content  # lê o corpo inteiro (mesmo com stream=True) para gravar
+        duracao = time.perf_counter() - inicio
+
+        try:
+            texto = corpo.decode('utf-8')
+            codificado = False
+        except UnicodeDecodeError:
+            texto = base64.b64encode(corpo).decode('ascii')
+            codificado = True
+
+        _gravador.escrever(self.arquivo, {
+            'chave': _chave(requisicao.method, requisicao.url, requisicao.body),
+            'status': resposta.status_code,
+            'motivo': resposta.reason,
+            'cabecalhos': {nome: resposta.headers[nome] for nome in CABECALHOS_GRAVADOS if nome in resposta.headers},
+            'duracao': round(duracao, 4),
+            'corpo': texto,
+            'base64': codificado,
+        })
+        return resposta
+
+class _Gravador:
+    """Mantém o arquivo gzip aberto durante o processo e serializa as escritas das threads."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._arquivos = {}
+
+    def escrever(self, caminho: Path, registro: dict):
+        with self._trava:
+            arquivo = self._arquivos.get(caminho)
+            if arquivo is None:
+                caminho.parent.mkdir(parents=True, exist_ok=True)
+                arquivo = gzip.open(caminho, 'at', encoding='utf-8')
+                arquivo.write(json.dumps({'versao': 1, 'gravado_em': datetime.now(FUSO_HORARIO).isoformat()}) + '\n')
+                self._arquivos[caminho] = arquivo
+                logging.info(f"📼 Gravando as respostas HTTP em {caminho}")
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+    def fechar(self):
+        with self._trava:
+            for arquivo in self._arquivos.values():
+                arquivo.close()
+            self._arquivos.clear()
+
+_gravador = _Gravador()
+atexit.register(_gravador.fechar)
+
+def carregar_gravacoes(arquivo: str = ARQUIVO_HTTP) -> dict[str, deque]:
+    """Lê o arquivo de gravações e agrupa os registros por chave, na ordem gravada."""
+    gravacoes = {}
+    with gzip.open(arquivo, 'rt', encoding='utf-8') as entrada:
+        for linha in entrada:
+            registro = json.loads(linha)
+            if 'chave' in registro:
+                gravacoes.setdefault(registro['chave'], deque()).append(registro)
+    return gravacoes
+
+class AdaptadorReproducao(BaseAdapter):
+    """Adaptador que responde com as gravações, sem acessar a rede."""
+
+    def __init__(self, arquivo: str = ARQUIVO_HTTP, escala_tempo: float = ESCALA_TEMPO_HTTP):
+        super().__init__()
+        self.escala_tempo = escala_tempo
+        self._trava = threading.Lock()
+        self._gravacoes = carregar_gravacoes(arquivo)
+        quantidade = sum(len(fila) for fila in self._gravacoes.values())
+        logging.info(f"📼 Reproduzindo {quantidade} respostas HTTP de {arquivo} (tempo x{escala_tempo})")
+
+    def _proxima(self, chave: str) -> dict | None:
+        with self._trava:
+            fila = self._gravacoes.get(chave)
+            if not fila:
+                return None
+            return fila.popleft() if len(fila) > 1 else fila[0]
+
+    def send(self, requisicao, **kwargs):
+        chave = _chave(requisicao.method, requisicao.url, requisicao.body)
+        registro = self._proxima(chave)
+        if registro is None:
+            raise requests.exceptions.ConnectionError(f'Sem gravação para {chave}', request=requisicao)
+
+        if self.escala_tempo > 0:
+            time.sleep(registro['duracao'] * self.escala_tempo)
+
+        corpo = base64.b64decode(registro['corpo']) if registro['base64'] else registro['corpo'].encode('utf-8')
+        resposta = requests.Response()
+        resposta.status_code = registro['status']
+        resposta.reason = registro.get('motivo')
+        resposta.headers = CaseInsensitiveDict(registro['cabecalhos'])
+        resposta.encoding = get_encoding_from_headers(resposta.headers)
+        resposta.url = requisicao.url
+        resposta.request = requisicao
+        resposta.connection = self
+        resposta._content = corpo
+        resposta._content_consumed = True
+        return resposta
+
+    def close(self):
+        pass
+
+_reprodutor = None
+_trava_reprodutor = threading.Lock()
+
+def obter_reprodutor() -> AdaptadorReproducao:
+    """Adaptador de reprodução único do processo (o arquivo é lido uma vez só)."""
+    global _reprodutor
+    with _trava_reprodutor:
+        if _reprodutor is None:
+            _reprodutor = AdaptadorReproducao()
+        return _reprodutor
@@ -1,4 +1,5 @@
 import unicodedata
+from functools import lru_cache
 from datetime import datetime, timedelta
 from sistema_pedido.configuracao import FUSO_HORARIO, HORA_CORTE, MINUTO_CORTE
 
@@ -25,8 +26,12 @@ def data_alvo_pedido(agora: datetime | None = None):
         
     return data_alvo
 
+@lru_cache(maxsize=8192)
 def normalizar_texto(texto: str) -> str:
-    """Remove acentos e converte para minúsculas para comparação fácil."""
+    """
+    Remove acentos e converte para minúsculas para comparação fácil.
+    O resultado fica em cache: os mesmos termos bloqueados se repetem entre muitos alunos.
+    """
     if not texto:
         return ""
     # Normaliza unicode (separando acentos das letras)
@@ -34,21 +39,3 @@ def normalizar_texto(texto: str) -> str:
     # Filtra apenas caracteres não-espaçamento (remove acentos)
     texto_sem_acento = ''.join(c for c in nfkd if not unicodedata.combining(c))
     return texto_sem_acento.lower()
-
-def verificar_bloqueios(texto_cardapio: str, lista_bloqueios: list[str]) -> tuple[bool, str]:
-    """
-    Verifica se o prato do dia contém algum item bloqueado pelo aluno.
-    Retorna (True, "item_bloqueado") se encontrar, ou (False, "") se estiver limpo.
-    """
-    texto_base = normalizar_texto(texto_cardapio)
-    encontrados = []
-    
-    for bloqueio in lista_bloqueios:
-        bloqueio_norm = normalizar_texto(bloqueio)
-        # Se o bloqueio existe e está contido no texto do prato
-        if bloqueio_norm and bloqueio_norm in texto_base:
-            encontrados.append(bloqueio)
-            
-    if encontrados:
-        return True, ", ".join(encontrados)
-    return False, ""
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Permite `pytest` direto da raiz (sem instalar o pacote): sistema_pedido e benchmarks importáveis
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,53 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from sistema_pedido.agendador import planejar_despachos, calcular_prazo, espera_retentativa
+from sistema_pedido.configuracao import (
+    FUSO_HORARIO, HORA_CORTE, MINUTO_CORTE, FOLGA_CORTE_MINUTOS, JANELA_DESPACHO
+)
+
+INICIO = datetime(2026, 10, 19, 6, 0, tzinfo=FUSO_HORARIO)
+
+def _intervalos(horarios):
+    return [(b - a).total_seconds() for a, b in zip(horarios, horarios[1:])]
+
+@pytest.mark.parametrize('semente', range(5))
+def test_horarios_dentro_da_janela_e_espacados(semente):
+    random.seed(semente)
+    prazo = INICIO + timedelta(minutes=30)
+    horarios = planejar_despachos(200, INICIO, prazo, espacamento=2)
+
+    assert len(horarios) == 200
+    assert horarios == sorted(horarios)
+    assert INICIO <= horarios[0] and horarios[-1] <= prazo
+    assert min(_intervalos(horarios)) >= 2 - 1e-6
+
+def test_janela_pequena_estica_mas_mantem_espacamento(caplog):
+    prazo = INICIO + timedelta(seconds=60)
+    horarios = planejar_despachos(100, INICIO, prazo, espacamento=2)
+
+    assert len(horarios) == 100
+    assert min(_intervalos(horarios)) >= 2 - 1e-6
+    assert horarios[-1] > prazo
+    assert 'não cabem na janela' in caplog.text
+
+def test_nenhum_pedido():
+    assert planejar_despachos(0, INICIO, INICIO + timedelta(minutes=30)) == []
+
+def test_prazo_termina_antes_do_corte():
+    corte = INICIO.replace(hour=HORA_CORTE, minute=MINUTO_CORTE)
+    agora = corte - timedelta(minutes=FOLGA_CORTE_MINUTOS, seconds=JANELA_DESPACHO + 600)
+    assert calcular_prazo(agora) == agora + timedelta(seconds=JANELA_DESPACHO)
+
+    agora = corte - timedelta(minutes=FOLGA_CORTE_MINUTOS, seconds=60)
+    assert calcular_prazo(agora) == corte - timedelta(minutes=FOLGA_CORTE_MINUTOS)
+
+def test_prazo_dentro_da_folga_usa_o_corte():
+    corte = INICIO.replace(hour=HORA_CORTE, minute=MINUTO_CORTE)
+    agora = corte - timedelta(minutes=1)
+    assert calcular_prazo(agora) == corte
+
+def test_retentativa_nao_passa_do_prazo():
+    prazo = datetime.now(FUSO_HORARIO) + timedelta(seconds=5)
+    assert espera_retentativa(prazo, espera=30) <= 5
+    assert espera_retentativa(datetime.now(FUSO_HORARIO) - timedelta(seconds=1), espera=30) == 0
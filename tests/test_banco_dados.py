@@ -0,0 +1,124 @@
+"""Descarga do buffer de escrita contra um pool falso (sem Postgres)."""
+import json
+from datetime import date
+import psycopg
+import pytest
+from sistema_pedido import banco_dados
+
+DIA = date(2026, 10, 20)
+
+class _BancoFalso:
+    """Guarda o que foi confirmado; cada conexão só confirma se a transação não falhou."""
+
+    def __init__(self):
+        self.gravadas = []
+        self.transacoes = 0
+        self.fora_do_ar = False
+
+    def connection(self):
+        return _Conexao(self)
+
+class _Conexao:
+    def __init__(self, banco):
+        self.banco = banco
+        self.pendentes = []
+
+    def __enter__(self):
+        if self.banco.fora_do_ar:
+            raise psycopg.OperationalError('connection refused')
+        self.banco.transacoes += 1
+        return self
+
+    def __exit__(self, tipo, *_):
+        if tipo is None:
+            self.commit()
+        return False
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.banco.gravadas += self.pendentes
+        self.pendentes = []
+
+class _Cursor:
+    def __init__(self, conexao):
+        self.conexao = conexao
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+def _gravador(grupo):
+    def gravar(cursor, itens):
+        if any('RUIM' in repr(item) for item in itens):
+            raise psycopg.errors.ForeignKeyViolation(f'linha ruim em {grupo}')
+        cursor.conexao.pendentes += [(grupo, item) for item in itens]
+    return gravar
+
+@pytest.fixture
+def banco(monkeypatch, tmp_path):
+    falso = _BancoFalso()
+    monkeypatch.setattr(banco_dados, 'URL_BANCO_DADOS', 'postgresql://teste')
+    monkeypatch.setattr(banco_dados, '_obter_pool', lambda: falso)
+    monkeypatch.setattr(banco_dados, '_GRUPOS_ESCRITA', tuple(
+        (grupo, _gravador(grupo)) for grupo, _ in banco_dados._GRUPOS_ESCRITA
+    ))
+    monkeypatch.setattr(banco_dados, 'TENTATIVAS_ESCRITA', 3)
+    monkeypatch.setattr(banco_dados, 'ARQUIVO_ESCRITAS_REJEITADAS', str(tmp_path / 'rejeitadas.jsonl'))
+    monkeypatch.setattr(banco_dados, '_tentativas_escrita', {})
+    for nome, vazio in (('_historico_pendente', []), ('_pratos_pendentes', {}), ('_mensagens_pendentes', {}),
+                        ('_diario_pendente', {}), ('_fila_pendente', set())):
+        monkeypatch.setattr(banco_dados, nome, vazio)
+    return falso
+
+def _encher_buffer(ruim: str = 'RUIM'):
+    banco_dados._historico_pendente.extend([
+        (1, DIA, 'PEDIU_OK', 'ok'), (2, DIA, ruim, 'erro'), (3, DIA, 'PEDIU_OK', 'ok'),
+    ])
+    banco_dados._diario_pendente.update({
+        (DIA, 1): ('PT1', True, 'ok', '06:00', '06:01', 1, True),
+        (DIA, 2): ('PT2', False, ruim, '06:00', '06:01', 1, True),
+    })
+    banco_dados._fila_pendente.update({(DIA, 1), (DIA, 2)})
+
+def test_linha_ruim_nao_derruba_o_lote(banco):
+    _encher_buffer()
+    banco_dados.descarregar_escritas()
+
+    gravadas = set((grupo, repr(item)) for grupo, item in banco.gravadas)
+    assert ('historico', repr((1, DIA, 'PEDIU_OK', 'ok'))) in gravadas
+    assert ('historico', repr((3, DIA, 'PEDIU_OK', 'ok'))) in gravadas
+    assert ('fila', repr((DIA, 1))) in gravadas
+    # A linha ruim volta para o buffer, e o item da fila espera o resultado do diário
+    assert banco_dados._historico_pendente == [(2, DIA, 'RUIM', 'erro')]
+    assert list(banco_dados._diario_pendente) == [(DIA, 2)]
+    assert banco_dados._fila_pendente == {(DIA, 2)}
+
+def test_linha_ruim_vai_para_o_arquivo_de_rejeitadas(banco, tmp_path):
+    _encher_buffer()
+    for _ in range(3):
+        banco_dados.descarregar_escritas()
+
+    assert not banco_dados._historico_pendente
+    assert not banco_dados._diario_pendente
+    assert not banco_dados._fila_pendente
+    rejeitadas = [json.loads(linha) for linha in (tmp_path / 'rejeitadas.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert sorted(linha['grupo'] for linha in rejeitadas) == ['diario', 'fila', 'historico']
+    assert not banco_dados._tentativas_escrita
+
+def test_banco_fora_do_ar_devolve_tudo_sem_dividir(banco):
+    _encher_buffer(ruim='ERRO_SITE')
+    banco.fora_do_ar = True
+    banco_dados.descarregar_escritas()
+
+    assert banco.transacoes == 0
+    assert len(banco_dados._historico_pendente) == 3
+    assert len(banco_dados._diario_pendente) == 2
+
+    banco.fora_do_ar = False
+    banco_dados.descarregar_escritas()
+    assert sorted(grupo for grupo, _ in banco.gravadas) == ['diario'] * 2 + ['fila'] * 2 + ['historico'] * 3
+    assert not banco_dados._historico_pendente and not banco_dados._tentativas_escrita
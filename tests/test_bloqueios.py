@@ -0,0 +1,59 @@
+import random
+from datetime import date
+import pytest
+from benchmarks.bench_bloqueios import INGREDIENTES, verificar_original
+from sistema_pedido.bloqueios import MotorBloqueios, calcular_matriz_bloqueios
+
+PRATOS = [
+    'Strogonoff de frango com champignon, arroz branco, batata palha e salada de beterraba',
+    'Feijoada com couve, farofa e laranja',
+    'Berinjela à parmegiana, arroz e feijão',
+    'Peixe empanado com purê de batata',
+    'Grão-de-bico ao curry com arroz',
+    '',
+]
+
+def _listas(quantidade, semente=42):
+    aleatorio = random.Random(semente)
+    return [
+        [aleatorio.choice([t, t.upper(), t.capitalize()]) for t in aleatorio.sample(INGREDIENTES, aleatorio.randint(0, 12))]
+        for _ in range(quantidade)
+    ]
+
+@pytest.mark.parametrize('prato', PRATOS)
+def test_aho_corasick_igual_a_referencia(prato):
+    listas = _listas(300)
+    motor = MotorBloqueios(listas)
+    motor.preparar(prato)
+    for lista in listas:
+        assert motor.verificar(lista) == verificar_original(prato, lista)
+
+def test_acentos_e_maiusculas():
+    lista = ['FEIJÃO', 'grao-de-bico', 'Camarão']
+    motor = MotorBloqueios([lista])
+    motor.preparar('Grão-de-bico com feijao')
+    assert motor.verificar(lista) == (True, 'FEIJÃO, grao-de-bico')
+
+def test_termos_sobrepostos():
+    # Aho-Corasick precisa achar termos que terminam dentro de outros
+    lista = ['creme de leite', 'leite', 'de le']
+    motor = MotorBloqueios([lista])
+    motor.preparar('Frango ao creme de leite')
+    assert motor.verificar(lista) == verificar_original('Frango ao creme de leite', lista)
+
+def test_lista_vazia_e_bloqueio_vazio():
+    motor = MotorBloqueios([[], ['']])
+    motor.preparar(PRATOS[0])
+    assert motor.verificar([]) == (False, "")
+    assert motor.verificar(['']) == (False, "")
+
+def test_matriz_igual_a_referencia():
+    listas = _listas(50, semente=7)
+    bloqueios_por_aluno = dict(enumerate(listas, start=1))
+    pratos_por_data = {date(2026, 10, 19 + i): prato for i, prato in enumerate(PRATOS[:5])}
+
+    linhas = calcular_matriz_bloqueios(bloqueios_por_aluno, pratos_por_data)
+
+    assert len(linhas) == len(bloqueios_por_aluno) * len(pratos_por_data)
+    for aluno_id, dia, bloqueado, itens in linhas:
+        assert (bloqueado, itens) == verificar_original(pratos_por_data[dia], bloqueios_por_aluno[aluno_id])
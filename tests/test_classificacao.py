@@ -0,0 +1,45 @@
+import pytest
+from sistema_pedido import classificacao as c
+
+@pytest.mark.parametrize('mensagem, categoria', [
+    ("Ticket Gerado anteriormente para o prontuário PT3012345.", c.JA_PEDIDO),
+    ("Não é possível solicitar refeição no Final de Semana", c.FIM_DE_SEMANA),
+    ("PULOU_PREF: aluno não come às sextas", c.PULOU),
+    ("SKIP_DIA", c.PULOU),
+    ("Prontuário não encontrado", c.PRONTUARIO_INVALIDO),
+    ("HTTPConnectionPool(host='x', port=80): Max retries exceeded", c.REDE),
+    ("Read timed out. (read timeout=30)", c.REDE),
+    ("Site indisponível: pedido parado há 900s", c.REDE),
+    ("500 Server Error: Internal Server Error for url: /home", c.SERVIDOR),
+    ("Não encontrei mensagem de confirmação na página", c.SERVIDOR),
+    ("CSRF verification failed. Request aborted.", c.SERVIDOR),
+    ("algo que o site nunca disse antes", c.DESCONHECIDO),
+    ("", c.DESCONHECIDO),
+    (None, c.DESCONHECIDO),
+])
+def test_classificar_falhas(mensagem, categoria):
+    assert c.classificar(False, mensagem) == categoria
+
+def test_sucesso_ignora_mensagem():
+    assert c.classificar(True, "Max retries exceeded") == c.SUCESSO
+
+def test_vale_o_primeiro_trecho_da_mensagem():
+    assert c.classificar(False, "Ticket Gerado anteriormente (depois de um Timeout)") == c.JA_PEDIDO
+    assert c.classificar(False, "Timeout; Ticket Gerado anteriormente") == c.REDE
+
+@pytest.mark.parametrize('categoria', [c.REDE, c.SERVIDOR, c.DESCONHECIDO])
+def test_erros_transitorios_sao_repetidos_e_alertados(categoria):
+    politica = c.POLITICAS[categoria]
+    assert politica.repetir and politica.relevante
+
+@pytest.mark.parametrize('categoria', [c.SUCESSO, c.JA_PEDIDO, c.FIM_DE_SEMANA, c.PULOU])
+def test_resultados_normais_nao_sao_repetidos_nem_alertados(categoria):
+    politica = c.POLITICAS[categoria]
+    assert not politica.repetir and not politica.relevante
+
+def test_prontuario_invalido_alerta_sem_repetir():
+    politica = c.politica(False, "prontuário inválido")
+    assert not politica.repetir and politica.relevante
+
+def test_toda_categoria_tem_politica():
+    assert set(c._PADROES) | {c.SUCESSO, c.DESCONHECIDO} == set(c.POLITICAS)
@@ -0,0 +1,25 @@
+from datetime import datetime, time
+import pytest
+from sistema_pedido.configuracao import FUSO_HORARIO
+from sistema_pedido.daemon import horario_perdido, proximo_horario
+
+HORARIOS = [time(6, 0), time(13, 0)]
+
+def _em(dia, hora, minuto=0):
+    return datetime(2026, 10, dia, hora, minuto, tzinfo=FUSO_HORARIO)
+
+@pytest.mark.parametrize('agora, esperado', [
+    (_em(19, 5, 59), None),              # antes do primeiro horário
+    (_em(19, 9, 30), _em(19, 6)),        # perdeu o das 06:00, corte ainda não passou
+    (_em(19, 13, 5), _em(19, 13)),       # perdeu o das 13:00: roda o mais recente
+    (_em(19, 13, 20), None),             # corte das 13:15 já passou
+    (_em(18, 9, 30), None),              # domingo
+])
+def test_horario_perdido(agora, esperado):
+    assert horario_perdido(agora, HORARIOS) == esperado
+
+def test_horario_depois_do_corte_recuperado_ate_meia_noite():
+    assert horario_perdido(_em(19, 20), [time(16, 0)]) == _em(19, 16)
+
+def test_proximo_horario_pula_fim_de_semana():
+    assert proximo_horario(_em(23, 14), HORARIOS) == _em(26, 6)
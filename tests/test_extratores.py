@@ -0,0 +1,54 @@
+from pathlib import Path
+import pytest
+from sistema_pedido import extratores
+from sistema_pedido.extratores import alerta_completo, extrair_alerta
+
+PASTA_FIXTURES = Path(__file__).resolve().parent.parent / 'benchmarks' / 'fixtures'
+FIXTURES = sorted(arquivo.name for arquivo in PASTA_FIXTURES.glob('*.html'))
+
+def _ler(nome):
+    return (PASTA_FIXTURES / nome).read_text(encoding='utf-8')
+
+def _alerta_em_streaming(html, tamanho_bloco):
+    """O que a leitura em streaming extrairia: lê em blocos até alerta_completo decidir."""
+    lido = ''
+    for inicio in range(0, len(html), tamanho_bloco):
+        lido += html[inicio:inicio + tamanho_bloco]
+        if alerta_completo(lido):
+            break
+    return extrair_alerta(lido, backend='rapido'), len(lido)
+
+@pytest.mark.parametrize('nome', FIXTURES)
+@pytest.mark.parametrize('tamanho_bloco', [1, 64, 256, 4096])
+def test_streaming_concorda_com_bs4(nome, tamanho_bloco):
+    html = _ler(nome)
+    alerta, _ = _alerta_em_streaming(html, tamanho_bloco)
+    assert alerta == extrair_alerta(html, backend='bs4')
+
+@pytest.mark.parametrize('nome', FIXTURES)
+def test_backends_concordam(nome):
+    html = _ler(nome)
+    esperado = extratores.BACKENDS['bs4'][1](html)
+    assert extratores.BACKENDS['rapido'][1](html) == esperado
+    assert extratores.BACKENDS['rapido'][0](html) == extratores.BACKENDS['bs4'][0](html)
+
+def test_erro_abaixo_do_sucesso_vence():
+    alerta, _ = _alerta_em_streaming(_ler('pedido_erro_no_fim.html'), 256)
+    assert alerta[0] is False
+    assert 'Gerado anteriormente' in alerta[1]
+
+def test_erro_inteiro_para_a_leitura_cedo():
+    html = _ler('pedido_erro.html')
+    _, lidos = _alerta_em_streaming(html, 256)
+    assert lidos < len(html)
+
+def test_sucesso_nao_para_a_leitura():
+    html = _ler('pedido_sucesso.html')
+    _, lidos = _alerta_em_streaming(html, 256)
+    assert lidos == len(html)
+
+def test_aviso_de_erro_pela_metade_nao_decide():
+    html = _ler('pedido_erro.html')
+    inicio = html.index('alert-danger')
+    assert not alerta_completo(html[:inicio + 40])
+    assert alerta_completo(html[:html.index('</div>', inicio) + len('</div>')])